@@ -0,0 +1,220 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "10"))
+ANALYTICS_RECONCILE_MINUTES = int(os.getenv("ANALYTICS_RECONCILE_MINUTES", "60"))
+
+# Metric names in the analytics_counters table. "bucket" is a YYYY-MM-DD day
+# or ALL for running totals; "key" is a topic, a source, or empty.
+TASKS = "tasks"
+TOPIC_TASKS = "topic_tasks"
+TASKS_PER_DAY = "tasks_per_day"
+DOCUMENTS = "documents"
+SOURCE_DOCUMENTS = "source_documents"
+DOCUMENTS_PER_DAY = "documents_per_day"
+SUMMARIES = "summaries"
+SUMMARIES_PER_DAY = "summaries_per_day"
+ALL = "all"
+
+CounterKey = Tuple[str, str, str]
+
+
+def _day(value: Optional[datetime]) -> str:
+    return (value or datetime.utcnow()).strftime("%Y-%m-%d")
+
+
+# --- 1. INCREMENTAL UPDATES ---
+def apply(db: Session, deltas: Dict[CounterKey, int]):
+    """
+    Adds the deltas to their counters with upserts in the caller's
+    transaction, so counters commit (or roll back) together with the rows
+    they describe.
+    """
+    rows = [
+        {"metric": metric, "bucket": bucket, "key": key, "value": value}
+        for (metric, bucket, key), value in deltas.items() if value
+    ]
+    if not rows:
+        return
+    table = models.AnalyticsCounter.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["metric", "bucket", "key"],
+            set_={"value": table.c.value + stmt.excluded.value},
+        ))
+        return
+    for row in rows:
+        result = db.execute(
+            update(table)
+            .where(table.c.metric == row["metric"], table.c.bucket == row["bucket"], table.c.key == row["key"])
+            .values(value=table.c.value + row["value"])
+        )
+        if result.rowcount == 0:
+            db.execute(table.insert().values(**row))
+
+def task_deltas(task: models.Task, sign: int = 1) -> Dict[CounterKey, int]:
+    return {
+        (TASKS, ALL, ""): sign,
+        (TOPIC_TASKS, ALL, task.topic or ""): sign,
+        (TASKS_PER_DAY, _day(task.created_at), ""): sign,
+    }
+
+def document_deltas(documents: Iterable[Tuple[Optional[str], Optional[datetime], bool]], sign: int = 1) -> Dict[CounterKey, int]:
+    """Deltas for (source, created_at, has_summary) triples."""
+    deltas: Counter = Counter()
+    for source, created_at, has_summary in documents:
+        day = _day(created_at)
+        deltas[(DOCUMENTS, ALL, "")] += sign
+        deltas[(SOURCE_DOCUMENTS, ALL, source or "Unknown")] += sign
+        deltas[(DOCUMENTS_PER_DAY, day, "")] += sign
+        if has_summary:
+            deltas[(SUMMARIES, ALL, "")] += sign
+            deltas[(SUMMARIES_PER_DAY, day, "")] += sign
+    return dict(deltas)
+
+def summary_deltas(created_at: Optional[datetime], sign: int = 1) -> Dict[CounterKey, int]:
+    """Deltas for a document created at created_at gaining (sign=1) or losing (sign=-1) its summary."""
+    return {(SUMMARIES, ALL, ""): sign, (SUMMARIES_PER_DAY, _day(created_at), ""): sign}
+
+
+# --- 2. RECONCILIATION ---
+def _expected_counters(db: Session) -> Dict[CounterKey, int]:
+    """Every counter recomputed from the base tables with GROUP BY queries."""
+    expected: Dict[CounterKey, int] = {}
+    task_day = func.date(models.Task.created_at)
+    for topic, count in db.query(models.Task.topic, func.count()).group_by(models.Task.topic):
+        expected[(TOPIC_TASKS, ALL, topic or "")] = expected.get((TOPIC_TASKS, ALL, topic or ""), 0) + count
+    for day, count in db.query(task_day, func.count()).group_by(task_day):
+        expected[(TASKS_PER_DAY, str(day), "")] = count
+    expected[(TASKS, ALL, "")] = sum(v for (m, _, _), v in expected.items() if m == TASKS_PER_DAY)
+
+    doc_day = func.date(models.Document.created_at)
+    has_summary = func.sum(case((models.Document.summary.isnot(None), 1), else_=0))
+    for source, count in db.query(models.Document.source, func.count()).group_by(models.Document.source):
+        key = (SOURCE_DOCUMENTS, ALL, source or "Unknown")
+        expected[key] = expected.get(key, 0) + count
+    for day, count, summarized in db.query(doc_day, func.count(), has_summary).group_by(doc_day):
+        expected[(DOCUMENTS_PER_DAY, str(day), "")] = count
+        expected[(SUMMARIES_PER_DAY, str(day), "")] = int(summarized or 0)
+    expected[(DOCUMENTS, ALL, "")] = sum(v for (m, _, _), v in expected.items() if m == DOCUMENTS_PER_DAY)
+    expected[(SUMMARIES, ALL, "")] = sum(v for (m, _, _), v in expected.items() if m == SUMMARIES_PER_DAY)
+    return {key: value for key, value in expected.items() if value}
+
+def reconcile(db: Session) -> int:
+    """
+    Recomputes every counter from the base tables and corrects the ones that
+    drifted (writes that bypassed crud, manual deletes). Writes racing with a
+    run can leave a small error that the next run corrects. Returns how many
+    counters were changed.
+    """
+    expected = _expected_counters(db)
+    table = models.AnalyticsCounter.__table__
+    current = {(m, b, k): v for m, b, k, v in db.execute(table.select())}
+    deltas = {
+        key: expected.get(key, 0) - current.get(key, 0)
+        for key in set(expected) | set(current)
+        if expected.get(key, 0) != current.get(key, 0)
+    }
+    try:
+        apply(db, deltas)
+        # Counters that dropped to zero carry no information
+        db.execute(table.delete().where(table.c.value == 0))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    stats_cache.clear()
+    if deltas:
+        logging.info(f"Analytics reconciliation corrected {len(deltas)} counters.")
+    return len(deltas)
+
+def is_initialized(db: Session) -> bool:
+    return db.query(models.AnalyticsCounter.metric).first() is not None
+
+
+# --- 3. READ PATH ---
+def _series(db: Session, metric: str, since: str) -> Dict[str, int]:
+    table = models.AnalyticsCounter.__table__
+    rows = db.execute(
+        table.select().with_only_columns(table.c.bucket, table.c.value)
+        .where(table.c.metric == metric, table.c.bucket >= since)
+        .order_by(table.c.bucket)
+    )
+    return {bucket: value for bucket, value in rows}
+
+def _top(db: Session, metric: str, limit: int):
+    table = models.AnalyticsCounter.__table__
+    return db.execute(
+        table.select().with_only_columns(table.c.key, table.c.value)
+        .where(table.c.metric == metric, table.c.bucket == ALL, table.c.value > 0)
+        .order_by(table.c.value.desc(), table.c.key)
+        .limit(limit)
+    ).all()
+
+def _total(db: Session, metric: str) -> int:
+    table = models.AnalyticsCounter.__table__
+    return db.execute(
+        table.select().with_only_columns(table.c.value)
+        .where(table.c.metric == metric, table.c.bucket == ALL, table.c.key == "")
+    ).scalar() or 0
+
+def compute_stats(db: Session, days: int = 30) -> dict:
+    """Dashboard statistics read from the counters table; cost does not grow with the data."""
+    since = _day(datetime.utcnow() - timedelta(days=days - 1))
+    tasks_per_day = _series(db, TASKS_PER_DAY, since)
+    documents_per_day = _series(db, DOCUMENTS_PER_DAY, since)
+    summaries_per_day = _series(db, SUMMARIES_PER_DAY, since)
+    total_documents = _total(db, DOCUMENTS)
+    total_summaries = _total(db, SUMMARIES)
+    return {
+        "total_tasks": _total(db, TASKS),
+        "total_documents": total_documents,
+        "top_topics": [{"topic": topic, "count": count} for topic, count in _top(db, TOPIC_TASKS, 5)],
+        "tasks_per_day": [{"date": day, "count": count} for day, count in tasks_per_day.items()],
+        "documents_per_source": [{"source": source, "count": count} for source, count in _top(db, SOURCE_DOCUMENTS, 20)],
+        "summary_success_rate": round(total_summaries / total_documents, 4) if total_documents else None,
+        "summary_success_by_day": [
+            {"date": day, "documents": count, "rate": round(summaries_per_day.get(day, 0) / count, 4)}
+            for day, count in documents_per_day.items() if count
+        ],
+    }
+
+
+class StatsCache:
+    """Keeps computed dashboard stats for a few seconds so bursts of dashboard hits share one read."""
+
+    def __init__(self, ttl: float = ANALYTICS_CACHE_TTL):
+        self._ttl = ttl
+        self._entries: Dict[int, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, days: int = 30) -> dict:
+        with self._lock:
+            entry = self._entries.get(days)
+            if entry and time.monotonic() - entry[0] < self._ttl:
+                return entry[1]
+        stats = compute_stats(db, days)
+        with self._lock:
+            self._entries[days] = (time.monotonic(), stats)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+stats_cache = StatsCache()
@@ -1,33 +1,140 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from . import models
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import Text, case, cast, func, insert, or_, select, update
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from . import models, search, pagination, analytics, task_leases
+# Also registers the Session hooks that bump response cache versions, so writes
+# from scripts and workers that never import it still retire cached responses
+from . import response_cache
+from .dedup import url_hash, seen_urls
+
+# cache_versions counter bumped by every commit that deletes documents
+DOCUMENT_DELETIONS = "document_deletions"
 
 def get_task(db: Session, task_id: int):
     return db.query(models.Task).filter(models.Task.id == task_id).first()
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Task).order_by(models.Task.id.desc()).offset(skip).limit(limit).all()
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, before_id: Optional[int] = None):
+    """
+    Newest tasks first. With before_id the page starts right after that task
+    (keyset pagination on the primary key, which follows created_at), so deep
+    pages cost the same as the first; skip is kept for older clients.
+    """
+    query = db.query(models.Task)
+    if before_id is not None:
+        return query.filter(models.Task.id < before_id).order_by(models.Task.id.desc()).limit(limit).all()
+    return query.order_by(models.Task.id.desc()).offset(skip).limit(limit).all()
+
+def get_tasks_with_documents(db: Session, skip: int = 0, limit: int = 100, before_id: Optional[int] = None, fields: Optional[List[str]] = None):
+    """
+    Like get_tasks, but loads each task's documents (stored and linked) up
+    front with two extra SELECT ... WHERE task_id IN (...) queries rather than
+    per-task queries. With fields, only those document columns are read.
+    """
+    documents = selectinload(models.Task.documents)
+    linked = selectinload(models.Task.linked_documents)
+    if fields:
+        columns = [getattr(models.Document, f) for f in fields]
+        documents, linked = documents.load_only(*columns), linked.load_only(*columns)
+    query = db.query(models.Task).options(documents, linked)
+    if before_id is not None:
+        return query.filter(models.Task.id < before_id).order_by(models.Task.id.desc()).limit(limit).all()
+    return query.order_by(models.Task.id.desc()).offset(skip).limit(limit).all()
 
-def create_task(db: Session, topic: str):
-    db_task = models.Task(topic=topic, status="processing")
+def get_task_documents(db: Session, task_id: int, limit: int = 100, after_id: Optional[int] = None, fields: Optional[List[str]] = None, raw_content: bool = False) -> List[dict]:
+    """
+    One page of a task's documents in insertion order, as plain dicts of the
+    requested columns (all of them by default). Only those columns are selected,
+    so list views can leave the large content and summary columns on disk.
+    With raw_content, 'content' is the stored JSON text rather than a parsed dict.
+    Documents another task stored but this one is linked to are included.
+    """
+    columns = [
+        cast(models.Document.content, Text).label("content") if f == "content" and raw_content else getattr(models.Document, f)
+        for f in (fields or pagination.DOCUMENT_FIELDS)
+    ]
+    linked = select(models.TaskDocument.document_id).where(models.TaskDocument.task_id == task_id)
+    query = db.query(*columns).filter(or_(models.Document.task_id == task_id, models.Document.id.in_(linked)))
+    if after_id is not None:
+        query = query.filter(models.Document.id > after_id)
+    rows = query.order_by(models.Document.id).limit(limit).all()
+    return [dict(row._mapping) for row in rows]
+
+def create_task(db: Session, topic: str, status: str = "processing"):
+    now = datetime.utcnow()
+    db_task = models.Task(topic=topic, status=status, created_at=now, owner=task_leases.INSTANCE_ID, heartbeat_at=now)
     db.add(db_task)
+    analytics.apply(db, analytics.task_deltas(db_task))
     db.commit()
     db.refresh(db_task)
     return db_task
 
+def get_task_status(db: Session, task_id: int) -> Optional[str]:
+    """
+    The task's current status, or None if it does not exist. The read
+    transaction is ended straight away, so the next call sees what other
+    workers committed in the meantime.
+    """
+    status = db.query(models.Task.status).filter(models.Task.id == task_id).scalar()
+    db.rollback()
+    return status
+
+def update_task_status(db: Session, task_id: int, status: str):
+    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    if db_task:
+        db_task.status = status
+        db.commit()
+        db.refresh(db_task)
+        return db_task
+
+def save_task_timings(db: Session, task_id: int, timings: dict):
+    db.query(models.Task).filter(models.Task.id == task_id).update(
+        {models.Task.timings: timings}, synchronize_session=False
+    )
+    db.commit()
+
 def delete_task(db: Session, task_id: int):
     db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
     if db_task:
+        db.query(models.TaskDocument).filter(models.TaskDocument.task_id == task_id).delete(synchronize_session=False)
+        # Documents shared with other tasks are handed to the oldest of them instead of being deleted
+        shared = db.query(models.TaskDocument.document_id, func.min(models.TaskDocument.task_id)).join(
+            models.Document, models.Document.id == models.TaskDocument.document_id
+        ).filter(models.Document.task_id == task_id).group_by(models.TaskDocument.document_id).all()
+        for document_id, new_task_id in shared:
+            db.query(models.Document).filter(models.Document.id == document_id).update(
+                {models.Document.task_id: new_task_id}, synchronize_session=False
+            )
+            db.query(models.TaskDocument).filter(
+                models.TaskDocument.task_id == new_task_id, models.TaskDocument.document_id == document_id
+            ).delete(synchronize_session=False)
+        documents = db.query(
+            models.Document.url_hash, models.Document.source, models.Document.created_at, models.Document.summary
+        ).filter(models.Document.task_id == task_id).all()
+        hashes = [doc.url_hash for doc in documents]
         db.query(models.Document).filter(models.Document.task_id == task_id).delete(synchronize_session=False)
+        db.query(models.ScheduledRun).filter(models.ScheduledRun.task_id == task_id).update(
+            {models.ScheduledRun.task_id: None}, synchronize_session=False
+        )
         db.delete(db_task)
+        if hashes:
+            response_cache.mark_changed(db, {DOCUMENT_DELETIONS})
+        analytics.apply(db, analytics.task_deltas(db_task, sign=-1))
+        analytics.apply(db, analytics.document_deltas(
+            ((doc.source, doc.created_at, doc.summary is not None) for doc in documents), sign=-1
+        ))
         db.commit()
+        seen_urls.discard_many(h for h in hashes if h)
         return db_task
     return None
 
 def create_document(db: Session, task_id: int, source: str, content: dict):
-    db_document = models.Document(task_id=task_id, source=source, content=content)
+    db_document = models.Document(
+        task_id=task_id, source=source, content=content, url_hash=url_hash(content.get("url")), created_at=datetime.utcnow()
+    )
     db.add(db_document)
+    analytics.apply(db, analytics.document_deltas([(source, db_document.created_at, False)]))
     db.commit()
     db.refresh(db_document)
     return db_document
@@ -35,6 +142,9 @@ def create_document(db: Session, task_id: int, source: str, content: dict):
 def update_document_summary(db: Session, document_id: int, summary: str):
     db_document = db.query(models.Document).filter(models.Document.id == document_id).first()
     if db_document:
+        had_summary, has_summary = db_document.summary is not None, summary is not None
+        if had_summary != has_summary:
+            analytics.apply(db, analytics.summary_deltas(db_document.created_at, sign=1 if has_summary else -1))
         db_document.summary = summary
         db.commit()
         db.refresh(db_document)
@@ -48,40 +158,277 @@ def update_document_topics(db: Session, document_id: int, topics: str):
         db.refresh(db_document)
         return db_document
 
-def get_db_stats(db: Session):
-    total_tasks = db.query(models.Task).count()
-    total_documents = db.query(models.Document).count()
-
-    top_topics = db.query(models.Task.topic, func.count(models.Task.topic).label('count')) \
-                       .group_by(models.Task.topic) \
-                       .order_by(func.count(models.Task.topic).desc()) \
-                       .limit(5).all()
+def _insert_ignoring_duplicates(db: Session, model, rows: List[dict], index_elements: List[str]):
+    """
+    Builds a multi-row INSERT that silently skips rows clashing with an existing
+    one on index_elements (e.g. a document's url_hash), so concurrent research
+    runs on overlapping topics can't create duplicates.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model).values(rows).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == "sqlite":
+        return sqlite.insert(model).values(rows).on_conflict_do_nothing(index_elements=index_elements)
+    return insert(model).values(rows)
 
+def _document_row(task_id: int, doc: dict, now: datetime) -> dict:
     return {
-        "total_tasks": total_tasks,
-        "total_documents": total_documents,
-        "top_topics": [{"topic": topic, "count": count} for topic, count in top_topics]
+        "task_id": task_id,
+        "source": doc.get("source"),
+        "content": doc.get("content"),
+        "url_hash": url_hash((doc.get("content") or {}).get("url")),
+        "summary": doc.get("summary"),
+        "topics": doc.get("topics"),
+        "created_at": now,
     }
 
+def _insert_documents(db: Session, rows: List[dict], now: datetime) -> int:
+    """Inserts document rows, skipping stored URLs, and counts the new ones in analytics; returns how many were inserted."""
+    stmt = _insert_ignoring_duplicates(db, models.Document, rows, ["url_hash"])
+    if db.get_bind().dialect.insert_returning:
+        # RETURNING only yields the rows that were actually inserted, which is what the counters need
+        added = db.execute(stmt.returning(models.Document.source, models.Document.summary)).all()
+        analytics.apply(db, analytics.document_deltas((source, now, summary is not None) for source, summary in added))
+        return len(added)
+    inserted = db.execute(stmt).rowcount
+    # Without RETURNING there is no telling which rows a conflict skipped, so
+    # a partial insert is left for the next reconciliation to count
+    if inserted == len(rows):
+        analytics.apply(db, analytics.document_deltas((row["source"], now, row["summary"] is not None) for row in rows))
+    return inserted
+
+def ingest_documents(db: Session, task_id: int, documents: List[dict], task_status: Optional[str] = None) -> int:
+    """
+    Writes a batch of documents, with summary and topics already filled in,
+    using a single multi-row INSERT. If task_status is given, the task's status
+    is updated in the same transaction so both land in one commit.
+    Each document is a dict with 'source', 'content', 'summary' and 'topics'.
+    Documents whose URL is already stored are skipped; returns how many were inserted.
+    """
+    now = datetime.utcnow()
+    rows = [_document_row(task_id, doc, now) for doc in documents]
+    inserted = 0
+    try:
+        if rows:
+            inserted = _insert_documents(db, rows, now)
+        if task_status:
+            db.execute(update(models.Task).where(models.Task.id == task_id).values(status=task_status))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    seen_urls.add_many(row["url_hash"] for row in rows if row["url_hash"])
+    return inserted
+
+def ingest_research_batch(db: Session, task_ids: List[int], documents: List[dict], links: Dict[str, List[int]]) -> int:
+    """
+    Saves a batch research run in one transaction. links maps every article
+    URL the batch found to the ids of the tasks it belongs to. Each new
+    document (shaped as for ingest_documents) is stored under the first of its
+    tasks and linked to the rest; articles that were already stored are only
+    linked. All task_ids are marked completed in the same commit.
+    Returns the number of documents inserted.
+    """
+    now = datetime.utcnow()
+    rows = [_document_row(links[doc["content"]["url"]][0], doc, now) for doc in documents]
+    memberships = {url_hash(url): task_list for url, task_list in links.items() if url_hash(url)}
+    inserted = 0
+    try:
+        if rows:
+            inserted = _insert_documents(db, rows, now)
+        if memberships:
+            # Looked up after the insert, so documents a concurrent run stored first are linked too
+            stored = db.query(models.Document.id, models.Document.url_hash, models.Document.task_id).filter(
+                models.Document.url_hash.in_(memberships)
+            ).all()
+            link_rows = [
+                {"task_id": task_id, "document_id": document_id}
+                for document_id, hash_, owner in stored
+                for task_id in dict.fromkeys(memberships[hash_]) if task_id != owner
+            ]
+            if link_rows:
+                db.execute(_insert_ignoring_duplicates(db, models.TaskDocument, link_rows, ["task_id", "document_id"]))
+        if task_ids:
+            db.execute(update(models.Task).where(models.Task.id.in_(task_ids)).values(status="completed"))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    seen_urls.add_many(row["url_hash"] for row in rows if row["url_hash"])
+    return inserted
+
+def get_analytics_stats(db: Session, days: int = 30, cached: bool = True):
+    """Dashboard statistics from the precomputed analytics counters, cached for a few seconds unless cached=False."""
+    if not cached:
+        return analytics.compute_stats(db, days)
+    return analytics.stats_cache.get(db, days)
+
 def get_existing_document_urls(db: Session, urls: List[str]) -> List[str]:
     """
     Checks the database for a list of article URLs and returns the ones that already exist.
+    Lookups go through the indexed url_hash column; hashes already seen by this
+    process are answered from memory, unless any worker has deleted documents
+    since, which costs one primary-key read to find out.
     """
     if not urls:
         return []
 
-    existing_docs = db.query(models.Document.content['url'].as_string()).filter(
-        models.Document.content['url'].as_string().in_(urls)
-    ).all()
+    seen_urls.sync(response_cache.read_version(db, DOCUMENT_DELETIONS))
+    hashes = {url: url_hash(url) for url in urls if url}
+    known = {h for h in hashes.values() if h in seen_urls}
+    unknown = set(hashes.values()) - known
+
+    if unknown:
+        found = [h for (h,) in db.query(models.Document.url_hash).filter(models.Document.url_hash.in_(unknown))]
+        seen_urls.add_many(found)
+        known.update(found)
+
+    return [url for url, h in hashes.items() if h in known]
 
-    return [url for url, in existing_docs]
+def get_documents_by_ids(db: Session, document_ids: List[int]) -> List[models.Document]:
+    if not document_ids:
+        return []
+    return db.query(models.Document).filter(models.Document.id.in_(document_ids)).all()
 
-def search_documents_by_text(db: Session, query: str, limit: int = 10) -> List[models.Document]:
+def search_documents_by_text(db: Session, query: str, limit: int = 10, offset: int = 0) -> List[models.Document]:
     """
-    Searches documents for a query string in their summary.
+    Ranked full-text search over document titles, descriptions, summaries and topics.
     """
-    search_query = f"%{query}%"
+    return search.search_documents(db, query=query, limit=limit, offset=offset)
+
+def get_cached_summary(db: Session, key: str) -> Optional[str]:
+    entry = db.query(models.SummaryCacheEntry.summary).filter(models.SummaryCacheEntry.key == key).first()
+    return entry[0] if entry else None
+
+def save_cached_summary(db: Session, key: str, model: str, summary: str):
+    """Stores a summary in the persistent cache; an existing entry for the same key is kept."""
+    row = {"key": key, "model": model, "summary": summary, "created_at": datetime.utcnow()}
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(models.SummaryCacheEntry).values(row).on_conflict_do_nothing(index_elements=["key"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(models.SummaryCacheEntry).values(row).on_conflict_do_nothing(index_elements=["key"])
+    else:
+        if db.get(models.SummaryCacheEntry, key) is not None:
+            return
+        stmt = insert(models.SummaryCacheEntry).values(row)
+    db.execute(stmt)
+    db.commit()
+
+def prune_cached_summaries(db: Session, older_than: Optional[datetime] = None, max_rows: int = 0) -> int:
+    """
+    Deletes summary cache entries created before older_than, then every entry
+    but the max_rows newest (0 for no limit). Returns how many were deleted.
+    """
+    entries = models.SummaryCacheEntry
+    removed = 0
+    if older_than is not None:
+        removed += db.query(entries).filter(entries.created_at < older_than).delete(synchronize_session=False)
+    if max_rows:
+        excess = select(entries.key).order_by(entries.created_at.desc(), entries.key.desc()).offset(max_rows)
+        removed += db.query(entries).filter(entries.key.in_(excess)).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+# --- Topic subscriptions and scheduled runs ---
+def get_subscriptions(db: Session, enabled_only: bool = False) -> List[models.TopicSubscription]:
+    query = db.query(models.TopicSubscription)
+    if enabled_only:
+        query = query.filter(models.TopicSubscription.enabled.is_(True))
+    return query.order_by(models.TopicSubscription.id).all()
+
+def get_subscription(db: Session, subscription_id: int) -> Optional[models.TopicSubscription]:
+    return db.get(models.TopicSubscription, subscription_id)
+
+def get_subscription_by_topic(db: Session, topic: str) -> Optional[models.TopicSubscription]:
+    return db.query(models.TopicSubscription).filter(models.TopicSubscription.topic == topic).first()
+
+def create_subscription(db: Session, topic: str, cron: str, enabled: bool = True) -> models.TopicSubscription:
+    now = datetime.utcnow()
+    db_subscription = models.TopicSubscription(topic=topic, cron=cron, enabled=enabled, created_at=now, updated_at=now)
+    db.add(db_subscription)
+    db.commit()
+    db.refresh(db_subscription)
+    return db_subscription
+
+def update_subscription(db: Session, subscription_id: int, **changes) -> Optional[models.TopicSubscription]:
+    db_subscription = db.get(models.TopicSubscription, subscription_id)
+    if db_subscription:
+        for field, value in changes.items():
+            setattr(db_subscription, field, value)
+        db_subscription.updated_at = datetime.utcnow()
+        db.commit()
+        db.refresh(db_subscription)
+    return db_subscription
+
+def delete_subscription(db: Session, subscription_id: int) -> Optional[models.TopicSubscription]:
+    db_subscription = db.get(models.TopicSubscription, subscription_id)
+    if db_subscription:
+        # Keep the run history; it still carries the topic
+        db.query(models.ScheduledRun).filter(models.ScheduledRun.subscription_id == subscription_id).update(
+            {models.ScheduledRun.subscription_id: None}, synchronize_session=False
+        )
+        db.delete(db_subscription)
+        db.commit()
+    return db_subscription
+
+def create_scheduled_run(db: Session, subscription: models.TopicSubscription, fired_at: datetime) -> models.ScheduledRun:
+    """Creates the queued task for a subscription firing and its run record in one commit."""
+    now = datetime.utcnow()
+    db_task = models.Task(
+        topic=subscription.topic, status="queued", created_at=now, owner=task_leases.INSTANCE_ID, heartbeat_at=now
+    )
+    db.add(db_task)
+    analytics.apply(db, analytics.task_deltas(db_task))
+    db.flush()
+    db_run = models.ScheduledRun(
+        subscription_id=subscription.id, task_id=db_task.id, topic=subscription.topic, status="waiting", fired_at=fired_at
+    )
+    db.add(db_run)
+    db.commit()
+    db.refresh(db_run)
+    return db_run
+
+def start_scheduled_run(db: Session, run_id: int, started_at: datetime):
+    db_run = db.get(models.ScheduledRun, run_id)
+    if db_run:
+        db_run.status = "running"
+        db_run.started_at = started_at
+        db_run.wait_seconds = (started_at - db_run.fired_at).total_seconds()
+        db.commit()
+
+def finish_scheduled_run(db: Session, run_id: int, status: str, finished_at: datetime, error: Optional[str] = None):
+    db_run = db.get(models.ScheduledRun, run_id)
+    if db_run:
+        db_run.status = status
+        db_run.finished_at = finished_at
+        db_run.duration_seconds = (finished_at - (db_run.started_at or db_run.fired_at)).total_seconds()
+        db_run.error = error
+        db.commit()
+
+def get_scheduled_runs(db: Session, subscription_id: Optional[int] = None, limit: int = 50) -> List[models.ScheduledRun]:
+    query = db.query(models.ScheduledRun)
+    if subscription_id is not None:
+        query = query.filter(models.ScheduledRun.subscription_id == subscription_id)
+    return query.order_by(models.ScheduledRun.id.desc()).limit(limit).all()
 
-    return db.query(models.Document).filter(
-        models.Document.summary.ilike(search_query)
-    ).limit(limit).all()
\ No newline at end of file
+def get_scheduled_run_stats(db: Session, days: int = 7) -> List[dict]:
+    """Per-topic run counts and timings over the last `days` days, slowest topics first."""
+    since = datetime.utcnow() - timedelta(days=days)
+    run = models.ScheduledRun
+    rows = (
+        db.query(
+            run.topic,
+            func.count().label("runs"),
+            func.sum(case((run.status == "failed", 1), else_=0)).label("failures"),
+            func.avg(run.duration_seconds).label("avg_duration_seconds"),
+            func.max(run.duration_seconds).label("max_duration_seconds"),
+            func.avg(run.wait_seconds).label("avg_wait_seconds"),
+            func.max(run.fired_at).label("last_fired_at"),
+        )
+        .filter(run.fired_at >= since)
+        .group_by(run.topic)
+        .order_by(func.avg(run.duration_seconds).desc())
+        .all()
+    )
+    return [dict(row._mapping) for row in rows]
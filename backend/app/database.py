@@ -1,7 +1,18 @@
 import os
+import time
+import asyncio
+import logging
+import importlib.util
+import threading
+from typing import Union
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
 
 # This line loads the .env file for local development
@@ -15,7 +26,144 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable not set. Please create a .env file or set it.")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Connection pool settings, shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side limit for a single statement in milliseconds (PostgreSQL only); 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# "auto" uses an async driver (asyncpg / aiosqlite) when installed, "off" never does
+DB_ASYNC_MODE = os.getenv("DB_ASYNC_MODE", "auto").lower()
+
+# Upper bounds (seconds) of the checkout wait histogram
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+# --- 1. POOL METRICS ---
+class PoolMetrics:
+    """Counts pool checkouts and how long callers waited for a connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.buckets = [0] * (len(CHECKOUT_BUCKETS) + 1)
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            index = next((i for i, bound in enumerate(CHECKOUT_BUCKETS) if seconds <= bound), len(CHECKOUT_BUCKETS))
+            self.buckets[index] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "wait_histogram": {
+                    **{f"le_{bound}": count for bound, count in zip(CHECKOUT_BUCKETS, self.buckets)},
+                    "le_inf": self.buckets[-1],
+                },
+            }
+
+
+class _TimedCheckout:
+    """Mixin that times QueuePool._do_get, the step that waits for a free connection."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics = PoolMetrics()
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.stats())
+    return stats
+
+
+# --- 2. ENGINE OPTIONS ---
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _engine_options(url, poolclass) -> dict:
+    if _is_memory_sqlite(url):
+        # In-memory SQLite needs SQLAlchemy's single-connection pool
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def _sync_connect_args(url) -> dict:
+    if DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+def _async_url_and_args(url):
+    """
+    Maps the configured URL to its async driver, or returns (None, None) when
+    that driver is not installed. asyncpg does not understand libpq's sslmode
+    parameter, so it is translated to asyncpg's ssl argument.
+    """
+    backend = url.get_backend_name()
+    if backend == "postgresql" and importlib.util.find_spec("asyncpg"):
+        connect_args = {}
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        if DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+    if backend == "sqlite" and importlib.util.find_spec("aiosqlite"):
+        return url.set(drivername="sqlite+aiosqlite"), {}
+    return None, None
+
+
+# --- 3. SYNC ENGINE (scripts, sync routes, background threads) ---
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args=_sync_connect_args(_url),
+    **_engine_options(_url, TimedQueuePool),
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -27,4 +175,60 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- 4. ASYNC SESSIONS (async routes) ---
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC_MODE != "off":
+    _async_url, _async_connect_args = _async_url_and_args(_url)
+    if _async_url is not None:
+        async_engine = create_async_engine(
+            _async_url,
+            connect_args=_async_connect_args,
+            **_engine_options(_async_url, TimedAsyncQueuePool),
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    else:
+        logging.warning("No async database driver installed; async routes will run database calls in worker threads.")
+
+
+class ThreadedSession:
+    """
+    Stand-in for AsyncSession when no async driver is available: run_sync()
+    executes the function with a regular Session in a worker thread, so the
+    event loop is never blocked on database I/O either way.
+    """
+
+    def __init__(self):
+        self._session: Session = SessionLocal(expire_on_commit=False)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, self._session, *args, **kwargs)
+
+    async def close(self):
+        await asyncio.to_thread(self._session.close)
+
+
+AsyncDB = Union[AsyncSession, ThreadedSession]
+
+def open_async_session() -> AsyncDB:
+    """
+    A session for async code. Database work goes through
+    `await session.run_sync(fn, *args)`, where fn receives a regular Session,
+    so the sync crud functions are reused unchanged.
+    """
+    return AsyncSessionLocal() if AsyncSessionLocal is not None else ThreadedSession()
+
+def async_mode() -> str:
+    return async_engine.dialect.driver if async_engine is not None else "threaded"
+
+# Dependency to get a session for async routes
+async def get_async_db():
+    db = open_async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
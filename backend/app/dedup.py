@@ -0,0 +1,86 @@
+import os
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+SEEN_URL_CACHE_SIZE = int(os.getenv("SEEN_URL_CACHE_SIZE", "50000"))
+
+# Query parameters that only track where a click came from and never change the article.
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Reduces an article URL to a canonical form so the same story fetched from
+    different providers maps to the same key: lower-cased scheme and host,
+    no default port, fragment or trailing slash, tracking parameters removed
+    and the remaining query parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_hash(url: Optional[str]) -> Optional[str]:
+    """Returns the SHA-256 hex digest of the normalized URL, or None for a missing URL."""
+    if not url:
+        return None
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+class SeenUrlCache:
+    """
+    A thread-safe LRU set of URL hashes already known to be stored, so repeat
+    lookups for the same articles skip the database round-trip. Deletes made
+    by other workers are not seen here, so callers pass the shared deletion
+    count to sync() and the cache starts over whenever it has moved.
+    """
+
+    def __init__(self, maxsize: int = SEEN_URL_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._items: OrderedDict[str, None] = OrderedDict()
+        self._lock = Lock()
+        self._generation: Optional[int] = None
+
+    def sync(self, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                self._items.clear()
+                self._generation = generation
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return True
+            return False
+
+    def add_many(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._items[key] = None
+                self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+
+    def discard_many(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+seen_urls = SeenUrlCache()
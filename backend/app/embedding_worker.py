@@ -0,0 +1,56 @@
+"""
+Standalone embedding worker. Run it as its own process so the API process
+never pays the embedding model's RAM cost:
+
+    uvicorn app.embedding_worker:app --port 8001
+
+It indexes new documents into the vector store in the background and serves
+POST /embed for the API's semantic search queries. Point the API at it with
+EMBEDDING_SERVICE_URL=http://localhost:8001 and VECTOR_INDEX_MODE=worker.
+"""
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from .database import open_async_session
+from .services import vector_db_service
+
+EMBEDDING_POLL_SECONDS = float(os.getenv("EMBEDDING_POLL_SECONDS", "10"))
+
+# This process *is* the embedding service, so it always uses its local model.
+vector_db_service.EMBEDDING_SERVICE_URL = None
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+async def _index_loop():
+    while True:
+        db = open_async_session()
+        try:
+            await vector_db_service.index_pending_documents(db)
+        except Exception as e:
+            logging.error(f"Embedding worker failed to index documents: {e}")
+        finally:
+            await db.close()
+        await asyncio.sleep(EMBEDDING_POLL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_task = asyncio.create_task(_index_loop())
+    yield
+    loop_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    vectors = await asyncio.to_thread(vector_db_service.encode_texts, request.texts)
+    return {"vectors": vectors.tolist()}
@@ -1,9 +1,13 @@
-from .database import engine, Base
-from .models import Task, Document
+from .database import engine
+from .models import Base, Task, Document
+from .migrations import upgrade_schema
 
 print("Creating database tables...")
 
 # This line creates the tables in the database
 Base.metadata.create_all(bind=engine)
 
+# Apply column/index changes that create_all() can't make to existing tables
+upgrade_schema(engine)
+
 print("Tables created successfully.")
\ No newline at end of file
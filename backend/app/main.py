@@ -1,131 +1,635 @@
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException
+import os
+import json
+import asyncio
+import logging
+import httpx
+from functools import wraps
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import AsyncIterator, Dict, List, Literal, Optional, Tuple
+from datetime import date
 from contextlib import asynccontextmanager
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-from . import crud, models, schemas
-from .database import engine, get_db, SessionLocal
-from .services import ai_service, news_service, alpha_vantage_service
+from . import crud, models, schemas, pagination, analytics, metrics
+from . import database
+from .database import engine, get_db, get_async_db, open_async_session, AsyncDB, SessionLocal
+from .services import ai_service, news_service, alpha_vantage_service, task_queue_service, vector_db_service, topic_extractor, summarizers
+from .services.http_client_service import http_clients, get_http_client
+from .services.summary_cache import summary_cache, SUMMARY_CACHE_PRUNE_MINUTES
+from .response_cache import response_cache, ResponseCacheMiddleware
+from .serialization import FastJSONResponse, raw_json
+from .dedup import url_hash
+from . import task_leases
+from .task_leases import lease_keeper
+from .services.stock_history_store import history_store
+from .services.research_scheduler import research_scheduler, parse_cron
+from .services import indicators as indicator_engine
 
+# Schema upgrades run once per deployment from app.init_db, not in every worker
 models.Base.metadata.create_all(bind=engine)
 
+# "inline" keeps the original blocking behaviour; "queue" hands work to the research queue.
+RESEARCH_DEFAULT_MODE = os.getenv("RESEARCH_DEFAULT_MODE", "inline")
+# Upper bound on articles summarized per research run; 0 means no limit
+MAX_ARTICLES_PER_RUN = int(os.getenv("MAX_ARTICLES_PER_RUN", "0"))
+# Most topics accepted by one POST /api/research/batch
+MAX_BATCH_TOPICS = int(os.getenv("MAX_BATCH_TOPICS", "20"))
+# How often /wait re-reads a task that another worker or the scheduler is running
+TASK_WAIT_POLL_SECONDS = float(os.getenv("TASK_WAIT_POLL_SECONDS", "0.5"))
 
-async def run_research_task(topic: str, db: Session):
+
+_vector_index_lock = asyncio.Lock()
+_background_tasks = set()
+
+async def _index_new_documents():
+    """Adds freshly ingested documents to the vector index, one indexing pass at a time."""
+    async with _vector_index_lock:
+        db = open_async_session()
+        try:
+            await vector_db_service.index_pending_documents(db)
+        except Exception as e:
+            logging.error(f"Vector indexing failed: {e}")
+        finally:
+            await db.close()
+
+def _schedule_vector_indexing():
+    if not vector_db_service.is_enabled() or vector_db_service.VECTOR_INDEX_MODE != "inline":
+        return
+    task = asyncio.create_task(_index_new_documents())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _select_new_articles(db: Session, articles: List[dict]) -> List[dict]:
+    """Drops articles that are already stored and applies MAX_ARTICLES_PER_RUN."""
+    existing_urls = crud.get_existing_document_urls(db, urls=[article['url'] for article in articles])
+    new_articles = [article for article in articles if article['url'] not in existing_urls]
+    return new_articles[:MAX_ARTICLES_PER_RUN] if MAX_ARTICLES_PER_RUN else new_articles
+
+def _mark_task_failed(db: Session, task_id: int):
+    """Discards the failed run's pending changes and records the failure."""
+    db.rollback()
+    crud.update_task_status(db, task_id=task_id, status="failed")
+
+def _to_documents(processed_articles: List[dict]) -> List[dict]:
+    return [
+        {
+            'source': article.get('source', {}).get('name', 'Unknown'),
+            'content': {
+                'title': article.get('title'),
+                'url': article.get('url'),
+                'description': article.get('description'),
+                'image': article.get('image')
+            },
+            'summary': article.get('summary') or None,
+            'topics': article.get('topics') or None,
+        }
+        for article in processed_articles
+    ]
+
+
+async def _save_timings(task_id: int, run_trace: metrics.Trace):
+    """
+    Stores a run's stage timings on its task, in a session of its own so the
+    rollback of a failed run does not take them along.
+    """
+    db = open_async_session()
+    try:
+        await db.run_sync(crud.save_task_timings, task_id, run_trace.to_dict())
+    except Exception as e:
+        logging.error(f"Could not save timings for task {task_id}: {e}")
+    finally:
+        await db.close()
+
+def _traced_research(pipeline):
+    """
+    Runs a research pipeline (task, or list of tasks for a batch, first) inside
+    a trace, counts its outcome and keeps its timings on every task.
+    """
+    @wraps(pipeline)
+    async def run(task, *args, **kwargs):
+        with metrics.trace() as run_trace:
+            status = "failed"
+            try:
+                with metrics.stage_span("total"):
+                    result = await pipeline(task, *args, **kwargs)
+                status = "completed"
+                return result
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            finally:
+                metrics.RESEARCH_RUNS.inc(status=status)
+                if metrics.TASK_TRACING:
+                    for traced in (task if isinstance(task, list) else [task]):
+                        await _save_timings(traced.id, run_trace)
+    return run
+
+
+@_traced_research
+async def _execute_research(task: models.Task, db: AsyncDB, client: Optional[httpx.AsyncClient] = None):
     """
-    This function now correctly processes and saves EACH news article
-    to the database individually.
+    Runs the research pipeline for an existing task. All processed articles
+    are saved in one batch, in the same commit that marks the task completed.
+    Database calls go through db.run_sync so they never block the event loop.
     """
-    task = crud.create_task(db=db, topic=topic)
-    news_data = await news_service.fetch_news_from_api(topic)
+    topic = task.topic
+    news_data = await news_service.fetch_news_from_api(topic, client=client)
     
     # --- FIX: Extract the 'articles' list from the API response object ---
     articles_list = news_data.get("articles", [])
 
     if not articles_list:
+        await db.run_sync(crud.update_task_status, task_id=task.id, status="completed")
         return {"articles": []}
 
-    # Now, use the correct 'articles_list' for all subsequent operations
-    urls_to_check = [article['url'] for article in articles_list]
-    existing_urls = crud.get_existing_document_urls(db, urls=urls_to_check)
+    # Now, use the correct 'articles_list' for all subsequent operations.
+    # Summaries are micro-batched, so every new article fits in the same latency budget.
+    with metrics.stage_span("dedup_query"):
+        articles_to_process = await db.run_sync(_select_new_articles, articles_list)
     
-    new_articles = [article for article in articles_list if article['url'] not in existing_urls]
-    
-    if not new_articles:
+    if not articles_to_process:
         print(f"--- All fetched articles for '{topic}' are duplicates. Returning existing task data. ---")
         # You might want to return the existing task or documents here
-        return task
-
-    # Process new articles with the AI service to get summaries and topics
-    # Let's process a smaller number to avoid long waits, e.g., the first 5
-    articles_to_process = new_articles[:2]
-    processed_articles = await ai_service.process_articles_concurrently(articles_to_process)
-
-    # Loop through each processed article and save it individually
-    for article in processed_articles:
-        # 1. Create a unique document record for this article
-        document = crud.create_document(
-            db=db,
-            task_id=task.id,
-            source=article.get('source', {}).get('name', 'Unknown'),
-            content={
-                'title': article.get('title'),
-                'url': article.get('url'),
-                'description': article.get('description'),
-                'image': article.get('image')
-            }
-        )
-
-        # 2. If a summary was generated, save it to the document's 'summary' field
-        if article.get("summary"):
-            crud.update_document_summary(
-                db=db,
-                document_id=document.id,
-                summary=article["summary"]
-            )
-        
-        # 3. If topics were generated, save them to the document's 'topics' field
-        if article.get("topics"):
-            crud.update_document_topics(
-                db=db,
-                document_id=document.id,
-                topics=article["topics"]
-            )
+        return await db.run_sync(crud.update_task_status, task_id=task.id, status="completed")
+
+    # Process new articles with the AI service to get summaries and topics.
+    processed_articles = await ai_service.process_articles_concurrently(articles_to_process, client=client)
+
+    # Save every processed article and the task's final status in one transaction
+    with metrics.stage_span("db_write", documents=len(processed_articles)):
+        await db.run_sync(crud.ingest_documents, task_id=task.id, documents=_to_documents(processed_articles), task_status="completed")
+    _schedule_vector_indexing()
     
     # Return the newly processed articles to the frontend
     return {"articles": processed_articles}
 
 
-async def daily_research_job():
-    print("--- SCHEDULER: Running daily research job for topic 'artificial intelligence' ---")
+@_traced_research
+async def _execute_research_streaming(task: models.Task, db: AsyncDB, client: httpx.AsyncClient, emit):
+    """
+    The research pipeline with progress reporting: emit(event, data) is called
+    as each provider answers, once the new articles are known, and for every
+    article as soon as its summary and topics are ready. Articles are still
+    saved together at the end, in the commit that completes the task.
+    """
+    news_data = await news_service.fetch_news_from_api(
+        task.topic,
+        client=client,
+        on_result=lambda provider, articles: emit("provider", {"provider": provider, "articles": articles}),
+    )
+    articles_list = news_data.get("articles", [])
+    with metrics.stage_span("dedup_query"):
+        articles_to_process = await db.run_sync(_select_new_articles, articles_list) if articles_list else []
+    emit("articles", {"fetched": len(articles_list), "new": len(articles_to_process)})
+
+    processed_articles = []
+    async for article in ai_service.iter_processed_articles(articles_to_process, client=client):
+        processed_articles.append(article)
+        emit("article", article)
+
+    if processed_articles:
+        with metrics.stage_span("db_write", documents=len(processed_articles)):
+            await db.run_sync(crud.ingest_documents, task_id=task.id, documents=_to_documents(processed_articles), task_status="completed")
+        _schedule_vector_indexing()
+    else:
+        await db.run_sync(crud.update_task_status, task_id=task.id, status="completed")
+    emit("done", {"task_id": task.id, "status": "completed", "articles": len(processed_articles)})
+
+
+async def stream_research_task(topic: str, client: httpx.AsyncClient) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Creates a task and yields (event, data) pairs while its pipeline runs.
+    The pipeline runs in its own task with its own session, so a client
+    that disconnects mid-stream does not abort the research or its save.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: dict):
+        events.put_nowait((event, data))
+
+    async def run():
+        db = open_async_session()
+        task = None
+        try:
+            task = await db.run_sync(crud.create_task, topic=topic)
+            emit("task", {"task_id": task.id, "topic": task.topic, "status": task.status})
+            await _execute_research_streaming(task, db, client, emit)
+        except Exception as e:
+            logging.error(f"Streaming research for '{topic}' failed: {e}")
+            if task is not None:
+                await db.run_sync(_mark_task_failed, task.id)
+            emit("error", {"task_id": task.id if task else None, "status": "failed", "detail": str(e)})
+        finally:
+            await db.close()
+            events.put_nowait(None)
+
+    pipeline = asyncio.create_task(run())
+    _background_tasks.add(pipeline)
+    pipeline.add_done_callback(_background_tasks.discard)
+    while (item := await events.get()) is not None:
+        yield item
+
+
+async def run_research_task(topic: str, db: AsyncDB, client: Optional[httpx.AsyncClient] = None):
+    """
+    Creates a task and runs the research pipeline inline, returning the
+    processed articles once everything has been fetched and saved.
+    """
+    task = await db.run_sync(crud.create_task, topic=topic)
+    try:
+        return await _execute_research(task, db, client=client)
+    except Exception:
+        await db.run_sync(_mark_task_failed, task.id)
+        raise
+
+
+def _pool_articles(groups: List[Tuple[List[str], List[dict]]], topics: List[str]) -> Dict[str, Tuple[dict, List[str]]]:
+    """
+    Pools the articles of every batch query, one per URL, each with the topics
+    it belongs to (in request order): every topic it mentions, or else only
+    the first topic of the query that returned it. Spreading an unmatched
+    article over the whole group would list it under topics it never mentions.
+    """
+    pooled = {}
+    for group, articles in groups:
+        for article in articles:
+            key = url_hash(article.get("url"))
+            if key is None:
+                continue
+            matched = news_service.match_topics(article, topics) or group[:1]
+            if key in pooled:
+                pooled[key][1].extend(topic for topic in matched if topic not in pooled[key][1])
+            else:
+                pooled[key] = (article, list(matched))
+    order = {topic: i for i, topic in enumerate(topics)}
+    for _, matched in pooled.values():
+        matched.sort(key=order.__getitem__)
+    return pooled
+
+@_traced_research
+async def _execute_research_batch(tasks: List[models.Task], db: AsyncDB, client: Optional[httpx.AsyncClient] = None):
+    """
+    Researches several topics together: provider queries cover groups of
+    topics, and the pooled articles go through one dedup query and one
+    summarization pass. Each article is linked to every task it matches, and
+    everything is saved in the one commit that completes all the tasks.
+    """
+    topics = [task.topic for task in tasks]
+    task_ids = {task.topic: task.id for task in tasks}
+    groups = await news_service.fetch_news_for_topics(topics, client=client)
+    pooled = _pool_articles(groups, topics)
+
+    with metrics.stage_span("dedup_query"):
+        existing_urls = set(await db.run_sync(crud.get_existing_document_urls, [article["url"] for article, _ in pooled.values()]))
+    new_articles = [article for article, _ in pooled.values() if article["url"] not in existing_urls]
+    if MAX_ARTICLES_PER_RUN:
+        new_articles = new_articles[:MAX_ARTICLES_PER_RUN]
+    kept_urls = existing_urls | {article["url"] for article in new_articles}
+    links = {article["url"]: [task_ids[topic] for topic in matched] for article, matched in pooled.values() if article["url"] in kept_urls}
+
+    processed_articles = await ai_service.process_articles_concurrently(new_articles, client=client) if new_articles else []
+
+    with metrics.stage_span("db_write", documents=len(processed_articles)):
+        await db.run_sync(crud.ingest_research_batch, list(task_ids.values()), _to_documents(processed_articles), links)
+    if processed_articles:
+        _schedule_vector_indexing()
+
+    return {
+        "tasks": [
+            {
+                "task_id": task.id,
+                "topic": task.topic,
+                "status": "completed",
+                "documents": sum(task.id in linked for linked in links.values()),
+                "new_documents": sum(links[article["url"]][0] == task.id for article in processed_articles),
+            }
+            for task in tasks
+        ],
+        "upstream_queries": len(groups),
+        "fetched_articles": sum(len(articles) for _, articles in groups),
+        "unique_articles": len(pooled),
+        "new_articles": len(processed_articles),
+    }
+
+async def run_research_batch(topics: List[str], db: AsyncDB, client: Optional[httpx.AsyncClient] = None):
+    """Creates one task per topic and researches them together (see _execute_research_batch)."""
+    tasks = [await db.run_sync(crud.create_task, topic=topic) for topic in topics]
+    try:
+        return await _execute_research_batch(tasks, db, client=client)
+    except Exception:
+        for task in tasks:
+            await db.run_sync(_mark_task_failed, task.id)
+        raise
+
+
+async def process_queued_task(task_id: int, topic: str):
+    """Handler used by the research queue workers for a previously queued task."""
+    db = open_async_session()
+    try:
+        task = await db.run_sync(crud.update_task_status, task_id=task_id, status="processing")
+        if task is None:
+            logging.warning(f"Queued task {task_id} no longer exists. Skipping.")
+            return
+        try:
+            await _execute_research(task, db)
+        except Exception:
+            await db.run_sync(_mark_task_failed, task_id)
+            raise
+    finally:
+        await db.close()
+
+
+def reconcile_analytics_job():
+    """Corrects drift in the analytics counters; runs on the scheduler leader only."""
     db = SessionLocal()
     try:
-        await run_research_task(topic="artificial intelligence", db=db)
-        print("--- SCHEDULER: Daily research job completed successfully. ---")
+        analytics.reconcile(db)
+    except Exception as e:
+        logging.error(f"Analytics reconciliation failed: {e}")
     finally:
         db.close()
 
+def prune_summary_cache_job():
+    """Keeps the summary_cache table within its TTL and row limit; runs on the scheduler leader only."""
+    try:
+        removed = summary_cache.prune()
+        if removed:
+            logging.info(f"Pruned {removed} summary cache entries.")
+    except Exception as e:
+        logging.error(f"Summary cache pruning failed: {e}")
+
+research_queue = task_queue_service.ResearchQueue(handler=process_queued_task)
+research_scheduler.add_system_job(
+    reconcile_analytics_job, IntervalTrigger(minutes=analytics.ANALYTICS_RECONCILE_MINUTES), "reconcile_analytics"
+)
+research_scheduler.add_system_job(
+    prune_summary_cache_job, IntervalTrigger(minutes=SUMMARY_CACHE_PRUNE_MINUTES), "prune_summary_cache"
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    scheduler = AsyncIOScheduler()
-    scheduler.add_job(daily_research_job, CronTrigger(hour=9, minute=0))
-    scheduler.start()
-    print("--- SCHEDULER: Scheduler started. Daily job is scheduled for 9:00 AM. ---")
+    await http_clients.start()
+    await response_cache.start()
+    await topic_extractor.get_extractor().start()
+    await summarizers.get_backend().start()
+    # Renews this worker's task leases and fails tasks left behind by workers that stopped
+    await lease_keeper.start()
+    await research_queue.start()
+    # Subscribed topics are researched through the same handler as queued tasks
+    await research_scheduler.start(handler=process_queued_task)
+    # The numpy index is in memory only, so it is rebuilt from the database on startup
+    if vector_db_service.VECTOR_BACKEND == "numpy":
+        _schedule_vector_indexing()
     yield
+    await research_scheduler.stop()
+    await research_queue.stop()
+    await lease_keeper.stop()
+    await summarizers.get_backend().shutdown()
+    await topic_extractor.get_extractor().shutdown()
+    await response_cache.close()
+    await http_clients.close()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 origins = [
     "http://localhost:3000",
     "https://autonomous-ai-worker-lr4u-m7v6p5x6-sumans-projects.vercel.app",
 ]
 
+# Innermost, so cached responses still pass through CORS and the request metrics
+app.add_middleware(ResponseCacheMiddleware, routes=app.router.routes)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.get("/")
 def read_root():
     return {"status": "ok"}
 
-@app.get("/api/tasks", response_model=List[schemas.Task])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    tasks = crud.get_tasks(db, skip=skip, limit=limit)
-    return tasks
+def _parse_page_params(cursor: Optional[str], fields: Optional[str]):
+    try:
+        return pagination.decode_cursor(cursor), pagination.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _task_details_page(db: Session, task_id: int, doc_limit: int, doc_cursor: Optional[str], fields: Optional[str]):
+    """The task with one page of its documents, or None if the task does not exist."""
+    after_id, columns = _parse_page_params(doc_cursor, fields)
+    task = crud.get_task(db, task_id=task_id)
+    if task is None:
+        return None
+    # Fetch one extra row to learn whether another page follows. Content is
+    # read as stored JSON text and written into the response unparsed.
+    documents = crud.get_task_documents(
+        db, task_id=task.id, limit=doc_limit + 1, after_id=after_id, fields=columns, raw_content=True
+    )
+    next_cursor = pagination.encode_cursor(documents[doc_limit - 1]["id"]) if len(documents) > doc_limit else None
+    documents = documents[:doc_limit]
+    for document in documents:
+        if "content" in document:
+            document["content"] = raw_json(document["content"])
+    return {
+        "id": task.id,
+        "topic": task.topic,
+        "status": task.status,
+        "created_at": task.created_at,
+        "documents": documents,
+        "next_document_cursor": next_cursor,
+        "timings": task.timings,
+    }
 
-@app.get("/api/tasks/{task_id}", response_model=schemas.TaskDetails)
-def read_task(task_id: int, db: Session = Depends(get_db)):
-    db_task = crud.get_task(db, task_id=task_id)
-    if db_task is None:
+def _search_result(doc: models.Document) -> dict:
+    """A search hit in the shape of schemas.DocumentSearchResult, built without validation."""
+    return {
+        "source": doc.source,
+        "summary": doc.summary,
+        "topics": doc.topics,
+        "content": doc.content,
+        "id": doc.id,
+        "task_id": doc.task_id,
+        "created_at": doc.created_at,
+        "rank": getattr(doc, "rank", 0.0),
+        "highlight": getattr(doc, "highlight", None),
+    }
+
+@app.get(
+    "/api/tasks",
+    response_model=List[schemas.TaskWithDocuments],
+    response_model_exclude_unset=True,
+)
+def read_tasks(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    include_documents: bool = False,
+    fields: Optional[str] = Query(None, description="Document columns to include, e.g. id,source,summary"),
+    db: Session = Depends(get_db),
+):
+    """
+    Newest tasks first. When more tasks follow, the X-Next-Cursor header holds
+    the cursor for the next page. include_documents=true also returns each
+    task's documents (restricted to `fields`), loaded in one extra query.
+    """
+    before_id, columns = _parse_page_params(cursor, fields)
+    if include_documents:
+        tasks = crud.get_tasks_with_documents(db, skip=skip, limit=limit + 1, before_id=before_id, fields=columns)
+    else:
+        tasks = crud.get_tasks(db, skip=skip, limit=limit + 1, before_id=before_id)
+    headers = {}
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers["X-Next-Cursor"] = pagination.encode_cursor(tasks[-1].id)
+
+    # Plain dicts, so "documents" is only present (and only touched) when it was asked for.
+    # They already have the response_model's shape, so they are returned without validating them again.
+    names = columns or pagination.DOCUMENT_FIELDS
+    results = []
+    for task in tasks:
+        item = {"id": task.id, "topic": task.topic, "status": task.status, "created_at": task.created_at}
+        if include_documents:
+            documents = sorted(task.documents + task.linked_documents, key=lambda doc: doc.id)
+            item["documents"] = [{name: getattr(doc, name) for name in names} for doc in documents]
+        results.append(item)
+    return FastJSONResponse(results, headers=headers)
+
+@app.get("/api/tasks/{task_id}", response_model=schemas.TaskDetailsPage, response_model_exclude_unset=True)
+def read_task(
+    task_id: int,
+    doc_limit: int = Query(100, ge=1, le=500),
+    doc_cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Document columns to include, e.g. id,source,summary"),
+    db: Session = Depends(get_db),
+):
+    """A task with one page of its documents; follow next_document_cursor for more."""
+    page = _task_details_page(db, task_id, doc_limit, doc_cursor, fields)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return FastJSONResponse(page)
+
+@app.get("/api/tasks/{task_id}/wait", response_model=schemas.TaskDetailsPage, response_model_exclude_unset=True)
+async def wait_for_task(
+    task_id: int,
+    timeout: float = Query(30.0, ge=0, le=300),
+    doc_limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = None,
+    db: AsyncDB = Depends(get_async_db),
+):
+    """
+    Blocks until a queued task finishes or the timeout expires, then returns
+    the task in whatever state it is in.
+    """
+    if research_queue.is_pending(task_id):
+        await research_queue.wait(task_id, timeout=timeout)
+    else:
+        # Run by another worker or by the scheduler, so only the task row tells when it is done
+        deadline = asyncio.get_running_loop().time() + timeout
+        while await db.run_sync(crud.get_task_status, task_id) in task_leases.UNFINISHED_STATUSES:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(TASK_WAIT_POLL_SECONDS, remaining))
+    page = await db.run_sync(_task_details_page, task_id, doc_limit, None, fields)
+    if page is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return db_task
+    return FastJSONResponse(page)
+
+@app.get("/api/queue/stats")
+def get_queue_stats():
+    return {**research_queue.stats(), "leases": lease_keeper.stats()}
+
+@app.get("/api/system/http-pool")
+def get_http_pool_stats():
+    """Connection pool usage of the shared HTTP client, per upstream host."""
+    return http_clients.stats()
+
+@app.get("/api/system/summary-cache")
+def get_summary_cache_stats():
+    return {**summary_cache.stats(), "summarizer": summarizers.stats()}
+
+@app.get("/api/system/providers")
+def get_provider_stats():
+    """Circuit breaker state of each news provider."""
+    return news_service.provider_stats()
+
+def _collect_runtime_metrics():
+    """Exports the stats the /api/system endpoints already keep, at scrape time."""
+    queue = research_queue.stats()
+    scheduler = research_scheduler.stats()
+    yield ("research_queue_jobs", "gauge", "Research queue jobs by state.",
+           [({"state": "queued"}, queue["queued"]), ({"state": "active"}, queue["active"])])
+    yield ("scheduler_runs", "gauge", "Scheduled research runs in progress or waiting for a slot.",
+           [({"state": "running"}, scheduler["running"]), ({"state": "waiting"}, scheduler["waiting"])])
+    yield ("scheduler_is_leader", "gauge", "1 if this worker holds the scheduler leader lock.",
+           [({}, int(scheduler["is_leader"]))])
+    yield ("news_provider_circuit_open", "gauge", "1 while a provider's circuit breaker is open.",
+           [({"provider": name}, int(stats["state"] == "open")) for name, stats in news_service.provider_stats().items()])
+
+    pools = [("sync", engine)] + ([("async", database.async_engine)] if database.async_engine is not None else [])
+    pool_stats = [(name, database.pool_stats(pool_engine)) for name, pool_engine in pools]
+    yield ("db_pool_checked_out", "gauge", "Database connections currently checked out.",
+           [({"engine": name}, stats.get("checked_out", 0)) for name, stats in pool_stats])
+    yield ("db_pool_checkouts_total", "counter", "Database connection checkouts.",
+           [({"engine": name}, stats.get("checkouts", 0)) for name, stats in pool_stats])
+    yield ("db_pool_checkout_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.",
+           [({"engine": name}, stats.get("timeouts", 0)) for name, stats in pool_stats])
+
+    summary = summary_cache.stats()
+    stock = alpha_vantage_service.stock_cache.stats()
+    indicators = indicator_engine.indicator_cache.stats()
+    responses = response_cache.stats()
+    yield ("cache_requests_total", "counter", "Cache lookups by cache and result.", [
+        ({"cache": "summary", "result": "hit"}, summary["memory_hits"] + summary["db_hits"]),
+        ({"cache": "summary", "result": "miss"}, summary["misses"]),
+        ({"cache": "stock", "result": "hit"}, stock["hits"]),
+        ({"cache": "stock", "result": "stale_hit"}, stock["stale_hits"]),
+        ({"cache": "stock", "result": "miss"}, stock["misses"]),
+        ({"cache": "indicators", "result": "hit"}, indicators["hits"]),
+        ({"cache": "indicators", "result": "miss"}, indicators["misses"]),
+        ({"cache": "response", "result": "hit"}, responses["hits"]),
+        ({"cache": "response", "result": "miss"}, responses["misses"]),
+    ])
+    yield ("response_cache_not_modified_total", "counter", "Requests answered with 304 Not Modified.",
+           [({}, responses["not_modified"])])
+
+metrics.REGISTRY.register_collector(_collect_runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/system/db-pool")
+def get_db_pool_stats():
+    """Connection pool usage and checkout wait times of the sync and async engines."""
+    return {
+        "async_mode": database.async_mode(),
+        "sync": database.pool_stats(engine),
+        "async": database.pool_stats(database.async_engine) if database.async_engine is not None else None,
+    }
+
+@app.get("/api/system/response-cache")
+def get_response_cache_stats():
+    """Hit rates, 304s and data versions of the HTTP response cache."""
+    return response_cache.stats()
+
+@app.get("/api/system/stock-cache")
+def get_stock_cache_stats():
+    return {
+        **alpha_vantage_service.stock_cache.stats(),
+        "history_store": history_store.stats(),
+        "indicators": indicator_engine.indicator_cache.stats(),
+    }
 
 @app.delete("/api/tasks/{task_id}")
 def delete_task_endpoint(task_id: int, db: Session = Depends(get_db)):
@@ -134,22 +638,183 @@ def delete_task_endpoint(task_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Task not found")
     return {"ok": True}
 
-@app.get("/api/search/history", response_model=List[schemas.Document])
-def search_history(q: str, db: Session = Depends(get_db)):
+@app.get("/api/search/history", response_model=List[schemas.DocumentSearchResult])
+def search_history(
+    q: str,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text searches saved documents (title, description, summary and topics),
+    best matches first, with matched terms highlighted.
+    """
+    search_results = crud.search_documents_by_text(db=db, query=q, limit=limit, offset=offset)
+    return FastJSONResponse([_search_result(doc) for doc in search_results])
+
+@app.get("/api/search/semantic", response_model=List[schemas.DocumentSearchResult])
+async def search_semantic(q: str, limit: int = Query(5, ge=1, le=50), db: AsyncDB = Depends(get_async_db)):
     """
-    Searches the database for documents containing the query text in their summary.
+    Searches saved documents by meaning using the vector index. The 'rank'
+    field holds the cosine similarity to the query.
     """
-    search_results = crud.search_documents_by_text(db=db, query=q)
-    return search_results
+    if not vector_db_service.is_enabled():
+        raise HTTPException(status_code=503, detail="Semantic search is disabled. Set VECTOR_BACKEND to enable it.")
+    hits = await vector_db_service.search_similar_documents(q, limit=limit)
+    documents = {doc.id: doc for doc in await db.run_sync(crud.get_documents_by_ids, [hit["id"] for hit in hits])}
+    results = []
+    for hit in hits:
+        doc = documents.get(hit["id"])
+        if doc is None:
+            continue
+        doc.rank = hit["score"]
+        doc.highlight = None
+        results.append(_search_result(doc))
+    return FastJSONResponse(results)
+
+@app.get("/api/subscriptions", response_model=List[schemas.Subscription])
+def read_subscriptions(db: Session = Depends(get_db)):
+    return crud.get_subscriptions(db)
+
+def _validate_cron(cron: str):
+    try:
+        parse_cron(cron)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cron expression '{cron}': {e}")
+
+@app.post("/api/subscriptions", response_model=schemas.Subscription, status_code=201)
+def create_subscription(subscription: schemas.SubscriptionCreate, db: Session = Depends(get_db)):
+    """Subscribes a topic to scheduled research; cron is a crontab expression in SCHEDULER_TIMEZONE."""
+    _validate_cron(subscription.cron)
+    if crud.get_subscription_by_topic(db, subscription.topic) is not None:
+        raise HTTPException(status_code=409, detail="This topic already has a subscription")
+    db_subscription = crud.create_subscription(db, topic=subscription.topic, cron=subscription.cron, enabled=subscription.enabled)
+    research_scheduler.request_sync()
+    return db_subscription
+
+@app.patch("/api/subscriptions/{subscription_id}", response_model=schemas.Subscription)
+def update_subscription(subscription_id: int, changes: schemas.SubscriptionUpdate, db: Session = Depends(get_db)):
+    if changes.cron is not None:
+        _validate_cron(changes.cron)
+    db_subscription = crud.update_subscription(db, subscription_id, **changes.model_dump(exclude_none=True))
+    if db_subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    research_scheduler.request_sync()
+    return db_subscription
+
+@app.delete("/api/subscriptions/{subscription_id}")
+def delete_subscription(subscription_id: int, db: Session = Depends(get_db)):
+    if crud.delete_subscription(db, subscription_id) is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    research_scheduler.request_sync()
+    return {"ok": True}
+
+@app.get("/api/subscriptions/{subscription_id}/runs", response_model=List[schemas.ScheduledRun])
+def read_subscription_runs(subscription_id: int, limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_db)):
+    """The most recent scheduled runs of a subscription, newest first."""
+    if crud.get_subscription(db, subscription_id) is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return crud.get_scheduled_runs(db, subscription_id=subscription_id, limit=limit)
+
+@app.get("/api/system/scheduler")
+def get_scheduler_stats(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
+    """Leader state, limits and upcoming jobs of the scheduler, plus per-topic run timings (slowest first)."""
+    return {**research_scheduler.stats(), "topics": crud.get_scheduled_run_stats(db, days=days)}
 
 @app.get("/api/analytics/stats")
-def get_analytics_stats(db: Session = Depends(get_db)):
-    stats = crud.get_db_stats(db)
+def get_analytics_stats(days: int = Query(30, ge=1, le=365), db: Session = Depends(get_db)):
+    # The response cache already serves repeats until the next write, and the
+    # short-lived stats cache underneath it would hand it pre-write numbers
+    stats = crud.get_analytics_stats(db, days=days, cached=not response_cache.enabled)
     return stats
 
 @app.get("/api/search/{topic}")
-async def search_news(topic: str, db: Session = Depends(get_db)):
-    return await run_research_task(topic=topic, db=db)
+async def search_news(
+    topic: str,
+    mode: Literal["inline", "queue"] = RESEARCH_DEFAULT_MODE,
+    db: AsyncDB = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    """
+    In 'inline' mode the research runs inside the request and the processed
+    articles are returned. In 'queue' mode a queued task is created and its id
+    is returned immediately; poll /api/tasks/{task_id} or wait on
+    /api/tasks/{task_id}/wait for the result.
+    """
+    if mode == "inline":
+        return await run_research_task(topic=topic, db=db, client=client)
+
+    if not research_queue.has_capacity():
+        raise HTTPException(status_code=429, detail="Research queue is full. Please retry later.")
+    task = await db.run_sync(crud.create_task, topic=topic, status="queued")
+    try:
+        research_queue.submit(task.id, topic)
+    except task_queue_service.QueueFullError as e:
+        await db.run_sync(crud.update_task_status, task_id=task.id, status="failed")
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={"task_id": task.id, "status": task.status})
+
+@app.post("/api/research/batch", response_model=schemas.ResearchBatchResult)
+async def research_batch(
+    request: schemas.ResearchBatchRequest,
+    db: AsyncDB = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    """
+    Researches several topics in one run, creating a task per topic. Topics
+    share provider queries, and an article found for several of them is
+    summarized and stored once but listed under each of their tasks.
+    """
+    # Case-insensitive duplicates would only split the same articles across two tasks
+    topics = {}
+    for topic in request.topics:
+        topics.setdefault(topic.strip().lower(), topic.strip())
+    topics = [topic for key, topic in topics.items() if key]
+    if not topics:
+        raise HTTPException(status_code=400, detail="No topics given.")
+    if len(topics) > MAX_BATCH_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TOPICS} topics per batch.")
+    return await run_research_batch(topics, db=db, client=client)
+
+@app.get("/api/search/{topic}/stream")
+async def stream_search_news(
+    topic: str,
+    format: Literal["sse", "ndjson"] = "sse",
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    """
+    Runs the research like /api/search/{topic} but streams progress as it
+    happens: `task` (created), `provider` (one per provider answer),
+    `articles` (how many are new), `article` (one per summarized article,
+    fastest first), then `done` or `error`. Served as Server-Sent Events, or
+    as newline-delimited JSON objects {"event", "data"} with format=ndjson.
+    """
+    async def body():
+        async for event, data in stream_research_task(topic, client):
+            if format == "sse":
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            else:
+                yield json.dumps({"event": event, "data": data}, default=str) + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # Ask proxies not to buffer, so each event reaches the client when it is produced
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+MAX_BULK_SYMBOLS = 50
+
+@app.get("/api/stocks")
+async def get_stocks_bulk(
+    symbols: str = Query(..., description="Comma-separated ticker symbols, e.g. AAPL,MSFT"),
+    include_history: bool = False,
+):
+    """Overviews (and optionally a year of history) for several symbols in one request."""
+    requested = [s.strip() for s in symbols.split(",") if s.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="No symbols given.")
+    if len(requested) > MAX_BULK_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_SYMBOLS} symbols per request.")
+    return await alpha_vantage_service.fetch_stocks_bulk(requested, include_history=include_history)
 
 @app.get("/api/stock/{symbol}")
 async def get_stock_data(symbol: str):
@@ -159,8 +824,33 @@ async def get_stock_data(symbol: str):
     return stock_data
 
 @app.get("/api/stock/{symbol}/history")
-async def get_stock_history(symbol: str):
-    history_data = await alpha_vantage_service.fetch_stock_history(symbol)
+async def get_stock_history(
+    symbol: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: Literal["1d", "1wk", "1mo"] = "1d",
+    format: Literal["records", "columns"] = "records",
+    indicators: str = Query("", description="e.g. sma:20,ema:50,rsi:14,macd:12:26:9,bbands:20:2,volatility:20,log_returns"),
+    downsample: Optional[int] = Query(None, ge=3, le=5000, description="Reduce the series to this many points (LTTB)"),
+):
+    """
+    Price history from the local history store. Without start/end the last
+    year is returned. `format=columns` returns one array per OHLCV field, and
+    each requested indicator adds its own field(s).
+    """
+    try:
+        spec = indicator_engine.parse_spec(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    history_data = await alpha_vantage_service.fetch_stock_history(
+        symbol,
+        start=start.isoformat() if start else None,
+        end=end.isoformat() if end else None,
+        interval=interval,
+        fmt=format,
+        spec=spec,
+        downsample=downsample,
+    )
     if isinstance(history_data, dict) and history_data.get("error"):
         raise HTTPException(status_code=404, detail=history_data["error"])
     return history_data
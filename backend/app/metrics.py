@@ -0,0 +1,277 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Store each task's stage timings in tasks.timings
+TASK_TRACING = os.getenv("TASK_TRACING", "true").lower() == "true"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, type, help, [(labels, value), ...]) as produced by collectors at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, object]) -> Labels:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {sorted(labelnames)}, got {sorted(labels)}")
+    return tuple((name, str(labels[name])) for name in labelnames)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# --- 1. METRIC TYPES ---
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in self._values.items()]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            row[index] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_label_key(self.labelnames, labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, row in self._values.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, float("inf")), row[:-1]):
+                    cumulative += count
+                    labels = _format_labels((*key, ("le", _format_value(bound))))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(row[-1])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+# --- 2. REGISTRY ---
+class Registry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text
+    format. Collectors are called at scrape time for values that already
+    live elsewhere (pool sizes, cache hit counts) rather than being copied
+    into metrics on every change.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}", *metric.render()]
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logging.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, metric_type, help, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {metric_type}"]
+                lines += [f"{name}{_format_labels(labels.items())} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "research_stage_seconds", "Time spent in each stage of a research run.", ["stage"]
+)
+PROVIDER_SECONDS = REGISTRY.histogram(
+    "news_provider_fetch_seconds", "Time taken by each news provider call, by outcome.", ["provider", "outcome"]
+)
+PROVIDER_FALLBACKS = REGISTRY.counter(
+    "news_provider_fallbacks_total", "Times a provider came back short and the next one was tried.", ["provider"]
+)
+PROVIDER_HEDGES = REGISTRY.counter(
+    "news_provider_hedges_total", "Times a slow provider made the hedged fetch start the next one."
+)
+PROVIDER_RETRIES = REGISTRY.counter(
+    "news_provider_retries_total", "Retries of news API calls after server errors.", ["function"]
+)
+SUMMARIZER_FAILURES = REGISTRY.counter(
+    "summarizer_failures_total", "Summarization requests that produced no summaries, by reason.", ["reason"]
+)
+SUMMARIZER_SECONDS = REGISTRY.histogram(
+    "summarizer_batch_seconds", "Time each summarizer backend took per batch of texts.", ["backend"]
+)
+SUMMARIZER_TOKENS = REGISTRY.counter(
+    "summarizer_tokens_total", "Tokens read and written by each summarizer backend.", ["backend", "direction"]
+)
+RESEARCH_RUNS = REGISTRY.counter(
+    "research_runs_total", "Research runs by outcome.", ["status"]
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template, method and status code.", ["method", "route", "status"]
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template, until the response body is sent.", ["method", "route"]
+)
+
+
+# --- 3. PER-TASK TRACES ---
+class Trace:
+    """The stage spans of one research run, stored on the task row when it finishes."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.spans: List[dict] = []
+
+    def add(self, stage: str, start: float, duration: float, attrs: dict):
+        self.spans.append({
+            "stage": stage,
+            "start_ms": round((start - self._start) * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+            **attrs,
+        })
+
+    def to_dict(self) -> dict:
+        return {"total_ms": round((time.perf_counter() - self._start) * 1000, 2), "spans": self.spans}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("research_trace", default=None)
+
+@contextmanager
+def trace():
+    """
+    Starts a trace for the code in the block. Tasks created inside it copy
+    the context, so their spans land in the same trace.
+    """
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def stage_span(stage: str, **attrs):
+    """
+    Times the block into research_stage_seconds and, inside a trace, records
+    it as a span. The yielded dict can be filled with extra span attributes.
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        current = _current_trace.get()
+        if current is not None:
+            current.add(stage, start, duration, attrs)
+
+async def timed(stage: str, awaitable, **attrs):
+    """Awaits `awaitable` inside stage_span(stage)."""
+    with stage_span(stage, **attrs):
+        return await awaitable
+
+
+# --- 4. ROUTE LATENCY ---
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latency per route template
+    (/api/tasks/{task_id}, not every task id). Latency runs until the last
+    body chunk is sent, so streamed responses are measured in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=route)
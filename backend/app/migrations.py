@@ -0,0 +1,114 @@
+import json
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import analytics, models
+from .dedup import url_hash
+from .search import setup_full_text_search
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _add_column_if_missing(engine: Engine, table: str, column: str, ddl_type: str):
+    columns = {c["name"] for c in inspect(engine).get_columns(table)}
+    if column not in columns:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _add_url_hash_column(engine: Engine):
+    """
+    Adds documents.url_hash to databases created before the column existed,
+    fills it in for existing rows and then builds the unique index. When older
+    rows share a URL only the first one gets the hash, so the index can be built.
+    """
+    inspector = inspect(engine)
+    if any(ix["name"] == "ix_documents_url_hash" for ix in inspector.get_indexes("documents")):
+        return
+
+    _add_column_if_missing(engine, "documents", "url_hash", "VARCHAR(64)")
+
+    with engine.begin() as conn:
+        seen = {
+            h for (h,) in conn.execute(text("SELECT url_hash FROM documents WHERE url_hash IS NOT NULL"))
+        }
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                text(
+                    "SELECT id, content FROM documents "
+                    "WHERE url_hash IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE},
+            ).all()
+            if not rows:
+                break
+            updates = []
+            for doc_id, content in rows:
+                last_id = doc_id
+                if isinstance(content, str):
+                    content = json.loads(content)
+                h = url_hash((content or {}).get("url"))
+                if h and h not in seen:
+                    seen.add(h)
+                    updates.append({"id": doc_id, "url_hash": h})
+            if updates:
+                conn.execute(text("UPDATE documents SET url_hash = :url_hash WHERE id = :id"), updates)
+
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_documents_url_hash ON documents (url_hash)"))
+
+
+# Arbitrary 64-bit key of the PostgreSQL advisory lock serializing the first analytics build
+ANALYTICS_INIT_LOCK_KEY = 7_412_905_118_206_233
+
+def _initialize_analytics(engine: Engine):
+    """
+    Builds the analytics counters from existing tasks and documents the first
+    time they are needed. On PostgreSQL a transaction-level advisory lock keeps
+    two concurrent init_db runs from both seeing an empty table and applying
+    the full counts twice; the lock is released by reconcile's commit.
+    """
+    with Session(engine) as db:
+        if engine.dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ANALYTICS_INIT_LOCK_KEY})
+        if not analytics.is_initialized(db):
+            analytics.reconcile(db)
+
+
+def _seed_default_subscription(engine: Engine):
+    """
+    Subscribes to the topic the old hardcoded daily job researched, so
+    upgraded deployments keep their 9:00 run. Skipped once the scheduler
+    has any history, so deleting every subscription sticks.
+    """
+    with Session(engine) as db:
+        if db.query(models.TopicSubscription.id).first() or db.query(models.ScheduledRun.id).first():
+            return
+        now = datetime.utcnow()
+        db.add(models.TopicSubscription(
+            topic="artificial intelligence", cron="0 9 * * *", enabled=True, created_at=now, updated_at=now
+        ))
+        db.commit()
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Brings an existing database up to date with changes that create_all()
+    cannot apply to tables that already exist. Safe to run on every startup.
+    """
+    _add_url_hash_column(engine)
+    setup_full_text_search(engine)
+
+    _add_column_if_missing(engine, "documents", "embedded_at", "TIMESTAMP")
+    _add_column_if_missing(engine, "tasks", "timings", "JSON")
+    _add_column_if_missing(engine, "tasks", "owner", "VARCHAR(64)")
+    _add_column_if_missing(engine, "tasks", "heartbeat_at", "TIMESTAMP")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_embedded_at ON documents (embedded_at)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_task_id_id ON documents (task_id, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_summary_cache_created_at ON summary_cache (created_at)"))
+
+    _initialize_analytics(engine)
+    _seed_default_subscription(engine)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index, Boolean, Float
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -11,8 +11,15 @@ class Task(Base):
     topic = Column(String, index=True)
     status = Column(String, default="processing")
     created_at = Column(DateTime, default=datetime.utcnow)
+    # The worker running the task and when it last renewed its lease (see app.task_leases)
+    owner = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    # Stage spans of the research run (see app.metrics.Trace); deferred so task lists don't load it
+    timings = deferred(Column(JSON, nullable=True))
 
     documents = relationship("Document", back_populates="task")
+    # Documents stored by another task that this one found as well (batch research)
+    linked_documents = relationship("Document", secondary="task_documents", viewonly=True, order_by="Document.id")
 
 class Document(Base):
     __tablename__ = "documents"
@@ -20,8 +27,98 @@ class Document(Base):
     task_id = Column(Integer, ForeignKey("tasks.id"))
     source = Column(String)
     content = Column(JSON) # Store the raw JSON content of the article/data
+    url_hash = Column(String(64), unique=True, index=True, nullable=True) # SHA-256 of the normalized article URL
     summary = Column(Text, nullable=True)
     topics = Column(Text, nullable=True) # New column to store extracted topics
+    embedded_at = Column(DateTime, nullable=True, index=True) # When the document was added to the vector index
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    task = relationship("Task", back_populates="documents")
\ No newline at end of file
+    task = relationship("Task", back_populates="documents")
+
+    # Serves paging through one task's documents in id order
+    __table_args__ = (Index("ix_documents_task_id_id", "task_id", "id"),)
+
+class TaskDocument(Base):
+    """
+    Links a document to a task other than the one that stored it, so an
+    article found for several topics is kept once but belongs to each task.
+    """
+    __tablename__ = "task_documents"
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+
+    # Serves moving a deleted task's documents to the other tasks that share them
+    __table_args__ = (Index("ix_task_documents_document_id", "document_id"),)
+
+class CacheVersion(Base):
+    """
+    A counter shared by all workers, bumped in the same transaction as the
+    writes it tracks: the data version of a response cache scope (see
+    app.response_cache), or the document deletions that retire seen-URL caches.
+    """
+    __tablename__ = "cache_versions"
+    scope = Column(String(32), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SummaryCacheEntry(Base):
+    __tablename__ = "summary_cache"
+    key = Column(String(64), primary_key=True) # SHA-256 of model name + normalized input text
+    model = Column(String)
+    summary = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True) # pruning deletes the oldest entries first
+
+class AnalyticsCounter(Base):
+    """
+    Materialized dashboard aggregates, kept up to date by crud on every task
+    and document write and periodically reconciled against the base tables.
+    """
+    __tablename__ = "analytics_counters"
+    metric = Column(String(32), primary_key=True) # e.g. "tasks", "tasks_per_day", "source_documents"
+    bucket = Column(String(10), primary_key=True) # YYYY-MM-DD, or "all" for running totals
+    key = Column(String, primary_key=True, default="") # topic or source name, empty when unused
+    value = Column(Integer, nullable=False, default=0)
+
+    # Serves "top N keys of a metric" without sorting the whole table
+    __table_args__ = (Index("ix_analytics_counters_metric_value", "metric", "bucket", "value"),)
+
+class TopicSubscription(Base):
+    """A topic researched on a cron schedule by the research scheduler."""
+    __tablename__ = "topic_subscriptions"
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String, unique=True, nullable=False)
+    cron = Column(String, nullable=False, default="0 9 * * *") # crontab expression, in SCHEDULER_TIMEZONE
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow) # Bumped on every change so the leader knows to reschedule
+
+    runs = relationship("ScheduledRun", back_populates="subscription")
+
+class ScheduledRun(Base):
+    """One firing of a subscription, with how long it waited for a slot and how long it ran."""
+    __tablename__ = "scheduled_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    subscription_id = Column(Integer, ForeignKey("topic_subscriptions.id", ondelete="SET NULL"), nullable=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
+    topic = Column(String, index=True)
+    status = Column(String, default="waiting") # waiting, running, completed, failed or cancelled
+    fired_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True) # After waiting for the concurrency and rate limits
+    finished_at = Column(DateTime, nullable=True)
+    wait_seconds = Column(Float, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+    subscription = relationship("TopicSubscription", back_populates="runs")
+
+    # Serves the run history of one subscription, newest first
+    __table_args__ = (Index("ix_scheduled_runs_subscription_id_id", "subscription_id", "id"),)
+
+class SchedulerLease(Base):
+    """
+    Leader election for databases without advisory locks: the worker whose
+    lease has not expired runs the scheduler and keeps renewing it.
+    """
+    __tablename__ = "scheduler_leases"
+    name = Column(String(64), primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
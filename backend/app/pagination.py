@@ -0,0 +1,33 @@
+import base64
+import binascii
+from typing import Iterable, List, Optional
+
+# Document columns a client may ask for with ?fields=; "id" is always returned
+# because it is what the next page's cursor is built from.
+DOCUMENT_FIELDS = ("id", "task_id", "source", "content", "summary", "topics", "created_at")
+
+
+def encode_cursor(last_id: int) -> str:
+    """An opaque cursor pointing just past the row with id last_id."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Returns the id a cursor points past, or None for no cursor. Raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str] = DOCUMENT_FIELDS) -> Optional[List[str]]:
+    """Parses "id,summary,topics" into a column list, or None for all columns. Raises ValueError on unknown names."""
+    if not fields:
+        return None
+    allowed = tuple(allowed)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(allowed)}.")
+    return [f for f in allowed if f == "id" or f in requested]
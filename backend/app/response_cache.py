@@ -0,0 +1,464 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+from . import models
+from .database import open_async_session
+
+# --- 1. SETUP ---
+load_dotenv()
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# "memory" (per-process LRU) or "redis" (shared by all workers; needs the redis package)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Bodies larger than this are served but not cached
+RESPONSE_CACHE_MAX_BODY = int(os.getenv("RESPONSE_CACHE_MAX_BODY", str(2 * 1024 * 1024)))
+# Per-route TTL overrides as JSON, e.g. {"/api/tasks": 60}
+RESPONSE_CACHE_TTLS = json.loads(os.getenv("RESPONSE_CACHE_TTLS", "{}"))
+# Seconds a data version read from the database is reused; writes made by this
+# process are seen at once, writes by other workers after at most this long
+RESPONSE_CACHE_VERSION_TTL = float(os.getenv("RESPONSE_CACHE_VERSION_TTL", "1"))
+
+
+class CachePolicy:
+    """
+    How one route is cached. Responses of a route with a `scope` are keyed by
+    that scope's data version, so any write to its tables retires them before
+    their TTL. `max_age` is what clients may reuse without asking; 0 makes
+    them revalidate every time, which costs a 304 while nothing changed.
+    """
+
+    def __init__(self, ttl: float, scope: Optional[str] = None, max_age: int = 0):
+        self.ttl = ttl
+        self.scope = scope
+        self.max_age = max_age
+
+    @property
+    def cache_control(self) -> str:
+        return f"max-age={self.max_age}" if self.max_age else "no-cache"
+
+
+ROUTE_POLICIES: Dict[str, CachePolicy] = {
+    "/api/tasks": CachePolicy(ttl=300, scope="tasks"),
+    "/api/tasks/{task_id}": CachePolicy(ttl=300, scope="tasks"),
+    "/api/search/history": CachePolicy(ttl=300, scope="tasks"),
+    # The stats cover "the last N days", so they also age out with time
+    "/api/analytics/stats": CachePolicy(ttl=60, scope="tasks"),
+    "/api/stock/{symbol}": CachePolicy(ttl=60, max_age=60),
+    "/api/stocks": CachePolicy(ttl=60, max_age=60),
+    "/api/stock/{symbol}/history": CachePolicy(ttl=300, max_age=300),
+}
+for _route, _ttl in RESPONSE_CACHE_TTLS.items():
+    if _route in ROUTE_POLICIES:
+        ROUTE_POLICIES[_route].ttl = float(_ttl)
+
+# Tables whose writes change the responses of each scope
+TABLE_SCOPES = {"tasks": "tasks", "documents": "tasks", "task_documents": "tasks"}
+# Columns no cached response shows; changes to only these keep cached responses
+UNCACHED_COLUMNS = {"documents": {"embedded_at"}, "tasks": {"owner", "heartbeat_at"}}
+
+# Response headers that are regenerated per response rather than stored
+_PER_RESPONSE_HEADERS = {b"content-length", b"date", b"server", b"etag", b"cache-control"}
+
+# (status, headers, body, etag)
+Entry = Tuple[int, List[Tuple[bytes, bytes]], bytes, str]
+
+
+# --- 2. BACKENDS ---
+class MemoryBackend:
+    """An LRU of responses in this process, each with its own expiry."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, Tuple[Entry, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    async def set(self, key: str, entry: Entry, ttl: float):
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self._maxsize, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """
+    Responses in Redis (or anything speaking its protocol, e.g. Valkey or
+    KeyDB), so every worker shares one cache.
+    """
+
+    name = "redis"
+    prefix = "response-cache:"
+
+    def __init__(self, url: str = RESPONSE_CACHE_REDIS_URL):
+        self._url = url
+        self._client = None
+
+    async def start(self):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(self._url)
+        await self._client.ping()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, key: str) -> Optional[Entry]:
+        raw = await self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in data["headers"]]
+        return data["status"], headers, data["body"].encode("utf-8"), data["etag"]
+
+    async def set(self, key: str, entry: Entry, ttl: float):
+        status, headers, body, etag = entry
+        raw = json.dumps({
+            "status": status,
+            "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in headers],
+            "body": body.decode("utf-8"),
+            "etag": etag,
+        })
+        await self._client.set(self.prefix + key, raw, px=max(1, int(ttl * 1000)))
+
+    def stats(self) -> dict:
+        return {"url": self._url.rsplit("@", 1)[-1]}
+
+
+# --- 3. CACHE ---
+class ResponseCache:
+    """
+    Caches whole GET responses of the routes in ROUTE_POLICIES. Every cached
+    response carries a strong ETag built from its scope's data version and a
+    hash of the body, and requests whose If-None-Match matches get a 304.
+    Data versions live in the cache_versions table, so a write made by any
+    worker (or the scheduler leader) retires the entries of every worker.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.enabled = RESPONSE_CACHE_ENABLED
+        self._versions: Dict[str, Tuple[int, float]] = {} # scope -> (version, when it was read)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    async def start(self):
+        if not self.enabled or RESPONSE_CACHE_BACKEND != "redis":
+            return
+        backend = RedisBackend()
+        try:
+            await backend.start()
+        except Exception as e:
+            logging.error(f"Response cache could not use Redis ({e}); using the in-memory cache instead.")
+            return
+        self.backend = backend
+        logging.info("Response cache is using Redis.")
+
+    async def close(self):
+        await self.backend.close()
+
+    def invalidate(self, scopes: Set[str]):
+        """Forgets the versions this process read, after it committed a write to the scopes."""
+        for scope in scopes:
+            self.invalidations += 1
+            self._versions.pop(scope, None)
+
+    async def version(self, scope: Optional[str]) -> Optional[int]:
+        if not scope:
+            return None
+        known = self._versions.get(scope)
+        if known is not None and time.monotonic() - known[1] < RESPONSE_CACHE_VERSION_TTL:
+            return known[0]
+        read_at = time.monotonic()
+        db = open_async_session()
+        try:
+            version = await db.run_sync(read_version, scope)
+        finally:
+            await db.close()
+        self._versions[scope] = (version, read_at)
+        return version
+
+    async def get(self, key: str) -> Optional[Entry]:
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logging.error(f"Response cache lookup failed: {e}")
+            return None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def set(self, key: str, entry: Entry, ttl: float):
+        try:
+            await self.backend.set(key, entry, ttl)
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logging.error(f"Response cache store failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            **self.backend.stats(),
+            "versions": {scope: version for scope, (version, _) in self._versions.items()},
+            "routes": {route: {"ttl": p.ttl, "scope": p.scope, "cache_control": p.cache_control} for route, p in ROUTE_POLICIES.items()},
+        }
+
+
+response_cache = ResponseCache()
+
+
+# --- 4. INVALIDATION ON COMMIT ---
+# Every Session (including the ones inside AsyncSession) records which scopes
+# its flushes and bulk statements touched. Once the write has committed, their
+# versions are bumped in a short transaction of their own, one upsert per
+# scope, so concurrent writers never hold the version row for the length of
+# their own transactions.
+def read_version(db: Session, scope: str) -> int:
+    return db.query(models.CacheVersion.version).filter(models.CacheVersion.scope == scope).scalar() or 0
+
+def bump_versions(bind: Engine, scopes: Set[str]):
+    table = models.CacheVersion.__table__
+    with bind.begin() as conn:
+        for scope in sorted(scopes):
+            if bind.dialect.name in ("postgresql", "sqlite"):
+                insert = postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
+                stmt = insert(table).values(scope=scope, version=1)
+                conn.execute(stmt.on_conflict_do_update(index_elements=["scope"], set_={"version": table.c.version + 1}))
+            elif not conn.execute(
+                update(table).where(table.c.scope == scope).values(version=table.c.version + 1)
+            ).rowcount:
+                conn.execute(table.insert().values(scope=scope, version=1))
+
+def mark_changed(session: Session, scopes: Set[str]):
+    """Bumps the versions of scopes when the session next commits, e.g. for writes the table hooks cannot see."""
+    session.info.setdefault("response_cache_scopes", set()).update(scopes)
+
+def _mark(session: Session, tables):
+    scopes = {TABLE_SCOPES[t] for t in tables if t in TABLE_SCOPES}
+    if scopes:
+        mark_changed(session, scopes)
+
+def _shows_change(obj) -> bool:
+    """Whether a flushed change to obj touches a column that cached responses show."""
+    hidden = UNCACHED_COLUMNS.get(obj.__table__.name)
+    if not hidden:
+        return True
+    changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+    return not changed or not changed <= hidden
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    _mark(session, {
+        obj.__table__.name for obj in (*session.new, *session.deleted, *(o for o in session.dirty if _shows_change(o)))
+    })
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        # Bulk statements that only write uncached columns opt out with invalidates_responses=False
+        if not orm_execute_state.execution_options.get("invalidates_responses", True):
+            return
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _mark(orm_execute_state.session, {table.name})
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    scopes = session.info.pop("response_cache_scopes", None)
+    if scopes and not response_cache.enabled:
+        # Other scopes, such as crud.DOCUMENT_DELETIONS, are versioned for other readers
+        scopes -= set(TABLE_SCOPES.values())
+    if not scopes:
+        return
+    try:
+        bump_versions(session.get_bind(), scopes)
+    except Exception as e:
+        # The write itself is committed; other workers see it once their cached entries expire
+        response_cache.errors += 1
+        logging.error(f"Response cache version bump failed: {e}")
+    response_cache.invalidate(scopes)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("response_cache_scopes", None)
+
+
+# --- 5. MIDDLEWARE ---
+def _etag(version: Optional[int], body: bytes) -> str:
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return f'"v{version}-{digest}"' if version is not None else f'"{digest}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware serving cacheable GET routes from the response cache.
+    Misses are buffered, stored if they are a 200 within the size limit, and
+    returned with ETag and Cache-Control headers.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    def _policy(self, scope) -> Optional[Tuple[str, CachePolicy]]:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                policy = ROUTE_POLICIES.get(getattr(route, "path", None))
+                if policy is None:
+                    return None
+                # Hits never reach the router, so record the route for the request metrics here
+                scope["route"] = route
+                return route.path, policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not response_cache.enabled:
+            await self.app(scope, receive, send)
+            return
+        matched = self._policy(scope)
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+        route, policy = matched
+
+        headers = {name: value for name, value in scope["headers"]}
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1") or None
+        try:
+            version = await response_cache.version(policy.scope)
+        except Exception as e:
+            # Without the current version a cached response could be stale, so skip the cache
+            response_cache.errors += 1
+            logging.error(f"Response cache version lookup failed: {e}")
+            await self.app(scope, receive, send)
+            return
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        key = f"{route}|{scope['path']}?{query}|v{version}"
+
+        entry = None
+        if b"no-cache" not in headers.get(b"cache-control", b""):
+            entry = await response_cache.get(key)
+        if entry is None:
+            entry = await self._render(scope, receive, send, policy, version, key)
+            if entry is None:
+                # Not cacheable; the response has already been sent as is
+                return
+
+        status, stored_headers, body, etag = entry
+        length = (b"content-length", str(len(body)).encode("latin-1"))
+        if status != 200:
+            await send({"type": "http.response.start", "status": status, "headers": [*stored_headers, length]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        cache_headers = [(b"etag", etag.encode("latin-1")), (b"cache-control", policy.cache_control.encode("latin-1"))]
+        if _etag_matches(if_none_match, etag):
+            response_cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [*stored_headers, *cache_headers, length],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _render(self, scope, receive, send, policy: CachePolicy, version: Optional[int], key: str) -> Optional[Entry]:
+        """
+        Runs the route with its response held back. Returns the response as an
+        entry (stored if it is cacheable), or None after passing through a
+        response that could not be buffered, such as a stream.
+        """
+        start_message = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def buffer(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body") and sum(map(len, chunks)) > RESPONSE_CACHE_MAX_BODY:
+                    passthrough = True
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+
+        await self.app(scope, receive, buffer)
+        if passthrough:
+            return None
+
+        body = b"".join(chunks)
+        status = start_message["status"]
+        headers = [(name, value) for name, value in start_message.get("headers", []) if name.lower() not in _PER_RESPONSE_HEADERS]
+        etag = _etag(version, body)
+        entry = (status, headers, body, etag)
+        if status == 200 and len(body) <= RESPONSE_CACHE_MAX_BODY:
+            await response_cache.set(key, entry, policy.ttl)
+        return entry
@@ -19,6 +19,22 @@ class Document(DocumentBase):
     class Config:
         from_attributes = True
 
+# Schema for a full-text search hit, with its relevance and a highlighted snippet
+class DocumentSearchResult(Document):
+    rank: float = 0.0
+    highlight: Optional[str] = None
+
+# Schema for a document restricted to the columns asked for with ?fields=;
+# columns that were not requested are left out of the response
+class DocumentFields(BaseModel):
+    id: int
+    task_id: Optional[int] = None
+    source: Optional[str] = None
+    summary: Optional[str] = None
+    topics: Optional[str] = None
+    content: Optional[dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
 # --- Task Schemas ---
 # Used as a base to avoid repetition
 class TaskBase(BaseModel):
@@ -36,4 +52,73 @@ class Task(TaskBase):
 # --- SOLVED: This is the missing TaskDetails schema ---
 # For reading a single task WITH its list of documents.
 class TaskDetails(Task):
-    documents: List[Document] = []
\ No newline at end of file
+    documents: List[Document] = []
+
+# A task with one page of its documents; pass next_document_cursor back as
+# doc_cursor to get the next page
+class TaskDetailsPage(Task):
+    documents: List[DocumentFields] = []
+    next_document_cursor: Optional[str] = None
+    # Stage timings of the research run ({"total_ms", "spans": [...]}), when tracing is on
+    timings: Optional[dict[str, Any]] = None
+
+# A task in a list that was asked to include its documents
+class TaskWithDocuments(Task):
+    documents: List[DocumentFields] = []
+
+# For researching several topics at once with POST /api/research/batch
+class ResearchBatchRequest(BaseModel):
+    topics: List[str]
+
+# One topic of a batch: documents counts every article linked to its task,
+# new_documents the ones this batch stored under it
+class ResearchBatchTask(BaseModel):
+    task_id: int
+    topic: str
+    status: str
+    documents: int
+    new_documents: int
+
+class ResearchBatchResult(BaseModel):
+    tasks: List[ResearchBatchTask]
+    upstream_queries: int
+    fetched_articles: int
+    unique_articles: int
+    new_articles: int
+
+# --- Scheduler Schemas ---
+# For creating a topic subscription; cron is a crontab expression such as "0 9 * * *"
+class SubscriptionCreate(BaseModel):
+    topic: str
+    cron: str = "0 9 * * *"
+    enabled: bool = True
+
+# For changing a subscription; fields left out are not changed
+class SubscriptionUpdate(BaseModel):
+    cron: Optional[str] = None
+    enabled: Optional[bool] = None
+
+class Subscription(SubscriptionCreate):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# One firing of a subscription and how it went
+class ScheduledRun(BaseModel):
+    id: int
+    subscription_id: Optional[int] = None
+    task_id: Optional[int] = None
+    topic: str
+    status: str
+    fired_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wait_seconds: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,190 @@
+import re
+import html
+from typing import List, Optional
+from sqlalchemy import text, func, literal_column, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import models
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# The database marks matches with these private-use characters; the snippet is
+# HTML-escaped before they become tags, so stored text can't inject markup
+_MATCH_START = "\ue000"
+_MATCH_END = "\ue001"
+
+# Relative importance of each field: a hit in the title or topics counts for
+# more than one buried in the description.
+SQLITE_BM25_WEIGHTS = {"title": 10.0, "description": 3.0, "summary": 5.0, "topics": 8.0}
+
+# --- 1. INDEX SETUP ---
+_POSTGRES_SETUP = [
+    """
+    ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(content->>'title', '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(topics, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content->>'description', '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_documents_search_vector ON documents USING GIN (search_vector)",
+]
+
+_SQLITE_FIELDS = """
+    json_extract(new.content, '$.title'), json_extract(new.content, '$.description'), new.summary, new.topics
+"""
+
+_SQLITE_SETUP = [
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, title, description, summary, topics)
+        VALUES (new.id, %s);
+    END
+    """ % _SQLITE_FIELDS,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF content, summary, topics ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.id;
+        INSERT INTO documents_fts(rowid, title, description, summary, topics)
+        VALUES (new.id, %s);
+    END
+    """ % _SQLITE_FIELDS,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+
+def setup_full_text_search(engine: Engine):
+    """
+    Creates the full-text index over title, description, summary and topics.
+    Postgres uses a generated tsvector column with a GIN index; SQLite uses an
+    FTS5 table kept in sync by triggers. Either way the database maintains the
+    index on every insert/update, including bulk ingests.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            for statement in _POSTGRES_SETUP:
+                conn.execute(text(statement))
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'")
+            ).first()
+            if not exists:
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE documents_fts USING fts5("
+                    "title, description, summary, topics, tokenize = 'porter unicode61')"
+                ))
+                conn.execute(text(
+                    "INSERT INTO documents_fts(rowid, title, description, summary, topics) "
+                    "SELECT id, json_extract(content, '$.title'), json_extract(content, '$.description'), "
+                    "summary, topics FROM documents"
+                ))
+            for statement in _SQLITE_SETUP:
+                conn.execute(text(statement))
+
+
+# --- 2. QUERYING ---
+def _render_highlight(snippet: Optional[str]) -> Optional[str]:
+    if snippet is None:
+        return None
+    return html.escape(snippet, quote=False).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+def _fts5_query(query: str) -> str:
+    """Turns free text into an FTS5 query of quoted terms, so user input can't break MATCH syntax."""
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+
+
+def _search_postgres(db: Session, query: str, limit: int, offset: int) -> List[models.Document]:
+    ts_query = func.websearch_to_tsquery("english", query)
+    search_vector = literal_column("documents.search_vector")
+    rank = func.ts_rank_cd(search_vector, ts_query, 32).label("rank")
+    rows = (
+        db.query(models.Document, rank)
+        .filter(search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), models.Document.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    if not rows:
+        return []
+
+    # Headlines are expensive, so only build them for the page being returned
+    ids = [doc.id for doc, _ in rows]
+    headline_source = func.coalesce(models.Document.summary, models.Document.content["description"].as_string(), "")
+    options = f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxFragments=2"
+    headlines = dict(
+        db.query(models.Document.id, func.ts_headline("english", headline_source, ts_query, options))
+        .filter(models.Document.id.in_(ids))
+        .all()
+    )
+    results = []
+    for doc, score in rows:
+        doc.rank = float(score)
+        doc.highlight = _render_highlight(headlines.get(doc.id))
+        results.append(doc)
+    return results
+
+
+def _search_sqlite(db: Session, query: str, limit: int, offset: int) -> List[models.Document]:
+    match = _fts5_query(query)
+    if not match:
+        return []
+    weights = ", ".join(str(w) for w in SQLITE_BM25_WEIGHTS.values())
+    rows = db.execute(
+        text(
+            f"SELECT rowid, bm25(documents_fts, {weights}) AS score, "
+            f"snippet(documents_fts, -1, :start, :end, '…', 24) AS highlight "
+            "FROM documents_fts WHERE documents_fts MATCH :match "
+            "ORDER BY score, rowid DESC LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "start": _MATCH_START, "end": _MATCH_END, "limit": limit, "offset": offset},
+    ).all()
+    if not rows:
+        return []
+
+    docs = {doc.id: doc for doc in db.query(models.Document).filter(models.Document.id.in_([r[0] for r in rows]))}
+    results = []
+    for doc_id, score, highlight in rows:
+        doc = docs.get(doc_id)
+        if doc is None:
+            continue
+        # bm25() returns lower-is-better scores; flip the sign so higher ranks first
+        doc.rank = -score
+        doc.highlight = _render_highlight(highlight)
+        results.append(doc)
+    return results
+
+
+def _search_fallback(db: Session, query: str, limit: int, offset: int) -> List[models.Document]:
+    pattern = f"%{query}%"
+    docs = db.query(models.Document).filter(
+        or_(models.Document.summary.ilike(pattern), models.Document.topics.ilike(pattern))
+    ).order_by(models.Document.id.desc()).offset(offset).limit(limit).all()
+    for doc in docs:
+        doc.rank = 0.0
+        doc.highlight = None
+    return docs
+
+
+def search_documents(db: Session, query: str, limit: int = 10, offset: int = 0) -> List[models.Document]:
+    """
+    Ranked full-text search across title, description, summary and topics.
+    Each returned document carries two extra attributes: 'rank' (higher is
+    better) and 'highlight' (an HTML-escaped snippet with the matched terms
+    wrapped in <mark>).
+    """
+    if not query or not query.strip():
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return _search_postgres(db, query, limit, offset)
+    if dialect == "sqlite":
+        return _search_sqlite(db, query, limit, offset)
+    return _search_fallback(db, query, limit, offset)
@@ -0,0 +1,56 @@
+import json
+import logging
+from datetime import date, time
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logging.warning("orjson is not installed; responses will be serialized with the standard json module.")
+
+# orjson >= 3.9 can splice already-serialized JSON into its output
+RAW_JSON_SUPPORTED = orjson is not None and hasattr(orjson, "Fragment")
+
+
+def _default(value: Any):
+    """
+    Types orjson does not know natively (Decimal, sets, numpy scalars without
+    OPT_SERIALIZE_NUMPY), plus the dates and numpy arrays orjson handles itself
+    but the standard json module does not.
+    """
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    The app's default response class: JSONResponse rendered with orjson when it
+    is installed. Routes that return one directly skip FastAPI's response_model
+    validation, so their payload must already have the documented shape.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def raw_json(text: Optional[str]) -> Any:
+    """
+    Wraps JSON text read straight from the database so it is written into the
+    response as is, without a parse-and-reserialize round trip. Falls back to
+    parsing when the installed orjson cannot embed raw JSON.
+    """
+    if text is None:
+        return None
+    if RAW_JSON_SUPPORTED:
+        return orjson.Fragment(text)
+    return orjson.loads(text) if orjson is not None else json.loads(text)
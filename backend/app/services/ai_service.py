@@ -1,70 +1,92 @@
-import os
 import httpx
 import asyncio
 from dotenv import load_dotenv
-from textblob import TextBlob
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
+from .http_client_service import http_clients
+from .summary_cache import summary_cache
+from . import summarizers
+from . import topic_extractor
+from .. import metrics
 
 load_dotenv()
 
-HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
-HEADERS = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
-TIMEOUT = httpx.Timeout(20.0) # Reduced timeout
-
-SUMMARIZATION_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
-
 async def _call_summarizer(client: httpx.AsyncClient, text: str):
-    """Helper function to call the summarization API with detailed logging."""
-    try:
-        if not HUGGINGFACE_TOKEN:
-            print("Summarization failed: HUGGINGFACE_TOKEN not set.")
-            return None
-            
-        response = await client.post(
-            SUMMARIZATION_URL, headers=HEADERS, json={"inputs": text}, timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        result = response.json()
-        
-        if isinstance(result, dict) and result.get("error"):
-            print(f"Summarization API returned an error: {result['error']}")
-            return None
+    """Summarizes one text with the configured backend (see summarizers.py)."""
+    return await summarizers.get_backend().summarize(client, text)
 
-        return result[0].get("summary_text")
+def _article_text(article: Dict) -> Optional[str]:
+    return article.get("content") or article.get("description")
 
-    except httpx.HTTPStatusError as e:
-        print(f"Summarization API call failed with status {e.response.status_code}: {e.response.text}")
-        return None
-    except httpx.TimeoutException:
-        print("Summarization API call timed out after 20 seconds.")
-        return None
-    except Exception as e:
-        print(f"An unexpected error occurred during summarization: {e}")
-        return None
-
-async def _process_single_article(client: httpx.AsyncClient, article: Dict):
-    """Processes a single article to add a summary and topics."""
-    text_to_process = article.get("content") or article.get("description")
+async def _summarize_article(client: httpx.AsyncClient, article: Dict):
+    """Adds a summary to the article, using the summary cache before the summarizer backend."""
+    text_to_process = _article_text(article)
     if not text_to_process:
         return article
 
-    summary = await _call_summarizer(client, text_to_process)
+    # The same text (a wire story carried by several providers, a re-run) is only summarized once
+    model = summarizers.get_backend().model
+    summary = await summary_cache.get(text_to_process, model)
+    if summary is None:
+        summary = await _call_summarizer(client, text_to_process)
+        if summary:
+            await summary_cache.put(text_to_process, model, summary)
+    if not summary:
+        # Not cached, so the main backend gets another chance on the next run
+        fallback = summarizers.get_fallback()
+        if fallback is not None:
+            summary = await fallback.summarize(client, text_to_process)
     if summary:
         article["summary"] = summary
-
-    try:
-        blob = TextBlob(text_to_process)
-        topics = list(set([phrase.strip() for phrase in blob.noun_phrases]))[:3]
-        article["topics"] = ", ".join(topics)
-    except Exception as e:
-        print(f"Topic extraction failed: {e}")
-        article["topics"] = None
-        
     return article
 
-async def process_articles_concurrently(articles: List[Dict]) -> List[Dict]:
-    """Processes a list of articles concurrently to generate summaries and topics."""
-    async with httpx.AsyncClient() as client:
-        tasks = [_process_single_article(client, article) for article in articles]
-        processed_articles = await asyncio.gather(*tasks)
-        return processed_articles
\ No newline at end of file
+async def process_articles_concurrently(articles: List[Dict], client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
+    """
+    Processes a list of articles concurrently to generate summaries and topics.
+    Topic extraction for the whole list runs as one batch, off the event loop,
+    while the summaries are being fetched.
+    Uses the shared application HTTP client unless one is passed in.
+    """
+    client = client or http_clients.get_client()
+    with_text = [article for article in articles if _article_text(article)]
+    summaries = metrics.timed(
+        "summarization", asyncio.gather(*(_summarize_article(client, article) for article in with_text)), articles=len(with_text)
+    )
+    topics = metrics.timed("topic_extraction", topic_extractor.extract_topics([_article_text(article) for article in with_text]))
+    _, extracted = await asyncio.gather(summaries, topics)
+    for article, article_topics in zip(with_text, extracted):
+        article["topics"] = article_topics
+    return articles
+
+async def iter_processed_articles(articles: List[Dict], client: Optional[httpx.AsyncClient] = None) -> AsyncIterator[Dict]:
+    """
+    Like process_articles_concurrently, but yields each article as soon as
+    its summary and topics are ready, fastest first. Articles without text
+    are yielded straight away. Work still pending when the consumer stops
+    iterating is cancelled.
+    """
+    client = client or http_clients.get_client()
+    with_text = [article for article in articles if _article_text(article)]
+    for article in articles:
+        if not _article_text(article):
+            yield article
+
+    topics = asyncio.ensure_future(
+        metrics.timed("topic_extraction", topic_extractor.extract_topics([_article_text(article) for article in with_text]))
+    )
+    summaries = [asyncio.ensure_future(_summarize_article(client, article)) for article in with_text]
+    # Times the summarization stage as a whole, like process_articles_concurrently does
+    summarization = asyncio.ensure_future(
+        metrics.timed("summarization", asyncio.gather(*summaries, return_exceptions=True), articles=len(with_text))
+    )
+    try:
+        topics_assigned = False
+        for next_done in asyncio.as_completed(summaries):
+            article = await next_done
+            if not topics_assigned:
+                for other, article_topics in zip(with_text, await topics):
+                    other["topics"] = article_topics
+                topics_assigned = True
+            yield article
+    finally:
+        for pending in (topics, summarization, *summaries):
+            pending.cancel()
@@ -1,5 +1,42 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
 import yfinance as yf
 from pprint import pprint
+from dotenv import load_dotenv
+
+from .ttl_cache import AsyncTTLCache
+from . import indicators
+from .stock_history_store import history_store, frame_to_history, range_bounds, resample, to_records, to_columns
+
+load_dotenv()
+
+# Cache lifetimes in seconds, per kind of data
+STOCK_OVERVIEW_TTL = float(os.getenv("STOCK_OVERVIEW_TTL", "300"))
+STOCK_HISTORY_TTL = float(os.getenv("STOCK_HISTORY_TTL", "86400"))
+# How long past its TTL a value may still be served while it is refreshed in the background
+STOCK_STALE_TTL = float(os.getenv("STOCK_STALE_TTL", "3600"))
+STOCK_CACHE_SIZE = int(os.getenv("STOCK_CACHE_SIZE", "2048"))
+STOCK_FETCH_WORKERS = int(os.getenv("STOCK_FETCH_WORKERS", "8"))
+# How much history is downloaded for a symbol that is not in the history store yet
+STOCK_HISTORY_PERIOD = os.getenv("STOCK_HISTORY_PERIOD", "1y")
+
+# yfinance is blocking, so every upstream call runs in this pool instead of on the event loop
+_executor = ThreadPoolExecutor(max_workers=STOCK_FETCH_WORKERS, thread_name_prefix="yfinance")
+
+stock_cache = AsyncTTLCache(
+    maxsize=STOCK_CACHE_SIZE,
+    is_error=lambda value: isinstance(value, dict) and "error" in value,
+)
+
+async def _run_blocking(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
 
 # This dictionary maps the keys from the yfinance 'info' object
 # to the keys your frontend expects (which were based on Alpha Vantage).
@@ -39,7 +76,7 @@ YFINANCE_TO_AV_MAP = {
     'exDividendDate': 'ExDividendDate'
 }
 
-async def fetch_stock_overview(symbol: str):
+def _fetch_stock_overview_sync(symbol: str):
     """
     Fetches a company overview from Yahoo Finance using the yfinance library
     and maps it to the format expected by the frontend.
@@ -62,7 +99,6 @@ async def fetch_stock_overview(symbol: str):
             value = stock_info.get(yf_key)
             if value is not None:
                 if yf_key in ['dividendDate', 'exDividendDate'] and isinstance(value, int):
-                    from datetime import datetime
                     formatted_data[av_key] = datetime.fromtimestamp(value).strftime('%Y-%m-%d')
                 else:
                     formatted_data[av_key] = value
@@ -76,26 +112,200 @@ async def fetch_stock_overview(symbol: str):
         print(f"An error occurred while fetching data from yfinance: {e}")
         return {"error": f"An unexpected error occurred for symbol: {symbol}"}
 
+def _download_history(symbol: str, start: Optional[str] = None) -> np.ndarray:
+    ticker = yf.Ticker(symbol)
+    frame = ticker.history(start=start) if start else ticker.history(period=STOCK_HISTORY_PERIOD)
+    return frame_to_history(frame)
+
+def _apply_history_update(symbol: str, stored: np.ndarray, fetched: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Merges freshly fetched bars into the stored history of a symbol. Updates
+    re-fetch the last two stored bars: the newest may have been a partial
+    day, and the one before must still match upstream. If it does not, past
+    prices were re-adjusted (split or dividend) and None is returned so the
+    caller can rebuild the history from scratch.
+    """
+    if len(stored) < 2 or not len(fetched):
+        return history_store.save(symbol, fetched) if len(fetched) else stored
+    anchor = stored[-2]
+    i = int(np.searchsorted(fetched["date"], anchor["date"]))
+    if i < len(fetched) and fetched["date"][i] == anchor["date"] and np.isclose(fetched["close"][i], anchor["close"], rtol=1e-6):
+        return history_store.merge(symbol, fetched[i:])
+    if fetched["date"][0] <= stored["date"][0]:
+        # The fetch covers everything stored, so it can simply replace it
+        return history_store.save(symbol, fetched)
+    return None
+
+def _is_fresh_on_disk(symbol: str, stored: np.ndarray) -> bool:
+    age = history_store.age(symbol)
+    return len(stored) > 0 and age is not None and age < STOCK_HISTORY_TTL
+
 # --- ADDED: New function to fetch historical data for the chart ---
-async def fetch_stock_history(symbol: str):
+def _sync_stock_history_sync(symbol: str, rebuild: bool = False):
     """
-    Fetches the last year of stock history for a given symbol.
+    Brings the stored daily history of a symbol up to date and returns all of
+    it. Only the days since the last stored bar are downloaded.
     """
+    stored = history_store.load(symbol)
+    if not rebuild and _is_fresh_on_disk(symbol, stored):
+        return stored
     try:
-        ticker = yf.Ticker(symbol)
-        # Get historical data for the past year
-        history = ticker.history(period="1y")
+        history = None
+        if not rebuild:
+            start = str(stored["date"][-2]) if len(stored) >= 2 else None
+            history = _apply_history_update(symbol, stored, _download_history(symbol, start))
+        if history is None:
+            logging.info(f"Stored history for {symbol} no longer matches upstream; rebuilding it.")
+            history = history_store.save(symbol, _download_history(symbol))
+    except Exception as e:
+        print(f"An error occurred while fetching history from yfinance: {e}")
+        if len(stored):
+            return stored
+        return {"error": "An unexpected error occurred while fetching history."}
 
-        if history.empty:
-            return {"error": f"No historical data found for symbol: {symbol}"}
-        
-        # Reset index to make 'Date' a column and format it
-        history.reset_index(inplace=True)
-        history['Date'] = history['Date'].dt.strftime('%Y-%m-%d')
-        
-        # Convert the data to a list of dictionaries for easy use in the frontend
-        return history[['Date', 'Close']].to_dict('records')
+    if not len(history):
+        return {"error": f"No historical data found for symbol: {symbol}"}
+    return history
+
+def _sync_many_histories_sync(symbols: List[str]) -> Dict[str, object]:
+    """
+    Brings the stored history of several symbols up to date with a single
+    yfinance download starting at the earliest day any of them is missing.
+    """
+    stored = {symbol: history_store.load(symbol) for symbol in symbols}
+    results = {s: stored[s] for s in symbols if _is_fresh_on_disk(s, stored[s])}
+    stale = [s for s in symbols if s not in results]
+    if not stale:
+        return results
 
+    anchors = [stored[s]["date"][-2] for s in stale if len(stored[s]) >= 2]
+    start = str(min(anchors)) if len(anchors) == len(stale) else None
+    try:
+        kwargs = {"start": start} if start else {"period": STOCK_HISTORY_PERIOD}
+        data = yf.download(stale, group_by="ticker", progress=False, threads=True, **kwargs)
     except Exception as e:
-        print(f"An error occurred while fetching history from yfinance: {e}")
-        return {"error": "An unexpected error occurred while fetching history."}
\ No newline at end of file
+        print(f"An error occurred while bulk-fetching history from yfinance: {e}")
+        data = None
+
+    for symbol in stale:
+        if data is None:
+            results[symbol] = stored[symbol] if len(stored[symbol]) else {"error": "An unexpected error occurred while fetching history."}
+            continue
+        # With group_by="ticker" the columns are (ticker, field); yfinance leaves out tickers it could not resolve
+        if getattr(data.columns, "nlevels", 1) > 1:
+            frame = data[symbol] if symbol in data.columns.get_level_values(0) else None
+        else:
+            frame = data if len(stale) == 1 else None
+        try:
+            fetched = frame_to_history(frame)
+        except (KeyError, ValueError) as e:
+            print(f"Unexpected yfinance data for {symbol}: {e}")
+            fetched = None
+        if frame is None or fetched is None:
+            results[symbol] = stored[symbol] if len(stored[symbol]) else {"error": f"No historical data found for symbol: {symbol}"}
+            continue
+        history = _apply_history_update(symbol, stored[symbol], fetched)
+        if history is None:
+            results[symbol] = _sync_stock_history_sync(symbol, rebuild=True)
+        elif len(history):
+            results[symbol] = history
+        else:
+            results[symbol] = {"error": f"No historical data found for symbol: {symbol}"}
+    return results
+
+
+# --- CACHED, NON-BLOCKING ENTRY POINTS ---
+async def fetch_stock_overview(symbol: str):
+    """
+    Returns the company overview for a symbol. Served from cache when fresh;
+    concurrent requests for the same symbol share one upstream fetch.
+    """
+    symbol = symbol.upper()
+    return await stock_cache.get_or_fetch(
+        ("overview", symbol),
+        lambda: _run_blocking(_fetch_stock_overview_sync, symbol),
+        ttl=STOCK_OVERVIEW_TTL,
+        stale_ttl=STOCK_STALE_TTL,
+    )
+
+async def _load_stock_history(symbol: str):
+    """The whole stored daily history of a symbol, synced with upstream at most once per STOCK_HISTORY_TTL."""
+    return await stock_cache.get_or_fetch(
+        ("history", symbol),
+        lambda: _run_blocking(_sync_stock_history_sync, symbol),
+        ttl=STOCK_HISTORY_TTL,
+        stale_ttl=STOCK_STALE_TTL,
+    )
+
+def _history_view(
+    symbol: str,
+    history,
+    start: Optional[str],
+    end: Optional[str],
+    interval: str,
+    fmt: str,
+    spec: indicators.Spec = (),
+    downsample: Optional[int] = None,
+):
+    if isinstance(history, dict):
+        return history
+    if start is None and end is None:
+        # Without a range, serve the last year like the chart always has
+        start = str(history["date"][-1] - np.timedelta64(365, "D"))
+
+    # Indicators are computed over the whole stored history so that their
+    # warm-up windows reach back before the requested range
+    def compute():
+        bars = resample(history, interval)
+        return bars, indicators.compute(bars, spec, interval)
+
+    key = (symbol, str(history["date"][-1]), len(history), interval, spec)
+    bars, columns = indicators.indicator_cache.get_or_compute(key, compute) if spec or interval != "1d" else (history, {})
+
+    lo, hi = range_bounds(bars["date"], start, end)
+    view, extra = bars[lo:hi], {name: values[lo:hi] for name, values in columns.items()}
+
+    if downsample and downsample < len(view):
+        kept = indicators.lttb_indices(view["close"], downsample)
+        view, extra = view[kept], {name: values[kept] for name, values in extra.items()}
+    return to_columns(view, extra) if fmt == "columns" else to_records(view, extra)
+
+async def fetch_stock_history(
+    symbol: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    interval: str = "1d",
+    fmt: str = "records",
+    spec: indicators.Spec = (),
+    downsample: Optional[int] = None,
+):
+    """
+    Returns daily (or weekly/monthly) bars for a symbol between start and end,
+    defaulting to the last year, with any requested indicator columns and
+    optionally downsampled to about `downsample` points. The data comes from
+    the local history store, so a symbol that is already stored is served
+    without a network call.
+    """
+    symbol = symbol.upper()
+    history = await _load_stock_history(symbol)
+    return _history_view(symbol, history, start, end, interval, fmt, spec, downsample)
+
+async def fetch_stocks_bulk(symbols: List[str], include_history: bool = False) -> Dict[str, dict]:
+    """
+    Fetches overviews (and optionally history) for many symbols at once.
+    Histories missing from the cache are downloaded in one yfinance request;
+    overviews have no bulk upstream API, so they are fetched concurrently
+    through the same cache.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+    overviews = await asyncio.gather(*(fetch_stock_overview(symbol) for symbol in symbols))
+    results = {symbol: {"overview": overview} for symbol, overview in zip(symbols, overviews)}
+
+    if include_history:
+        missing = [s for s in symbols if stock_cache.peek(("history", s), STOCK_HISTORY_TTL) is None]
+        if missing:
+            for symbol, history in (await _run_blocking(_sync_many_histories_sync, missing)).items():
+                stock_cache.set(("history", symbol), history)
+        for symbol in symbols:
+            results[symbol]["history"] = await fetch_stock_history(symbol)
+    return results
\ No newline at end of file
@@ -0,0 +1,108 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+# --- 1. SETUP ---
+load_dotenv()
+
+SUMMARY_BATCH_MAX_SIZE = int(os.getenv("SUMMARY_BATCH_MAX_SIZE", "8"))
+SUMMARY_BATCH_MAX_WAIT = float(os.getenv("SUMMARY_BATCH_MAX_WAIT", "0.05"))
+SUMMARY_BATCH_CONCURRENCY = int(os.getenv("SUMMARY_BATCH_CONCURRENCY", "2"))
+
+# Sends a list of texts in one request and returns one summary (or None) per text
+BatchSender = Callable[[httpx.AsyncClient, List[str]], Awaitable[List[Optional[str]]]]
+
+
+# --- 2. MICRO-BATCHER ---
+class BatchSummarizer:
+    """
+    Collects texts submitted by concurrent callers, including different
+    research runs, for up to max_wait seconds (or until max_batch_size texts
+    are waiting) and sends them as a single batch request. Results are handed
+    back to each caller. At most `concurrency` batches are in flight at once,
+    and identical texts waiting or in flight share one result.
+    """
+
+    def __init__(
+        self,
+        send_batch: BatchSender,
+        max_batch_size: int = SUMMARY_BATCH_MAX_SIZE,
+        max_wait: float = SUMMARY_BATCH_MAX_WAIT,
+        concurrency: int = SUMMARY_BATCH_CONCURRENCY,
+    ):
+        self._send_batch = send_batch
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max_wait
+        self._concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: List[Tuple[str, asyncio.Future, httpx.AsyncClient]] = []
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.batches_sent = 0
+        self.texts_sent = 0
+
+    async def summarize(self, client: httpx.AsyncClient, text: str) -> Optional[str]:
+        existing = self._futures.get(text)
+        if existing is not None:
+            return await asyncio.shield(existing)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[text] = future
+        self._pending.append((text, future, client))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self._max_batch_size]
+            self._pending = self._pending[self._max_batch_size:]
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, httpx.AsyncClient]]):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        texts = [text for text, _, _ in batch]
+        results: List[Optional[str]] = [None] * len(texts)
+        try:
+            async with self._semaphore:
+                self.batches_sent += 1
+                self.texts_sent += len(texts)
+                summaries = await self._send_batch(batch[0][2], texts)
+            if len(summaries) == len(texts):
+                results = summaries
+            else:
+                logging.error(f"Summarizer returned {len(summaries)} results for a batch of {len(texts)}.")
+        except Exception as e:
+            logging.error(f"Summarization batch failed: {e}")
+        finally:
+            # Always release the callers, even if this task is cancelled
+            for (text, future, _), summary in zip(batch, results):
+                self._futures.pop(text, None)
+                if not future.done():
+                    future.set_result(summary)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self._max_batch_size,
+            "max_wait": self._max_wait,
+            "concurrency": self._concurrency,
+            "waiting": len(self._pending),
+            "batches_sent": self.batches_sent,
+            "texts_sent": self.texts_sent,
+            "avg_batch_size": round(self.texts_sent / self.batches_sent, 2) if self.batches_sent else 0.0,
+        }
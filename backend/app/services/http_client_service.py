@@ -0,0 +1,249 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+# --- 1. SETUP ---
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Upstream endpoints; overridable so the app can run against local stand-ins (see benchmarks/)
+GNEWS_API_URL = os.getenv("GNEWS_API_URL", "https://gnews.io/api/v4/search")
+NEWSDATA_API_URL = os.getenv("NEWSDATA_API_URL", "https://newsdata.io/api/1/news")
+HUGGINGFACE_API_URL = os.getenv("HUGGINGFACE_API_URL", "https://api-inference.huggingface.co/models").rstrip("/")
+
+# Upstream hosts that get their own connection pool, so one slow provider
+# can't take every connection away from the others.
+UPSTREAM_HOSTS = list(dict.fromkeys(
+    urlsplit(url).hostname for url in (GNEWS_API_URL, NEWSDATA_API_URL, HUGGINGFACE_API_URL)
+))
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+# --- 2. INSTRUMENTED TRANSPORT ---
+# The first trace event of a request once the pool has given it a connection:
+# opening a new one, or sending on one it already had
+_CONNECTION_ASSIGNED_EVENTS = {
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+}
+# A request counts as having waited for a connection above this many seconds
+POOL_WAIT_THRESHOLD = 0.001
+
+
+def _is_closed(stream) -> bool:
+    sock = stream.get_extra_info("socket")
+    return sock is None or sock.fileno() == -1
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """A response body stream that calls on_close once the response is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an AsyncHTTPTransport and reports how its pool is used, from the
+    transport's public "trace" request extension rather than the pool's
+    internals: connections opened, still open and closed (a connection is
+    open while its socket is), requests in flight until their response is
+    closed, and how long requests waited for the pool to hand them a
+    connection. Under HTTP/2 that includes waiting for a free stream.
+    """
+
+    def __init__(self, max_connections: int, http2: bool):
+        self._max_connections = max_connections
+        self._transport = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(HTTP_MAX_KEEPALIVE, max_connections),
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        # Stats are read from the threadpool while requests update them on the event loop
+        self._lock = threading.Lock()
+        self._streams = set() # network streams of the connections not yet seen closed
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.waits = 0
+        self.pool_timeouts = 0
+        self.assignments = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _prune_closed(self):
+        with self._lock:
+            closed = [stream for stream in self._streams if _is_closed(stream)]
+            self._streams.difference_update(closed)
+            self.connections_closed += len(closed)
+
+    def _connection_opened(self, stream):
+        self._prune_closed()
+        with self._lock:
+            self.connections_opened += 1
+            if stream is not None:
+                self._streams.add(stream)
+
+    def _assigned(self, waited: float):
+        with self._lock:
+            self.assignments += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited > POOL_WAIT_THRESHOLD:
+                self.waits += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        entered = time.perf_counter()
+        assigned = False
+        inner = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict):
+            nonlocal assigned
+            if not assigned and event_name in _CONNECTION_ASSIGNED_EVENTS:
+                assigned = True
+                self._assigned(time.perf_counter() - entered)
+            if event_name == "connection.connect_tcp.complete":
+                self._connection_opened(info.get("return_value"))
+            if inner is not None:
+                await inner(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            if isinstance(e, httpx.PoolTimeout):
+                with self._lock:
+                    self.pool_timeouts += 1
+            self._release()
+            raise
+        # The connection stays busy until the body has been read and the response closed
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self._release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def stats(self) -> dict:
+        self._prune_closed()
+        with self._lock:
+            return {
+                "max_connections": self._max_connections,
+                "open_connections": len(self._streams),
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "waits_for_connection": self.waits,
+                "pool_timeouts": self.pool_timeouts,
+                "avg_wait_ms": round(self.total_wait / self.assignments * 1000, 3) if self.assignments else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+# --- 3. CLIENT MANAGER ---
+class HttpClientManager:
+    """
+    Owns the single application-wide httpx.AsyncClient. It is started and
+    closed by the FastAPI lifespan; code running outside the app (scripts,
+    the scheduler before startup) gets a client created on first use.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transports: Dict[str, InstrumentedTransport] = {}
+
+    def _build(self) -> httpx.AsyncClient:
+        http2 = HTTP2_ENABLED and _HTTP2_AVAILABLE
+        if HTTP2_ENABLED and not _HTTP2_AVAILABLE:
+            logging.warning("HTTP/2 requested but the 'h2' package is not installed. Using HTTP/1.1.")
+        self._transports = {
+            host: InstrumentedTransport(HTTP_MAX_CONNECTIONS_PER_HOST, http2) for host in UPSTREAM_HOSTS
+        }
+        default = InstrumentedTransport(HTTP_MAX_CONNECTIONS, http2)
+        self._transports["default"] = default
+        return httpx.AsyncClient(
+            transport=default,
+            mounts={f"all://{host}": self._transports[host] for host in UPSTREAM_HOSTS},
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT
+            ),
+            follow_redirects=True,
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._build()
+            logging.info("Shared HTTP client started.")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logging.info("Shared HTTP client closed.")
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build()
+        return self._client
+
+    def stats(self) -> dict:
+        return {host: transport.stats() for host, transport in self._transports.items()}
+
+
+http_clients = HttpClientManager()
+
+def get_http_client() -> httpx.AsyncClient:
+    """FastAPI dependency that provides the shared HTTP client."""
+    return http_clients.get_client()
@@ -0,0 +1,192 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# --- 1. SETUP ---
+load_dotenv()
+
+INDICATOR_CACHE_SIZE = int(os.getenv("INDICATOR_CACHE_SIZE", "256"))
+MAX_INDICATORS = 10
+MAX_WINDOW = 500
+
+# Bars per year, used to annualize volatility
+PERIODS_PER_YEAR = {"1d": 252, "1wk": 52, "1mo": 12}
+
+# name -> default parameters; the spec "macd" means "macd:12:26:9"
+INDICATOR_DEFAULTS = {
+    "sma": (20,),
+    "ema": (20,),
+    "rsi": (14,),
+    "macd": (12, 26, 9),
+    "bbands": (20, 2),
+    "volatility": (20,),
+    "log_returns": (),
+}
+
+Spec = Tuple[Tuple[str, Tuple[float, ...]], ...]
+
+
+def parse_spec(spec: str) -> Spec:
+    """
+    Parses "sma:20,ema:50,rsi,macd:12:26:9,bbands:20:2,volatility:20,log_returns"
+    into a normalized tuple usable as a cache key. Raises ValueError on bad input.
+    """
+    parsed = []
+    for item in filter(None, (part.strip().lower() for part in spec.split(","))):
+        name, *raw = item.split(":")
+        if name not in INDICATOR_DEFAULTS:
+            raise ValueError(f"Unknown indicator: {name}")
+        defaults = INDICATOR_DEFAULTS[name]
+        if len(raw) > len(defaults):
+            raise ValueError(f"Too many parameters for {name}")
+        try:
+            params = tuple(float(v) for v in raw) + defaults[len(raw):]
+        except ValueError:
+            raise ValueError(f"Invalid parameters for {name}: {item}")
+        # Every parameter except the Bollinger width is a window length
+        windows = params[:1] if name == "bbands" else params
+        if any(w != int(w) or not 1 <= w <= MAX_WINDOW for w in windows):
+            raise ValueError(f"Windows must be whole numbers between 1 and {MAX_WINDOW}: {item}")
+        if name == "bbands" and not 0 < params[1] <= 10:
+            raise ValueError(f"Bollinger band width must be between 0 and 10: {item}")
+        parsed.append((name, tuple(int(p) if p == int(p) else p for p in params)))
+    if len(parsed) > MAX_INDICATORS:
+        raise ValueError(f"At most {MAX_INDICATORS} indicators per request.")
+    return tuple(dict.fromkeys(parsed))
+
+
+# --- 2. INDICATORS ---
+def sma(close: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(close), np.nan)
+    if len(close) >= window:
+        sums = np.cumsum(np.insert(close, 0, 0.0))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+def ema(close: np.ndarray, window: int) -> np.ndarray:
+    out = pd.Series(close).ewm(span=window, adjust=False).mean().to_numpy(copy=True)
+    out[:window - 1] = np.nan
+    return out
+
+def rsi(close: np.ndarray, window: int) -> np.ndarray:
+    """Wilder's relative strength index."""
+    delta = np.diff(close, prepend=np.nan)
+    gains = pd.Series(np.clip(delta, 0, None)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    losses = pd.Series(np.clip(-delta, 0, None)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - 100 / (1 + gains.to_numpy() / losses.to_numpy())
+    # No losses at all in the window means maximum strength
+    out[(losses.to_numpy() == 0) & ~np.isnan(gains.to_numpy())] = 100.0
+    return out
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    out = np.full(len(close), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.log(close[1:] / close[:-1])
+    return out
+
+def compute(bars: np.ndarray, spec: Spec, interval: str = "1d") -> Dict[str, np.ndarray]:
+    """Returns one full-length column per indicator output, named like the response fields."""
+    close = np.ascontiguousarray(bars["close"], dtype="f8")
+    columns: Dict[str, np.ndarray] = {}
+    for name, params in spec:
+        suffix = "_".join(str(p) for p in params)
+        if name == "sma":
+            columns[f"SMA_{suffix}"] = sma(close, params[0])
+        elif name == "ema":
+            columns[f"EMA_{suffix}"] = ema(close, params[0])
+        elif name == "rsi":
+            columns[f"RSI_{suffix}"] = rsi(close, params[0])
+        elif name == "macd":
+            fast, slow, signal = params
+            line = ema(close, fast) - ema(close, slow)
+            signal_line = np.full(len(line), np.nan)
+            valid = np.flatnonzero(~np.isnan(line))
+            if len(valid):
+                signal_line[valid[0]:] = ema(line[valid[0]:], signal)
+            columns[f"MACD_{suffix}"] = line
+            columns[f"MACD_signal_{suffix}"] = signal_line
+            columns[f"MACD_hist_{suffix}"] = line - signal_line
+        elif name == "bbands":
+            window, width = params
+            middle = sma(close, window)
+            std = pd.Series(close).rolling(window).std(ddof=0).to_numpy()
+            columns[f"BB_upper_{suffix}"] = middle + width * std
+            columns[f"BB_middle_{suffix}"] = middle
+            columns[f"BB_lower_{suffix}"] = middle - width * std
+        elif name == "volatility":
+            std = pd.Series(log_returns(close)).rolling(params[0]).std().to_numpy()
+            columns[f"Volatility_{suffix}"] = std * np.sqrt(PERIODS_PER_YEAR.get(interval, 252))
+        elif name == "log_returns":
+            columns["LogReturn"] = log_returns(close)
+    return columns
+
+
+# --- 3. DOWNSAMPLING ---
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks `threshold` points (always keeping
+    the first and last) that preserve the visual shape of the series. Bars
+    are treated as evenly spaced. Returns the indices of the kept points.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype="f8"))
+    x = np.arange(n, dtype="f8")
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # The average of the next bucket is the third corner of the triangle
+        next_lo, next_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+# --- 4. MEMOIZATION ---
+class IndicatorCache:
+    """
+    A small LRU of computed bars and indicator columns. Keys include the
+    symbol's last bar, so a history update produces new keys and the old
+    ones age out.
+    """
+
+    def __init__(self, maxsize: int = INDICATOR_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute_fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            columns = self._entries.get(key)
+            if columns is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return columns
+            self.misses += 1
+        columns = compute_fn()
+        with self._lock:
+            self._entries[key] = columns
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return columns
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self._maxsize, "hits": self.hits, "misses": self.misses}
+
+
+indicator_cache = IndicatorCache()
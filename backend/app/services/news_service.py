@@ -1,10 +1,16 @@
 import os
+import time
 import httpx
 import asyncio
 import logging
 from dotenv import load_dotenv
 from functools import wraps
-import feedparser
+from typing import Callable, Dict, List, Optional, Tuple
+from .http_client_service import http_clients, GNEWS_API_URL, NEWSDATA_API_URL
+from .circuit_breaker import CircuitBreaker
+from . import rss_service
+from ..dedup import url_hash
+from .. import metrics
 
 # --- 1. SETUP ---
 load_dotenv()
@@ -15,12 +21,31 @@ NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
 
 MIN_ARTICLES_REQUIRED = 3
 
-RSS_FEEDS = {
-    "Reuters World News": "http://feeds.reuters.com/reuters/worldNews",
-    "New York Times": "https://rss.nytimes.com/services/xml/rss/nyt/World.xml",
-    "The Times of India": "https://timesofindia.indiatimes.com/rssfeeds/296589292.cms", # India News
-    "The Hindu - Karnataka": "https://www.thehindu.com/news/national/karnataka/feeder/default.xml" # Karnataka News
-}
+# "sequential": GNews, then NewsData, then RSS, one after another (the original behaviour).
+# "fanout": query every provider at once. "hedged": start the next provider when the
+# current one hasn't delivered within NEWS_HEDGE_DELAY seconds or came back short.
+NEWS_FETCH_MODE = os.getenv("NEWS_FETCH_MODE", "sequential").lower()
+NEWS_HEDGE_DELAY = float(os.getenv("NEWS_HEDGE_DELAY", "1.5"))
+
+# Per-provider deadlines (seconds), covering retries as well
+GNEWS_DEADLINE = float(os.getenv("GNEWS_DEADLINE", "8"))
+NEWSDATA_DEADLINE = float(os.getenv("NEWSDATA_DEADLINE", "8"))
+RSS_DEADLINE = float(os.getenv("RSS_DEADLINE", "12"))
+
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "3"))
+PROVIDER_RESET_TIMEOUT = float(os.getenv("PROVIDER_RESET_TIMEOUT", "60"))
+
+# Batch research (fetch_news_for_topics): topics are combined into OR queries of up to
+# BATCH_TOPICS_PER_QUERY each, and all queries of a batch share one concurrency limit and deadline
+BATCH_TOPICS_PER_QUERY = max(1, int(os.getenv("BATCH_TOPICS_PER_QUERY", "3")))
+BATCH_FETCH_CONCURRENCY = max(1, int(os.getenv("BATCH_FETCH_CONCURRENCY", "4")))
+BATCH_FETCH_DEADLINE = float(os.getenv("BATCH_FETCH_DEADLINE", "30"))
+
+# Configurable through RSS_FEEDS / RSS_FEEDS_FILE, see rss_service
+RSS_FEEDS = rss_service.RSS_FEEDS
+
+# Called with (provider name, articles) each time a provider answers
+ResultCallback = Callable[[str, List[dict]], None]
 
 # --- 2. RETRY LOGIC DECORATOR (Unchanged) ---
 def retry_with_backoff(retries=3, backoff_in_seconds=1):
@@ -40,6 +65,7 @@ def retry_with_backoff(retries=3, backoff_in_seconds=1):
                         raise
                     msg = f"Server error {e.response.status_code}, Retrying in {mdelay} seconds..."
                     logging.warning(msg)
+                    metrics.PROVIDER_RETRIES.inc(function=f.__name__)
                     await asyncio.sleep(mdelay)
                     mtries -= 1
                     mdelay *= 2
@@ -54,26 +80,11 @@ def _map_gnews_to_standard_format(articles):
 def _map_newsdata_to_standard_format(articles):
     return [{"title": a.get("title"), "description": a.get("description"), "url": a.get("link"), "urlToImage": a.get("image_url")} for a in articles]
 
-def _map_rss_to_standard_format(entries):
-    formatted_articles = []
-    for entry in entries:
-        image_url = None
-        if 'media_content' in entry and entry.media_content:
-            image_url = entry.media_content[0]['url']
-        
-        formatted_articles.append({
-            "title": entry.get("title"),
-            "description": entry.get("summary"),
-            "url": entry.get("link"),
-            "urlToImage": image_url
-        })
-    return formatted_articles
-
 # --- 4. INDIVIDUAL API CALLS (with updated RSS function) ---
 @retry_with_backoff()
 async def _fetch_from_gnews(topic: str, client: httpx.AsyncClient):
     if not GNEWS_API_KEY: return None
-    url = "https://gnews.io/api/v4/search"
+    url = GNEWS_API_URL
     params = {"q": topic, "apikey": GNEWS_API_KEY, "max": 10, "lang": "en"}
     response = await client.get(url, params=params)
     response.raise_for_status()
@@ -83,72 +94,235 @@ async def _fetch_from_gnews(topic: str, client: httpx.AsyncClient):
 @retry_with_backoff()
 async def _fetch_from_newsdata(topic: str, client: httpx.AsyncClient):
     if not NEWSDATA_API_KEY: return None
-    url = "https://newsdata.io/api/1/news"
+    url = NEWSDATA_API_URL
     params = {"q": topic, "apikey": NEWSDATA_API_KEY, "size": 10, "language": "en"}
     response = await client.get(url, params=params)
     response.raise_for_status()
     data = response.json()
     return _map_newsdata_to_standard_format(data.get("results", []))
 
-# --- MODIFIED: The RSS fetcher now accepts a topic and filters the results ---
-async def _fetch_from_rss(topic: str):
-    all_entries = []
-    for name, url in RSS_FEEDS.items():
-        try:
-            logging.info(f"Parsing RSS feed: {name}")
-            feed = feedparser.parse(url)
-            all_entries.extend(feed.entries)
-        except Exception as e:
-            logging.error(f"Failed to parse RSS feed {name}: {e}")
-            
-    # Filter the collected entries to find ones that match the topic
-    topic_lower = topic.lower()
-    filtered_entries = [
-        entry for entry in all_entries 
-        if topic_lower in entry.get('title', '').lower() 
-        or topic_lower in entry.get('summary', '').lower()
-    ]
-    
-    return _map_rss_to_standard_format(filtered_entries)
-
-# --- 5. UPDATED: Main orchestrator function with filtered RSS fallback ---
-async def fetch_news_from_api(topic: str):
+# --- MODIFIED: RSS feeds are fetched concurrently and served from a shared, TTL-bound cache ---
+async def _fetch_from_rss(topic: str, client: Optional[httpx.AsyncClient] = None):
+    terms = split_query(topic)
+    if len(terms) == 1:
+        return await rss_service.feed_cache.search(terms[0], client)
+    # An OR query from a batch: every term is searched in the same cached feeds
+    return _merge_articles([await rss_service.feed_cache.search(term, client) for term in terms])
+
+# --- 5. PROVIDER REGISTRY AND CIRCUIT BREAKERS ---
+# (name, fetch function, deadline), in order of preference
+PROVIDERS = [
+    ("GNews", _fetch_from_gnews, GNEWS_DEADLINE),
+    ("NewsData.io", _fetch_from_newsdata, NEWSDATA_DEADLINE),
+    ("RSS", _fetch_from_rss, RSS_DEADLINE),
+]
+
+circuit_breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(name, PROVIDER_FAILURE_THRESHOLD, PROVIDER_RESET_TIMEOUT) for name, _, _ in PROVIDERS
+}
+
+async def _call_provider(name: str, fetch, deadline: float, topic: str, client: httpx.AsyncClient) -> List[dict]:
     """
-    Fetches articles resiliently, trying a primary, secondary, and finally RSS feeds.
+    Calls one provider under its deadline and circuit breaker. Never raises:
+    failures, timeouts and open circuits all come back as an empty list.
     """
-    async with httpx.AsyncClient() as client:
-        # --- Try Primary API: GNews ---
-        logging.info(f"Attempting to fetch articles for '{topic}' from primary source (GNews)...")
+    breaker = circuit_breakers[name]
+    if not breaker.allow():
+        logging.warning(f"Skipping {name}: circuit is open after repeated failures.")
+        metrics.PROVIDER_SECONDS.observe(0, provider=name, outcome="circuit_open")
+        return []
+    with metrics.stage_span("provider_fetch", provider=name) as span:
+        start = time.perf_counter()
         try:
-            articles = await _fetch_from_gnews(topic, client)
-            if articles and len(articles) >= MIN_ARTICLES_REQUIRED:
-                logging.info(f"Successfully fetched {len(articles)} articles from GNews.")
-                return {"articles": articles}
-            logging.warning(f"Primary source returned only {len(articles) if articles else 0} articles. Falling back.")
+            articles = await asyncio.wait_for(fetch(topic, client), timeout=deadline)
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            span["outcome"] = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            logging.error(f"{name} did not respond within {deadline} seconds.")
+            breaker.record_failure()
+            span["outcome"] = "timeout"
+            return []
         except Exception as e:
-            logging.error(f"Primary source failed: {e}. Falling back.")
+            logging.error(f"{name} failed: {e}")
+            breaker.record_failure()
+            span["outcome"] = "error"
+            return []
+        finally:
+            span.setdefault("outcome", "success")
+            metrics.PROVIDER_SECONDS.observe(time.perf_counter() - start, provider=name, outcome=span["outcome"])
+        breaker.record_success()
+        span["articles"] = len(articles or [])
+        return articles or []
 
-        # --- Fallback to Secondary API: NewsData.io ---
-        logging.info(f"Attempting to fetch articles for '{topic}' from secondary source (NewsData.io)...")
-        try:
-            articles = await _fetch_from_newsdata(topic, client)
-            if articles and len(articles) >= MIN_ARTICLES_REQUIRED:
-                logging.info(f"Successfully fetched {len(articles)} articles from NewsData.io.")
-                return {"articles": articles}
-            logging.warning(f"Secondary source returned only {len(articles) if articles else 0} articles. Falling back to RSS.")
-        except Exception as e:
-            logging.error(f"Secondary source failed: {e}. Falling back to RSS.")
-            
-        # --- MODIFIED: The call to the RSS function now passes the topic ---
-        logging.info("Attempting to fetch articles from tertiary source (RSS Feeds)...")
-        try:
-            articles = await _fetch_from_rss(topic)
-            if articles:
-                logging.info(f"Successfully fetched {len(articles)} articles from RSS feeds.")
-                return {"articles": articles}
-        except Exception as e:
-            logging.error(f"Tertiary source (RSS) failed: {e}.")
+def _merge_articles(results: List[List[dict]]) -> List[dict]:
+    """Merges provider results in order of preference, dropping repeated URLs."""
+    seen, merged = set(), []
+    for articles in results:
+        for article in articles:
+            key = url_hash(article.get("url"))
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            merged.append(article)
+    return merged
+
+# --- 6. ORCHESTRATORS ---
+async def _fetch_sequentially(topic: str, client: httpx.AsyncClient, on_result: Optional[ResultCallback] = None) -> List[dict]:
+    """Tries each provider in turn; the API sources must meet MIN_ARTICLES_REQUIRED, RSS just has to return something."""
+    for name, fetch, deadline in PROVIDERS:
+        logging.info(f"Attempting to fetch articles for '{topic}' from {name}...")
+        articles = await _call_provider(name, fetch, deadline, topic, client)
+        if on_result:
+            on_result(name, articles)
+        required = 1 if name == "RSS" else MIN_ARTICLES_REQUIRED
+        if len(articles) >= required:
+            logging.info(f"Successfully fetched {len(articles)} articles from {name}.")
+            return articles
+        logging.warning(f"{name} returned only {len(articles)} articles. Falling back.")
+        metrics.PROVIDER_FALLBACKS.inc(provider=name)
+    return []
+
+async def _fetch_concurrently(
+    topic: str, client: httpx.AsyncClient, hedge_delay: Optional[float], on_result: Optional[ResultCallback] = None
+) -> List[dict]:
+    """
+    Runs providers concurrently and returns as soon as the merged, de-duplicated
+    results reach MIN_ARTICLES_REQUIRED, cancelling whatever is still in flight.
+    With hedge_delay=None every provider starts at once; otherwise the next
+    provider starts when the running ones are slower than hedge_delay or one
+    comes back short.
+    """
+    results: Dict[str, List[dict]] = {}
+    running: Dict[asyncio.Task, str] = {}
+    next_provider = 0
+
+    def launch_next():
+        nonlocal next_provider
+        name, fetch, deadline = PROVIDERS[next_provider]
+        next_provider += 1
+        logging.info(f"Querying {name} for '{topic}'...")
+        running[asyncio.create_task(_call_provider(name, fetch, deadline, topic, client))] = name
+
+    def merged() -> List[dict]:
+        return _merge_articles([results[name] for name, _, _ in PROVIDERS if name in results])
+
+    launch_next()
+    if hedge_delay is None:
+        while next_provider < len(PROVIDERS):
+            launch_next()
+
+    try:
+        while running or next_provider < len(PROVIDERS):
+            if not running:
+                launch_next()
+                continue
+            can_hedge = hedge_delay is not None and next_provider < len(PROVIDERS)
+            done, _ = await asyncio.wait(
+                running.keys(), timeout=hedge_delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logging.info(f"No provider answered within {hedge_delay}s. Hedging.")
+                metrics.PROVIDER_HEDGES.inc()
+                launch_next()
+                continue
+            answered = []
+            for task in done:
+                name = running.pop(task)
+                answered.append(name)
+                results[name] = task.result()
+                if on_result:
+                    on_result(name, results[name])
+            articles = merged()
+            if len(articles) >= MIN_ARTICLES_REQUIRED:
+                logging.info(f"Collected {len(articles)} articles from {', '.join(results)}.")
+                return articles
+            if can_hedge:
+                # Every provider that answered this round came back short
+                for name in answered:
+                    metrics.PROVIDER_FALLBACKS.inc(provider=name)
+                launch_next()
+    finally:
+        for task in running:
+            task.cancel()
+
+    return merged()
+
+async def fetch_news_from_api(
+    topic: str, client: Optional[httpx.AsyncClient] = None, on_result: Optional[ResultCallback] = None
+):
+    """
+    Fetches articles resiliently from GNews, NewsData.io and RSS feeds, either
+    as a sequential fallback chain or concurrently (see NEWS_FETCH_MODE).
+    Uses the shared application HTTP client unless one is passed in.
+    If given, on_result(provider_name, articles) is called as each provider answers.
+    """
+    client = client or http_clients.get_client()
+    if NEWS_FETCH_MODE == "fanout":
+        articles = await _fetch_concurrently(topic, client, hedge_delay=None, on_result=on_result)
+    elif NEWS_FETCH_MODE == "hedged":
+        articles = await _fetch_concurrently(topic, client, hedge_delay=NEWS_HEDGE_DELAY, on_result=on_result)
+    else:
+        articles = await _fetch_sequentially(topic, client, on_result=on_result)
+
+    if articles:
+        return {"articles": articles}
 
     # --- If all sources fail ---
     logging.error(f"All sources failed to provide sufficient articles for '{topic}'.")
-    return {"error": f"Could not retrieve sufficient news for '{topic}'. Please try another search."}
\ No newline at end of file
+    return {"error": f"Could not retrieve sufficient news for '{topic}'. Please try another search."}
+
+def provider_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in circuit_breakers.items()}
+
+# --- 7. MULTI-TOPIC BATCHES ---
+def combine_topics(topics: List[str]) -> str:
+    """One search query matching any of the topics, in the OR syntax GNews and NewsData.io accept."""
+    if len(topics) == 1:
+        return topics[0]
+    return " OR ".join(f'"{topic}"' if " " in topic else topic for topic in topics)
+
+def split_query(query: str) -> List[str]:
+    """The topics of a query built by combine_topics."""
+    return [term.strip().strip('"') for term in query.split(" OR ")]
+
+def match_topics(article: dict, topics: List[str]) -> List[str]:
+    """The topics mentioned as a whole word in the article's title or description."""
+    text = f"{article.get('title') or ''}\n{article.get('description') or ''}"
+    return [topic for topic in topics if rss_service.topic_pattern(topic).search(text)]
+
+async def fetch_news_for_topics(topics: List[str], client: Optional[httpx.AsyncClient] = None) -> List[Tuple[List[str], List[dict]]]:
+    """
+    Fetches articles for many topics with one provider query per group of
+    BATCH_TOPICS_PER_QUERY topics rather than one per topic. The queries run
+    through the usual fallback chain and circuit breakers, at most
+    BATCH_FETCH_CONCURRENCY at a time; whatever has not answered when
+    BATCH_FETCH_DEADLINE runs out is cancelled and counts as no articles.
+    Returns (topics of the group, articles) pairs in request order.
+    """
+    client = client or http_clients.get_client()
+    groups = [topics[i:i + BATCH_TOPICS_PER_QUERY] for i in range(0, len(topics), BATCH_TOPICS_PER_QUERY)]
+    semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+
+    async def fetch(group: List[str]) -> List[dict]:
+        async with semaphore:
+            return (await fetch_news_from_api(combine_topics(group), client=client)).get("articles", [])
+
+    tasks = [asyncio.create_task(fetch(group)) for group in groups]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=BATCH_FETCH_DEADLINE)
+    finally:
+        for task in tasks:
+            task.cancel()
+    results = []
+    for group, task in zip(groups, tasks):
+        if task not in done:
+            logging.warning(f"Batch query for {group} missed the {BATCH_FETCH_DEADLINE}s deadline.")
+            results.append((group, []))
+        elif task.exception() is not None:
+            logging.error(f"Batch query for {group} failed: {task.exception()}")
+            results.append((group, []))
+        else:
+            results.append((group, task.result()))
+    return results
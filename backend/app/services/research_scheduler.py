@@ -0,0 +1,381 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import or_, text, update
+from sqlalchemy.exc import IntegrityError
+from dotenv import load_dotenv
+
+from .. import crud, models
+from ..database import SQLALCHEMY_DATABASE_URL, engine, SessionLocal, open_async_session
+
+# --- 1. SETUP ---
+load_dotenv()
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+# Timezone of the subscription cron expressions; unset means the server's local time
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE") or None
+# Scheduled research runs in progress at once, across all topics
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "3"))
+# Scheduled research runs started per minute; 0 disables the limit
+SCHEDULER_RATE_LIMIT = float(os.getenv("SCHEDULER_RATE_LIMIT", "10"))
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "30"))
+# How often the leader re-reads subscriptions changed by other workers
+SCHEDULER_SYNC_SECONDS = int(os.getenv("SCHEDULER_SYNC_SECONDS", "60"))
+# A run missed while no worker was leader still fires if it is at most this many seconds late
+SCHEDULER_MISFIRE_GRACE = int(os.getenv("SCHEDULER_MISFIRE_GRACE", "3600"))
+
+DEFAULT_CRON = "0 9 * * *"
+LOCK_NAME = "research_scheduler"
+# Arbitrary 64-bit key identifying the scheduler's PostgreSQL advisory lock
+ADVISORY_LOCK_KEY = 0x5245534348
+
+JobHandler = Callable[[int, str], Awaitable[None]]
+
+
+def parse_cron(expression: str) -> CronTrigger:
+    """Builds the trigger for a crontab expression. Raises ValueError if it is invalid."""
+    return CronTrigger.from_crontab(expression, timezone=SCHEDULER_TIMEZONE)
+
+
+# --- 2. LEADER LOCKS ---
+class AdvisoryLock:
+    """
+    PostgreSQL leader lock: a session-level advisory lock held on a dedicated
+    connection. It is released by the server if the process dies.
+    """
+
+    kind = "advisory"
+
+    def __init__(self, key: int = ADVISORY_LOCK_KEY):
+        self._key = key
+        self._conn = None
+
+    def acquire(self) -> bool:
+        """Takes the lock, or confirms it is still held. Blocking; call from a thread."""
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+                return True
+            except Exception as e:
+                logging.warning(f"Scheduler lock connection lost: {e}")
+                self._discard()
+        conn = engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self._key}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def release(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self._key})
+            self._conn.commit()
+        except Exception as e:
+            logging.warning(f"Could not release the scheduler lock: {e}")
+        self._discard()
+
+    def _discard(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+class LeaseLock:
+    """
+    Leader lock for databases without advisory locks: a row in
+    scheduler_leases naming the holder and an expiry. The holder renews it
+    well before it expires; another worker takes over once it has lapsed.
+    """
+
+    kind = "lease"
+
+    def __init__(self, holder: str, ttl: int = SCHEDULER_LEASE_SECONDS, name: str = LOCK_NAME):
+        self._holder = holder
+        self._ttl = ttl
+        self._name = name
+
+    def acquire(self) -> bool:
+        now = datetime.utcnow()
+        lease = models.SchedulerLease
+        with SessionLocal() as db:
+            result = db.execute(
+                update(lease)
+                .where(lease.name == self._name, or_(lease.holder == self._holder, lease.expires_at < now))
+                .values(holder=self._holder, expires_at=now + timedelta(seconds=self._ttl))
+            )
+            if result.rowcount:
+                db.commit()
+                return True
+            if db.get(lease, self._name) is not None:
+                db.rollback()
+                return False
+            db.add(lease(name=self._name, holder=self._holder, expires_at=now + timedelta(seconds=self._ttl)))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                # Another worker created the lease first
+                db.rollback()
+                return False
+
+    def release(self):
+        lease = models.SchedulerLease
+        with SessionLocal() as db:
+            db.execute(
+                update(lease)
+                .where(lease.name == self._name, lease.holder == self._holder)
+                .values(expires_at=datetime.utcnow())
+            )
+            db.commit()
+
+
+def make_leader_lock(holder: str):
+    return AdvisoryLock() if engine.dialect.name == "postgresql" else LeaseLock(holder)
+
+
+# --- 3. RATE LIMIT ---
+class RateLimiter:
+    """A token bucket allowing `per_minute` starts per minute, in bursts of up to `burst`."""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self._rate = per_minute / 60.0
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        if self._rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+# --- 4. SCHEDULER ---
+def _job_id(subscription_id: int) -> str:
+    return f"subscription:{subscription_id}"
+
+async def run_subscription_job(subscription_id: int):
+    """Entry point stored in the persistent job store; must stay importable under this name."""
+    await research_scheduler.run_subscription(subscription_id)
+
+
+class ResearchScheduler:
+    """
+    Fires research for the topic subscriptions stored in the database.
+
+    Every worker process runs a small leadership loop; only the worker holding
+    the leader lock runs the APScheduler instance, so each job fires exactly
+    once however many workers there are. Subscription jobs live in a
+    SQLAlchemy job store, so a new leader picks up the next run times (and
+    runs missed within SCHEDULER_MISFIRE_GRACE) where the previous one left
+    off. Runs share one concurrency limit and one start rate limit, and each
+    is recorded in scheduled_runs with its wait time, duration and outcome.
+    """
+
+    def __init__(self, max_concurrency: int = SCHEDULER_MAX_CONCURRENCY, rate_limit: float = SCHEDULER_RATE_LIMIT):
+        self._max_concurrency = max(1, max_concurrency)
+        self._rate_limit = rate_limit
+        self._holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = make_leader_lock(self._holder)
+        self._handler: Optional[JobHandler] = None
+        self._system_jobs: List[Tuple[Callable, BaseTrigger, str]] = []
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_requested: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[RateLimiter] = None
+        self._last_sync = 0.0
+        self._waiting = 0
+        self._running = 0
+
+    def add_system_job(self, func: Callable, trigger: BaseTrigger, job_id: str):
+        """Registers a maintenance job that should run on the leader only (kept in memory, not persisted)."""
+        self._system_jobs.append((func, trigger, job_id))
+
+    async def start(self, handler: JobHandler):
+        if not SCHEDULER_ENABLED:
+            logging.info("Research scheduler disabled (SCHEDULER_ENABLED=false).")
+            return
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        self._sync_requested = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._rate_limiter = RateLimiter(self._rate_limit, burst=self._max_concurrency)
+        self._loop_task = asyncio.create_task(self._leadership_loop())
+        logging.info(f"Research scheduler started as {self._holder} ({self._lock.kind} leader lock).")
+
+    async def stop(self):
+        if self._loop_task is None:
+            return
+        self._loop_task.cancel()
+        await asyncio.gather(self._loop_task, return_exceptions=True)
+        self._loop_task = None
+        if self._scheduler is not None:
+            self._step_down()
+        await asyncio.to_thread(self._lock.release)
+        logging.info("Research scheduler stopped.")
+
+    def request_sync(self):
+        """Asks the leader loop to re-read subscriptions now. Safe to call from any thread."""
+        if self._loop is not None and self._sync_requested is not None:
+            self._loop.call_soon_threadsafe(self._sync_requested.set)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._scheduler is not None
+
+    async def _leadership_loop(self):
+        while True:
+            try:
+                leader = await asyncio.to_thread(self._lock.acquire)
+                if leader and self._scheduler is None:
+                    self._become_leader()
+                elif not leader and self._scheduler is not None:
+                    logging.warning("Research scheduler lost its leader lock; stopping scheduled jobs here.")
+                    self._step_down()
+                if leader and (self._sync_requested.is_set() or time.monotonic() - self._last_sync >= SCHEDULER_SYNC_SECONDS):
+                    self._sync_requested.clear()
+                    await self._sync_jobs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Research scheduler leadership check failed: {e}")
+            try:
+                await asyncio.wait_for(self._sync_requested.wait(), timeout=SCHEDULER_LEASE_SECONDS / 3)
+            except asyncio.TimeoutError:
+                pass
+
+    def _become_leader(self):
+        scheduler = AsyncIOScheduler(
+            jobstores={
+                # Its own engine: the job store disposes of it when the scheduler shuts down
+                "default": SQLAlchemyJobStore(url=SQLALCHEMY_DATABASE_URL, tablename="apscheduler_jobs"),
+                "memory": MemoryJobStore(),
+            },
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": SCHEDULER_MISFIRE_GRACE},
+            **({"timezone": SCHEDULER_TIMEZONE} if SCHEDULER_TIMEZONE else {}),
+        )
+        for func, trigger, job_id in self._system_jobs:
+            scheduler.add_job(func, trigger, id=job_id, jobstore="memory")
+        scheduler.start()
+        self._scheduler = scheduler
+        self._last_sync = 0.0
+        logging.info(f"Research scheduler {self._holder} is now the leader.")
+
+    def _step_down(self):
+        self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+
+    async def _sync_jobs(self):
+        """Makes the persisted jobs match the enabled subscriptions, leaving unchanged ones alone."""
+        db = open_async_session()
+        try:
+            subscriptions = await db.run_sync(crud.get_subscriptions, enabled_only=True)
+        finally:
+            await db.close()
+        scheduler = self._scheduler
+        wanted = {_job_id(s.id): s for s in subscriptions}
+        current = {job.id: job for job in scheduler.get_jobs(jobstore="default")}
+
+        for job_id in current.keys() - wanted.keys():
+            scheduler.remove_job(job_id, jobstore="default")
+        for job_id, subscription in wanted.items():
+            try:
+                trigger = parse_cron(subscription.cron)
+            except ValueError as e:
+                logging.error(f"Subscription {subscription.id} has an invalid schedule '{subscription.cron}': {e}")
+                continue
+            job = current.get(job_id)
+            # Replacing a job resets its next run time, so only do it when the schedule changed
+            if job is None or str(job.trigger) != str(trigger) or job.name != subscription.topic:
+                scheduler.add_job(
+                    run_subscription_job, trigger, args=[subscription.id], id=job_id,
+                    name=subscription.topic, jobstore="default", replace_existing=True,
+                )
+        self._last_sync = time.monotonic()
+
+    async def run_subscription(self, subscription_id: int):
+        fired_at = datetime.utcnow()
+        db = open_async_session()
+        try:
+            subscription = await db.run_sync(crud.get_subscription, subscription_id)
+            if subscription is None or not subscription.enabled:
+                return
+            run = await db.run_sync(crud.create_scheduled_run, subscription, fired_at)
+            self._waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._waiting -= 1
+            try:
+                await self._rate_limiter.acquire()
+                await db.run_sync(crud.start_scheduled_run, run.id, datetime.utcnow())
+                self._running += 1
+                status, error = "completed", None
+                try:
+                    await self._handler(run.task_id, run.topic)
+                except asyncio.CancelledError:
+                    # The worker is shutting down or lost leadership mid-run
+                    await db.run_sync(crud.finish_scheduled_run, run.id, "cancelled", datetime.utcnow())
+                    raise
+                except Exception as e:
+                    logging.error(f"Scheduled research for '{run.topic}' failed: {e}")
+                    status, error = "failed", str(e)
+                finally:
+                    self._running -= 1
+                await db.run_sync(crud.finish_scheduled_run, run.id, status, datetime.utcnow(), error)
+            finally:
+                self._semaphore.release()
+        finally:
+            await db.close()
+
+    def stats(self) -> dict:
+        jobs = []
+        if self._scheduler is not None:
+            jobs = [
+                {"id": job.id, "topic": job.name, "next_run_time": job.next_run_time}
+                for job in self._scheduler.get_jobs(jobstore="default")
+            ]
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "worker": self._holder,
+            "lock": self._lock.kind,
+            "is_leader": self.is_leader,
+            "max_concurrency": self._max_concurrency,
+            "rate_limit_per_minute": self._rate_limit,
+            "running": self._running,
+            "waiting": self._waiting,
+            "jobs": jobs,
+        }
+
+
+research_scheduler = ResearchScheduler()
@@ -0,0 +1,152 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import feedparser
+import httpx
+from dotenv import load_dotenv
+
+from .http_client_service import http_clients
+
+# --- 1. SETUP ---
+load_dotenv()
+
+DEFAULT_RSS_FEEDS = {
+    "Reuters World News": "http://feeds.reuters.com/reuters/worldNews",
+    "New York Times": "https://rss.nytimes.com/services/xml/rss/nyt/World.xml",
+    "The Times of India": "https://timesofindia.indiatimes.com/rssfeeds/296589292.cms", # India News
+    "The Hindu - Karnataka": "https://www.thehindu.com/news/national/karnataka/feeder/default.xml" # Karnataka News
+}
+
+RSS_CACHE_TTL = float(os.getenv("RSS_CACHE_TTL", "300"))
+RSS_FETCH_TIMEOUT = float(os.getenv("RSS_FETCH_TIMEOUT", "10"))
+RSS_PARSE_WORKERS = int(os.getenv("RSS_PARSE_WORKERS", "4"))
+# How long a feed that failed to refresh is left alone before the next attempt
+RSS_ERROR_RETRY = float(os.getenv("RSS_ERROR_RETRY", "60"))
+
+
+def load_feeds() -> Dict[str, str]:
+    """
+    Reads the feed list from RSS_FEEDS_FILE (a JSON file of {"name": "url"})
+    or the RSS_FEEDS variable (the same JSON inline), falling back to the defaults.
+    """
+    path = os.getenv("RSS_FEEDS_FILE")
+    raw = os.getenv("RSS_FEEDS")
+    try:
+        if path:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        if raw:
+            return json.loads(raw)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not load RSS feed configuration: {e}. Using the default feeds.")
+    return dict(DEFAULT_RSS_FEEDS)
+
+RSS_FEEDS = load_feeds()
+
+_parse_pool = ThreadPoolExecutor(max_workers=RSS_PARSE_WORKERS, thread_name_prefix="rss-parse")
+
+
+# --- 2. MAPPING ---
+def _map_rss_to_standard_format(entries):
+    formatted_articles = []
+    for entry in entries:
+        image_url = None
+        if 'media_content' in entry and entry.media_content:
+            image_url = entry.media_content[0]['url']
+
+        formatted_articles.append({
+            "title": entry.get("title"),
+            "description": entry.get("summary"),
+            "url": entry.get("link"),
+            "urlToImage": image_url
+        })
+    return formatted_articles
+
+
+# --- 3. FEED CACHE ---
+@dataclass
+class _FeedState:
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    articles: List[dict] = field(default_factory=list)
+    fetched_at: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < RSS_CACHE_TTL
+
+
+class FeedCache:
+    """
+    Keeps the parsed articles of every configured feed in memory, shared by
+    all requests. Stale feeds are refreshed concurrently with conditional GETs
+    (ETag / Last-Modified); parsing runs in a thread pool so it never blocks
+    the event loop. A feed that fails to refresh keeps serving its last entries.
+    """
+
+    def __init__(self, feeds: Dict[str, str]):
+        self._feeds = {name: _FeedState(url=url) for name, url in feeds.items()}
+
+    async def _refresh(self, name: str, state: _FeedState, client: httpx.AsyncClient):
+        async with state.lock:
+            # Another request may have refreshed this feed while we waited for the lock
+            if state.is_fresh():
+                return
+            headers = {}
+            if state.etag:
+                headers["If-None-Match"] = state.etag
+            if state.last_modified:
+                headers["If-Modified-Since"] = state.last_modified
+            try:
+                response = await client.get(state.url, headers=headers, timeout=RSS_FETCH_TIMEOUT)
+                if response.status_code == 304:
+                    logging.info(f"RSS feed not modified: {name}")
+                    state.fetched_at = time.monotonic()
+                    return
+                response.raise_for_status()
+                loop = asyncio.get_running_loop()
+                feed = await loop.run_in_executor(_parse_pool, feedparser.parse, response.content)
+                state.articles = _map_rss_to_standard_format(feed.entries)
+                state.etag = response.headers.get("ETag")
+                state.last_modified = response.headers.get("Last-Modified")
+                state.fetched_at = time.monotonic()
+                logging.info(f"Parsed RSS feed: {name} ({len(state.articles)} entries)")
+            except Exception as e:
+                logging.error(f"Failed to refresh RSS feed {name}: {e}")
+                state.fetched_at = time.monotonic() - RSS_CACHE_TTL + min(RSS_ERROR_RETRY, RSS_CACHE_TTL)
+
+    async def get_articles(self, client: Optional[httpx.AsyncClient] = None) -> List[dict]:
+        client = client or http_clients.get_client()
+        stale = [(name, state) for name, state in self._feeds.items() if not state.is_fresh()]
+        if stale:
+            await asyncio.gather(*(self._refresh(name, state, client) for name, state in stale))
+        return [article for state in self._feeds.values() for article in state.articles]
+
+    async def search(self, topic: str, client: Optional[httpx.AsyncClient] = None) -> List[dict]:
+        """Returns cached articles whose title or description mentions the topic as a whole word."""
+        pattern = topic_pattern(topic)
+        return [
+            article for article in await self.get_articles(client)
+            if pattern.search(article.get("title") or "")
+            or pattern.search(article.get("description") or "")
+        ]
+
+
+def topic_pattern(topic: str) -> re.Pattern:
+    """
+    Matches the topic as a whole word, case-insensitively. Built from
+    lookarounds rather than word boundaries, which never match next to a
+    topic that starts or ends in a symbol, such as "C++" or ".NET".
+    """
+    return re.compile(rf"(?<!\w){re.escape(topic)}(?!\w)", re.IGNORECASE)
+
+
+feed_cache = FeedCache(RSS_FEEDS)
@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# --- 1. SETUP ---
+load_dotenv()
+
+STOCK_HISTORY_DIR = os.getenv(
+    "STOCK_HISTORY_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "..", "stock_history")
+)
+
+# One row per trading day. Dates are stored as datetime64[D] so ranges can be
+# found with a binary search and the whole file maps straight into memory.
+HISTORY_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+INTERVALS = ("1d", "1wk", "1mo")
+
+_FILENAME_RE = re.compile(r"[^A-Za-z0-9.^=-]")
+
+
+def empty_history() -> np.ndarray:
+    return np.empty(0, dtype=HISTORY_DTYPE)
+
+def frame_to_history(frame) -> np.ndarray:
+    """Converts a yfinance OHLCV DataFrame (DatetimeIndex) to a HISTORY_DTYPE array."""
+    if frame is None or frame.empty:
+        return empty_history()
+    frame = frame.dropna(subset=["Close"])
+    index = frame.index
+    if getattr(index, "tz", None) is not None:
+        # Keep the exchange's local calendar date
+        index = index.tz_localize(None)
+    history = np.empty(len(frame), dtype=HISTORY_DTYPE)
+    history["date"] = index.values.astype("datetime64[D]")
+    for field, column in (("open", "Open"), ("high", "High"), ("low", "Low"), ("close", "Close"), ("volume", "Volume")):
+        history[field] = frame[column].to_numpy(dtype="f8", na_value=np.nan) if column in frame else np.nan
+    return history
+
+
+# --- 2. RANGE AND INTERVAL VIEWS ---
+def range_bounds(dates: np.ndarray, start: Optional[str] = None, end: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Index bounds of the rows with start <= date <= end (ISO dates, both
+    optional), so the history and any columns derived from it can be sliced
+    as views rather than copies.
+    """
+    lo = int(np.searchsorted(dates, np.datetime64(start, "D"), side="left")) if start else 0
+    hi = int(np.searchsorted(dates, np.datetime64(end, "D"), side="right")) if end else len(dates)
+    return lo, hi
+
+def resample(history: np.ndarray, interval: str = "1d") -> np.ndarray:
+    """
+    Aggregates daily bars into weekly or monthly ones: first open, highest
+    high, lowest low, last close and summed volume per period, dated by the
+    first trading day of the period.
+    """
+    if interval == "1d" or len(history) == 0:
+        return history
+    if interval == "1wk":
+        # 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+        periods = (history["date"].astype("i8") + 3) // 7
+    elif interval == "1mo":
+        periods = history["date"].astype("datetime64[M]").astype("i8")
+    else:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    ends = np.r_[starts[1:], len(history)] - 1
+    bars = np.empty(len(starts), dtype=HISTORY_DTYPE)
+    bars["date"] = history["date"][starts]
+    bars["open"] = history["open"][starts]
+    bars["high"] = np.maximum.reduceat(history["high"], starts)
+    bars["low"] = np.minimum.reduceat(history["low"], starts)
+    bars["close"] = history["close"][ends]
+    bars["volume"] = np.add.reduceat(history["volume"], starts)
+    return bars
+
+def _json_list(values: np.ndarray) -> list:
+    """Converts a float column to a list, with None where the value is NaN (JSON has no NaN)."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+def to_records(history: np.ndarray, extra: Optional[Dict[str, np.ndarray]] = None) -> List[dict]:
+    """The [{"Date", "Close", ...extra}, ...] shape the frontend chart reads."""
+    extra = extra or {}
+    keys = ["Date", "Close", *extra]
+    columns = [np.datetime_as_string(history["date"], unit="D").tolist(), _json_list(history["close"])]
+    columns += [_json_list(values) for values in extra.values()]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+def to_columns(history: np.ndarray, extra: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, list]:
+    """One list per field; each column is converted in a single vectorized call."""
+    columns = {
+        "Date": np.datetime_as_string(history["date"], unit="D").tolist(),
+        "Open": _json_list(history["open"]),
+        "High": _json_list(history["high"]),
+        "Low": _json_list(history["low"]),
+        "Close": _json_list(history["close"]),
+        "Volume": _json_list(history["volume"]),
+    }
+    for name, values in (extra or {}).items():
+        columns[name] = _json_list(values)
+    return columns
+
+
+# --- 3. STORE ---
+class StockHistoryStore:
+    """
+    Daily OHLCV history kept as one .npy file per symbol. Files are read on
+    first use and the arrays stay in memory, so serving a cached symbol is a
+    dictionary lookup plus a binary search. Updates only rewrite the bars from
+    the first fetched day onwards and replace the file atomically; no file is
+    held open (or memory mapped) meanwhile, which Windows would refuse to replace.
+    """
+
+    def __init__(self, directory: str = STOCK_HISTORY_DIR):
+        self._directory = os.path.abspath(directory)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self._directory, _FILENAME_RE.sub("_", symbol.upper()) + ".npy")
+
+    def load(self, symbol: str) -> np.ndarray:
+        symbol = symbol.upper()
+        history = self._arrays.get(symbol)
+        if history is not None:
+            return history
+        try:
+            history = np.load(self._path(symbol), allow_pickle=False)
+            if history.dtype != HISTORY_DTYPE:
+                logging.warning(f"Ignoring stock history file for {symbol} with an unexpected layout.")
+                history = empty_history()
+        except FileNotFoundError:
+            history = empty_history()
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read stock history for {symbol}: {e}")
+            history = empty_history()
+        self._arrays[symbol] = history
+        return history
+
+    def age(self, symbol: str) -> Optional[float]:
+        """Seconds since the symbol's file was last written, or None if there is no file."""
+        try:
+            return time.time() - os.path.getmtime(self._path(symbol))
+        except OSError:
+            return None
+
+    def merge(self, symbol: str, fetched: np.ndarray) -> np.ndarray:
+        """
+        Replaces every stored bar from the first fetched date onwards with the
+        fetched bars and persists the result. Returns the new history.
+        """
+        current = self.load(symbol)
+        cut = np.searchsorted(current["date"], fetched["date"][0], side="left") if len(fetched) else len(current)
+        return self.save(symbol, np.concatenate([current[:cut], fetched]))
+
+    def save(self, symbol: str, history: np.ndarray) -> np.ndarray:
+        symbol = symbol.upper()
+        path = self._path(symbol)
+        os.makedirs(self._directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, history, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The in-memory copy still serves requests; the next update retries the write
+            logging.error(f"Could not write stock history for {symbol}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._arrays[symbol] = history
+        return history
+
+    def stats(self) -> dict:
+        return {
+            "directory": self._directory,
+            "symbols_loaded": len(self._arrays),
+            "bars_loaded": int(sum(len(a) for a in self._arrays.values())),
+        }
+
+
+history_store = StockHistoryStore()
@@ -0,0 +1,472 @@
+import os
+import re
+import abc
+import time
+import queue
+import asyncio
+import logging
+import itertools
+import threading
+import multiprocessing
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+from .batch_summarizer import BatchSummarizer
+from .http_client_service import HUGGINGFACE_API_URL
+from .topic_extractor import STOPWORDS
+from .. import metrics
+
+# --- 1. SETUP ---
+load_dotenv()
+
+# "http" (HuggingFace inference API), "local" (ONNX model in a worker process) or "extractive" (TextRank)
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "http").lower()
+# Used for texts the main backend returns nothing for: "extractive" or "none". Off by
+# default, so a failing backend shows up as missing summaries in the success rate
+SUMMARIZER_FALLBACK = os.getenv("SUMMARIZER_FALLBACK", "none").lower()
+
+HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
+HEADERS = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
+TIMEOUT = httpx.Timeout(20.0) # Reduced timeout
+
+SUMMARIZATION_MODEL = "facebook/bart-large-cnn"
+SUMMARIZATION_URL = f"{HUGGINGFACE_API_URL}/{SUMMARIZATION_MODEL}"
+
+LOCAL_SUMMARIZER_MODEL = os.getenv("LOCAL_SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-6-6")
+LOCAL_SUMMARIZER_MAX_BATCH = int(os.getenv("LOCAL_SUMMARIZER_MAX_BATCH", "8"))
+LOCAL_SUMMARIZER_MAX_WAIT = float(os.getenv("LOCAL_SUMMARIZER_MAX_WAIT", "0.02"))
+# Requests waiting for or inside the worker; beyond this new texts are refused straight away
+LOCAL_SUMMARIZER_QUEUE_SIZE = int(os.getenv("LOCAL_SUMMARIZER_QUEUE_SIZE", "64"))
+LOCAL_SUMMARIZER_TIMEOUT = float(os.getenv("LOCAL_SUMMARIZER_TIMEOUT", "60"))
+LOCAL_SUMMARIZER_MAX_INPUT_TOKENS = 512
+LOCAL_SUMMARIZER_MAX_OUTPUT_TOKENS = 96
+
+EXTRACTIVE_SUMMARY_SENTENCES = int(os.getenv("EXTRACTIVE_SUMMARY_SENTENCES", "2"))
+
+
+def _word_count(texts: List[Optional[str]]) -> int:
+    """Whitespace tokens; the HTTP and extractive backends use this as their token count."""
+    return sum(len(text.split()) for text in texts if text)
+
+
+# --- 2. BACKEND BASE ---
+class SummarizerBackend(abc.ABC):
+    """
+    Summarizes one text at a time; backends batch concurrent calls as suits
+    them. `model` names the summaries in the summary cache, so switching
+    backends never serves another backend's summaries.
+    """
+
+    name = "base"
+    model = "base"
+
+    def __init__(self):
+        self.batches = 0
+        self.texts = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.max_batch_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def start(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @abc.abstractmethod
+    async def summarize(self, client: httpx.AsyncClient, text: str) -> Optional[str]:
+        ...
+
+    def _record(self, texts: int, failures: int, seconds: float, input_tokens: int, output_tokens: int):
+        self.batches += 1
+        self.texts += texts
+        self.failures += failures
+        self.busy_seconds += seconds
+        self.max_batch_seconds = max(self.max_batch_seconds, seconds)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        metrics.SUMMARIZER_SECONDS.observe(seconds, backend=self.name)
+        metrics.SUMMARIZER_TOKENS.inc(input_tokens, backend=self.name, direction="input")
+        metrics.SUMMARIZER_TOKENS.inc(output_tokens, backend=self.name, direction="output")
+
+    def stats(self) -> dict:
+        busy = self.busy_seconds
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "batches": self.batches,
+            "texts": self.texts,
+            "failures": self.failures,
+            "avg_batch_ms": round(busy / self.batches * 1000, 2) if self.batches else 0.0,
+            "max_batch_ms": round(self.max_batch_seconds * 1000, 2),
+            "input_tokens_per_second": round(self.input_tokens / busy, 1) if busy else 0.0,
+            "output_tokens_per_second": round(self.output_tokens / busy, 1) if busy else 0.0,
+        }
+
+
+# --- 3. HTTP BACKEND ---
+class HttpSummarizer(SummarizerBackend):
+    """The HuggingFace inference API, with concurrent calls micro-batched into shared requests."""
+
+    name = "http"
+    model = SUMMARIZATION_MODEL
+
+    def __init__(self):
+        super().__init__()
+        self.batcher = BatchSummarizer(self._summarize_batch)
+
+    async def _summarize_batch(self, client: httpx.AsyncClient, texts: List[str]) -> List[Optional[str]]:
+        start = time.perf_counter()
+        summaries = await self._send_batch(client, texts)
+        failed = sum(1 for summary in summaries if not summary)
+        self._record(len(texts), failed, time.perf_counter() - start, _word_count(texts), _word_count(summaries))
+        return summaries
+
+    async def _send_batch(self, client: httpx.AsyncClient, texts: List[str]) -> List[Optional[str]]:
+        """
+        Calls the summarization API once for a whole batch of texts with detailed
+        logging. Returns one summary per text, or None for every text on failure.
+        """
+        failed = [None] * len(texts)
+        try:
+            if not HUGGINGFACE_TOKEN:
+                print("Summarization failed: HUGGINGFACE_TOKEN not set.")
+                metrics.SUMMARIZER_FAILURES.inc(reason="no_token")
+                return failed
+
+            response = await client.post(
+                SUMMARIZATION_URL, headers=HEADERS, json={"inputs": texts}, timeout=TIMEOUT
+            )
+            response.raise_for_status()
+            result = response.json()
+
+            if isinstance(result, dict) and result.get("error"):
+                print(f"Summarization API returned an error: {result['error']}")
+                metrics.SUMMARIZER_FAILURES.inc(reason="api_error")
+                return failed
+
+            return [item.get("summary_text") if isinstance(item, dict) else None for item in result]
+
+        except httpx.HTTPStatusError as e:
+            print(f"Summarization API call failed with status {e.response.status_code}: {e.response.text}")
+            metrics.SUMMARIZER_FAILURES.inc(reason=f"http_{e.response.status_code}")
+            return failed
+        except httpx.TimeoutException:
+            print("Summarization API call timed out after 20 seconds.")
+            metrics.SUMMARIZER_FAILURES.inc(reason="timeout")
+            return failed
+        except Exception as e:
+            print(f"An unexpected error occurred during summarization: {e}")
+            metrics.SUMMARIZER_FAILURES.inc(reason="exception")
+            return failed
+
+    async def summarize(self, client: httpx.AsyncClient, text: str) -> Optional[str]:
+        return await self.batcher.summarize(client, text)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "batching": self.batcher.stats()}
+
+
+# --- 4. LOCAL ONNX BACKEND (worker process) ---
+# Returns a function mapping a list of texts to (summaries, input tokens, output tokens)
+ModelLoader = Callable[[str], Callable[[List[str]], Tuple[List[Optional[str]], int, int]]]
+
+def load_onnx_model(model_name: str):
+    """
+    Loads a seq2seq summarization model exported to ONNX and runs it on CPU.
+    Needs `pip install optimum[onnxruntime]`; runs inside the worker process.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+
+    def generate(texts: List[str]):
+        inputs = tokenizer(
+            texts, truncation=True, max_length=LOCAL_SUMMARIZER_MAX_INPUT_TOKENS, padding=True, return_tensors="pt"
+        )
+        output_ids = model.generate(**inputs, max_new_tokens=LOCAL_SUMMARIZER_MAX_OUTPUT_TOKENS, num_beams=2)
+        summaries = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+        output_tokens = int((output_ids != tokenizer.pad_token_id).sum())
+        return [s.strip() or None for s in summaries], int(inputs["attention_mask"].sum()), output_tokens
+
+    return generate
+
+def _local_worker_main(loader: ModelLoader, model_name: str, requests, responses, max_batch: int, max_wait: float):
+    """
+    Worker process loop. Waits for a request, then keeps collecting more for
+    up to max_wait seconds (or max_batch requests) and runs them as one batch.
+    Requests that arrive while a batch is generating form the next batch.
+    """
+    try:
+        generate = loader(model_name)
+    except Exception as e:
+        responses.put(("error", f"{type(e).__name__}: {e}"))
+        return
+    responses.put(("ready", model_name))
+
+    stopping = False
+    while not stopping:
+        item = requests.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < max_batch:
+            try:
+                item = requests.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            summaries, input_tokens, output_tokens = generate([text for _, text in batch])
+        except Exception as e:
+            summaries, input_tokens, output_tokens, error = [None] * len(batch), 0, 0, f"{type(e).__name__}: {e}"
+        results = [(request_id, summary) for (request_id, _), summary in zip(batch, summaries)]
+        responses.put(("batch", results, input_tokens, output_tokens, time.perf_counter() - start, error))
+
+
+class LocalSummarizer(SummarizerBackend):
+    """
+    A distilled summarization model on CPU (ONNX Runtime) in a dedicated
+    worker process, so generation never competes with the event loop. The
+    worker batches requests dynamically. At most `queue_size` requests are
+    outstanding; beyond that, and whenever the worker is not running, texts
+    get no summary straight away and the fallback backend takes over.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_name: str = LOCAL_SUMMARIZER_MODEL,
+        loader: ModelLoader = load_onnx_model,
+        max_batch: int = LOCAL_SUMMARIZER_MAX_BATCH,
+        max_wait: float = LOCAL_SUMMARIZER_MAX_WAIT,
+        queue_size: int = LOCAL_SUMMARIZER_QUEUE_SIZE,
+        timeout: float = LOCAL_SUMMARIZER_TIMEOUT,
+    ):
+        super().__init__()
+        self.model = model_name
+        self._loader = loader
+        self._max_batch = max(1, max_batch)
+        self._max_wait = max_wait
+        self._queue_size = max(1, queue_size)
+        self._timeout = timeout
+        self._process: Optional[multiprocessing.Process] = None
+        self._requests = None
+        self._responses = None
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._ready = threading.Event()
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        self._requests = context.Queue()
+        self._responses = context.Queue()
+        self._process = context.Process(
+            target=_local_worker_main,
+            args=(self._loader, self.model, self._requests, self._responses, self._max_batch, self._max_wait),
+            name="summarizer-worker",
+            daemon=True,
+        )
+        self._process.start()
+        self._reader = threading.Thread(target=self._read_responses, name="summarizer-reader", daemon=True)
+        self._reader.start()
+        logging.info(f"Local summarizer worker started for {self.model}; the model loads in the background.")
+
+    async def shutdown(self):
+        if self._process is None:
+            return
+        self._ready.clear()
+        try:
+            self._requests.put(None)
+        except (OSError, ValueError):
+            pass
+        await asyncio.to_thread(self._process.join, 5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._responses.put(("stopped",))
+        await asyncio.to_thread(self._reader.join, 5)
+        self._process = None
+        self._fail_pending()
+
+    def _read_responses(self):
+        """Runs in a thread: hands worker results back to the waiting coroutines."""
+        while True:
+            try:
+                message = self._responses.get(timeout=1.0)
+            except queue.Empty:
+                if self._process is not None and not self._process.is_alive():
+                    logging.error(f"Local summarizer worker exited (code {self._process.exitcode}).")
+                    self._ready.clear()
+                    self._loop.call_soon_threadsafe(self._fail_pending)
+                    return
+                continue
+            kind = message[0]
+            if kind == "stopped":
+                return
+            if kind == "ready":
+                self._ready.set()
+                logging.info(f"Local summarizer model {message[1]} is ready.")
+            elif kind == "error":
+                logging.error(f"Local summarizer could not load {self.model}: {message[1]}")
+                return
+            elif kind == "batch":
+                _, results, input_tokens, output_tokens, seconds, error = message
+                self._loop.call_soon_threadsafe(self._finish_batch, results, input_tokens, output_tokens, seconds, error)
+
+    def _finish_batch(self, results, input_tokens: int, output_tokens: int, seconds: float, error: Optional[str]):
+        if error:
+            logging.error(f"Local summarizer batch failed: {error}")
+            metrics.SUMMARIZER_FAILURES.inc(reason="local_model_error")
+        failed = sum(1 for _, summary in results if not summary)
+        self._record(len(results), failed, seconds, input_tokens, output_tokens)
+        for request_id, summary in results:
+            future = self._pending.pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_result(summary)
+
+    def _fail_pending(self):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_result(None)
+
+    async def summarize(self, client: httpx.AsyncClient, text: str) -> Optional[str]:
+        if not self._ready.is_set():
+            metrics.SUMMARIZER_FAILURES.inc(reason="local_unavailable")
+            return None
+        if len(self._pending) >= self._queue_size:
+            self.rejected += 1
+            metrics.SUMMARIZER_FAILURES.inc(reason="local_queue_full")
+            return None
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        self._requests.put((request_id, text))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self._timeout)
+        except asyncio.TimeoutError:
+            # The worker still answers eventually; the late result is dropped
+            self._pending.pop(request_id, None)
+            self.timeouts += 1
+            metrics.SUMMARIZER_FAILURES.inc(reason="local_timeout")
+            return None
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "ready": self._ready.is_set(),
+            "worker_alive": self._process is not None and self._process.is_alive(),
+            "max_batch_size": self._max_batch,
+            "max_wait": self._max_wait,
+            "queue_size": self._queue_size,
+            "outstanding": len(self._pending),
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+# --- 5. EXTRACTIVE BACKEND (TextRank) ---
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'A-Z0-9])")
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+def textrank_summary(text: str, sentences: int = EXTRACTIVE_SUMMARY_SENTENCES, damping: float = 0.85) -> Optional[str]:
+    """
+    Picks the `sentences` most central sentences, in their original order.
+    Sentence similarity is the TextRank word overlap normalized by the log
+    sentence lengths; centrality is PageRank over that similarity graph,
+    computed by power iteration on the whole matrix at once.
+    """
+    parts = [s.strip() for s in _SENTENCE_RE.split(text.strip()) if s.strip()]
+    if len(parts) <= sentences:
+        return " ".join(parts) or None
+
+    words = [{w for w in _WORD_RE.findall(part.lower()) if w not in STOPWORDS} for part in parts]
+    vocabulary = {w: i for i, w in enumerate(sorted(set().union(*words)))}
+    if not vocabulary:
+        return " ".join(parts[:sentences])
+    n = len(parts)
+    occurrences = np.zeros((n, len(vocabulary)))
+    for i, sentence_words in enumerate(words):
+        occurrences[i, [vocabulary[w] for w in sentence_words]] = 1.0
+
+    overlap = occurrences @ occurrences.T
+    log_lengths = np.log(occurrences.sum(axis=1) + 1.0)
+    similarity = overlap / np.maximum(log_lengths[:, None] + log_lengths[None, :], 1e-9)
+    np.fill_diagonal(similarity, 0.0)
+    # Row-normalize into a transition matrix; sentences sharing no words link to all others
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / n), where=out_weight > 0)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(50):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-8:
+            scores = updated
+            break
+        scores = updated
+    chosen = np.sort(np.argsort(-scores, kind="stable")[:sentences])
+    return " ".join(parts[i] for i in chosen)
+
+
+class ExtractiveSummarizer(SummarizerBackend):
+    """TextRank sentence extraction with NumPy: no model, no network, a few milliseconds per article."""
+
+    name = "extractive"
+    model = "textrank"
+
+    def __init__(self, sentences: int = EXTRACTIVE_SUMMARY_SENTENCES):
+        super().__init__()
+        self._sentences = sentences
+
+    async def summarize(self, client: httpx.AsyncClient, text: str) -> Optional[str]:
+        start = time.perf_counter()
+        summary = textrank_summary(text, self._sentences)
+        self._record(1, 0 if summary else 1, time.perf_counter() - start, _word_count([text]), _word_count([summary]))
+        return summary
+
+
+# --- 6. SELECTION ---
+_BACKENDS = {"http": HttpSummarizer, "local": LocalSummarizer, "extractive": ExtractiveSummarizer}
+
+_backend: Optional[SummarizerBackend] = None
+_fallback: Optional[SummarizerBackend] = None
+
+def get_backend() -> SummarizerBackend:
+    global _backend
+    if _backend is None:
+        if SUMMARIZER_BACKEND not in _BACKENDS:
+            logging.error(f"Unknown SUMMARIZER_BACKEND '{SUMMARIZER_BACKEND}'; using the HTTP backend.")
+        _backend = _BACKENDS.get(SUMMARIZER_BACKEND, HttpSummarizer)()
+    return _backend
+
+def get_fallback() -> Optional[SummarizerBackend]:
+    """The backend used when the main one returns nothing, or None if there is none."""
+    global _fallback
+    if _fallback is None and SUMMARIZER_FALLBACK == "extractive" and get_backend().name != "extractive":
+        _fallback = ExtractiveSummarizer()
+    return _fallback
+
+def stats() -> dict:
+    fallback = get_fallback()
+    return {**get_backend().stats(), "fallback": fallback.stats() if fallback else None}
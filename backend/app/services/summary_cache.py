@@ -0,0 +1,148 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Optional
+from dotenv import load_dotenv
+
+from .. import crud
+from ..database import SessionLocal
+
+# --- 1. SETUP ---
+load_dotenv()
+
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "5000"))
+# Set to "false" to keep the cache in memory only
+SUMMARY_CACHE_PERSIST = os.getenv("SUMMARY_CACHE_PERSIST", "true").lower() == "true"
+# Stored summaries older than this many days are pruned; 0 keeps them forever
+SUMMARY_CACHE_TTL_DAYS = float(os.getenv("SUMMARY_CACHE_TTL_DAYS", "30"))
+# The table is trimmed to this many of the newest summaries; 0 for no limit
+SUMMARY_CACHE_MAX_ROWS = int(os.getenv("SUMMARY_CACHE_MAX_ROWS", "100000"))
+SUMMARY_CACHE_PRUNE_MINUTES = int(os.getenv("SUMMARY_CACHE_PRUNE_MINUTES", "60"))
+
+
+def cache_key(text: str, model: str) -> str:
+    """Hashes the model name together with the whitespace-normalized input text."""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+# --- 2. TWO-TIER CACHE ---
+class SummaryCache:
+    """
+    Content-addressed cache of summaries: an in-memory LRU in front of the
+    summary_cache table. Database lookups run in a worker thread so they never
+    block the event loop, and a database error is treated as a miss. The
+    table is kept in bounds by prune(), which the scheduler leader runs.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = SUMMARY_CACHE_SIZE,
+        persist: bool = SUMMARY_CACHE_PERSIST,
+        ttl_days: float = SUMMARY_CACHE_TTL_DAYS,
+        max_rows: int = SUMMARY_CACHE_MAX_ROWS,
+    ):
+        self._maxsize = maxsize
+        self._persist = persist
+        self._ttl_days = ttl_days
+        self._max_rows = max_rows
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        self.pruned = 0
+
+    def _remember(self, key: str, summary: str):
+        with self._lock:
+            self._memory[key] = summary
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._maxsize:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    @staticmethod
+    def _load(key: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            return crud.get_cached_summary(db, key)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save(key: str, model: str, summary: str):
+        db = SessionLocal()
+        try:
+            crud.save_cached_summary(db, key, model, summary)
+        finally:
+            db.close()
+
+    async def get(self, text: str, model: str) -> Optional[str]:
+        key = cache_key(text, model)
+        with self._lock:
+            summary = self._memory.get(key)
+            if summary is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return summary
+
+        if self._persist:
+            try:
+                summary = await asyncio.to_thread(self._load, key)
+            except Exception as e:
+                logging.error(f"Summary cache lookup failed: {e}")
+                summary = None
+            if summary is not None:
+                self.db_hits += 1
+                self._remember(key, summary)
+                return summary
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, model: str, summary: str):
+        key = cache_key(text, model)
+        self._remember(key, summary)
+        self.stores += 1
+        if self._persist:
+            try:
+                await asyncio.to_thread(self._save, key, model, summary)
+            except Exception as e:
+                logging.error(f"Failed to persist summary cache entry: {e}")
+
+    def prune(self) -> int:
+        """Deletes stored summaries past the TTL or beyond the row limit, oldest first; returns how many were removed."""
+        if not self._persist:
+            return 0
+        older_than = datetime.utcnow() - timedelta(days=self._ttl_days) if self._ttl_days > 0 else None
+        db = SessionLocal()
+        try:
+            removed = crud.prune_cached_summaries(db, older_than=older_than, max_rows=self._max_rows)
+        finally:
+            db.close()
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "size": len(self._memory),
+            "max_size": self._maxsize,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "stores": self.stores,
+            "pruned": self.pruned,
+        }
+
+
+summary_cache = SummaryCache()
@@ -0,0 +1,102 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+# --- 1. SETUP ---
+load_dotenv()
+
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", "4"))
+RESEARCH_QUEUE_MAXSIZE = int(os.getenv("RESEARCH_QUEUE_MAXSIZE", "100"))
+
+JobHandler = Callable[[int, str], Awaitable[None]]
+
+
+class QueueFullError(Exception):
+    """Raised when a research job is submitted while the queue is at capacity."""
+
+
+# --- 2. IN-PROCESS WORKER POOL ---
+class ResearchQueue:
+    """
+    A bounded asyncio queue drained by a fixed number of worker coroutines.
+    Each job is a (task_id, topic) pair; the handler is responsible for
+    running the research pipeline and persisting the outcome on the Task row.
+    """
+
+    def __init__(self, handler: JobHandler, workers: int = RESEARCH_WORKERS, maxsize: int = RESEARCH_QUEUE_MAXSIZE):
+        self._handler = handler
+        self._num_workers = max(1, workers)
+        self._maxsize = max(1, maxsize)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._done: Dict[int, asyncio.Event] = {}
+        self._active = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self._num_workers)]
+        logging.info(f"Research queue started with {self._num_workers} workers (max depth {self._maxsize}).")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logging.info("Research queue stopped.")
+
+    def has_capacity(self) -> bool:
+        return self._queue is not None and not self._queue.full()
+
+    def submit(self, task_id: int, topic: str):
+        """Enqueues a job without waiting. Raises QueueFullError if the queue is full."""
+        if self._queue is None:
+            raise RuntimeError("Research queue has not been started.")
+        try:
+            self._queue.put_nowait((task_id, topic))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Research queue is full ({self._maxsize} pending jobs).")
+        self._done[task_id] = asyncio.Event()
+
+    def is_pending(self, task_id: int) -> bool:
+        """Whether the job was submitted to this process and has not finished yet."""
+        return task_id in self._done
+
+    async def wait(self, task_id: int, timeout: float) -> bool:
+        """
+        Waits for a job submitted to this process to finish.
+        Returns True if it finished (or is unknown here), False on timeout.
+        """
+        event = self._done.get(task_id)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "workers": self._num_workers,
+            "max_depth": self._maxsize,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "active": self._active,
+        }
+
+    async def _worker(self, worker_id: int):
+        while True:
+            task_id, topic = await self._queue.get()
+            self._active += 1
+            try:
+                logging.info(f"Research worker {worker_id} picked up task {task_id} ('{topic}').")
+                await self._handler(task_id, topic)
+            except Exception as e:
+                logging.error(f"Research worker {worker_id} failed on task {task_id}: {e}")
+            finally:
+                self._active -= 1
+                event = self._done.pop(task_id, None)
+                if event:
+                    event.set()
+                self._queue.task_done()
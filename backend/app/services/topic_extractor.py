@@ -0,0 +1,200 @@
+import os
+import re
+import abc
+import asyncio
+import logging
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+from dotenv import load_dotenv
+
+# --- 1. SETUP ---
+load_dotenv()
+
+# "textblob" (noun-phrase chunking in a process pool) or "fast" (regex/stopword keyphrase scorer)
+TOPIC_EXTRACTOR = os.getenv("TOPIC_EXTRACTOR", "textblob").lower()
+TOPIC_EXTRACTOR_WORKERS = int(os.getenv("TOPIC_EXTRACTOR_WORKERS", "2"))
+MAX_TOPICS = 3
+
+
+def _format_topics(phrases: List[str]) -> str:
+    """Keeps the first MAX_TOPICS distinct phrases, in order, as a comma-separated string."""
+    unique = list(dict.fromkeys(p.strip() for p in phrases if p.strip()))
+    return ", ".join(unique[:MAX_TOPICS])
+
+
+# --- 2. TEXTBLOB EXTRACTOR (process pool) ---
+def _warm_textblob():
+    """Process pool initializer: loads the tagger and chunker once per worker."""
+    from textblob import TextBlob
+    try:
+        TextBlob("Warm up the noun phrase extractor.").noun_phrases
+    except Exception as e:
+        logging.error(f"TextBlob warm-up failed: {e}")
+
+def _textblob_extract_batch(texts: List[str]) -> List[Optional[str]]:
+    from textblob import TextBlob
+    results = []
+    for text in texts:
+        try:
+            results.append(_format_topics(list(TextBlob(text).noun_phrases)))
+        except Exception as e:
+            print(f"Topic extraction failed: {e}")
+            results.append(None)
+    return results
+
+def _noop():
+    return None
+
+
+class TopicExtractor(abc.ABC):
+    """Turns article texts into a short comma-separated list of topics."""
+
+    name = "base"
+
+    async def start(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @abc.abstractmethod
+    async def extract_batch(self, texts: List[str]) -> List[Optional[str]]:
+        ...
+
+
+class TextBlobExtractor(TopicExtractor):
+    """
+    TextBlob noun-phrase extraction. Tagging and chunking are CPU-bound, so
+    they run in a process pool whose workers load their models once at
+    startup; each call ships a whole batch of texts to one worker per chunk.
+    """
+
+    name = "textblob"
+
+    def __init__(self, workers: int = TOPIC_EXTRACTOR_WORKERS):
+        self._workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned like the local summarizer's worker: forking a process that
+            # runs an event loop and helper threads can copy held locks
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_textblob,
+            )
+        return self._pool
+
+    async def start(self):
+        # Submitting one no-op per worker makes every worker spawn and run its warm-up now
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(self._workers)))
+            logging.info(f"TextBlob topic extractor warmed up with {self._workers} worker processes.")
+        except BrokenProcessPool as e:
+            logging.error(f"TextBlob worker pool failed to start: {e}")
+            self._pool = None
+
+    async def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def extract_batch(self, texts: List[str]) -> List[Optional[str]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        size = -(-len(texts) // self._workers)
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        try:
+            results = await asyncio.gather(*(loop.run_in_executor(pool, _textblob_extract_batch, c) for c in chunks))
+        except BrokenProcessPool as e:
+            # A worker died; drop the pool so the next call starts a fresh one
+            print(f"Topic extraction failed: {e}")
+            self._pool = None
+            return [None] * len(texts)
+        return [topics for chunk in results for topics in chunk]
+
+
+# --- 3. FAST KEYPHRASE EXTRACTOR ---
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself
+new no nor not now of off on once only or other our ours ourselves out over own said same says she should
+so some such than that the their theirs them themselves then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you your yours
+yourself yourselves one two three first last year years today yesterday tomorrow week monday tuesday
+wednesday thursday friday saturday sunday according told report reports reported amid via per
+""".split())
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9'\-]*|[.,;:!?()\"]")
+
+
+class FastKeyphraseExtractor(TopicExtractor):
+    """
+    A RAKE-style keyphrase scorer: candidate phrases are runs of words between
+    stopwords and punctuation, and each phrase scores the sum of its words'
+    degree/frequency ratios. Pure regex and counting, so it runs in-process in
+    microseconds per article without blocking the event loop noticeably.
+    """
+
+    name = "fast"
+
+    def __init__(self, max_phrase_words: int = 3):
+        self._max_phrase_words = max_phrase_words
+
+    def extract(self, text: str) -> Optional[str]:
+        phrases, current = [], []
+        for token in _TOKEN_RE.findall(text):
+            word = token.lower()
+            if (len(token) == 1 and not token.isalnum()) or word in STOPWORDS or len(word) < 3:
+                if current:
+                    phrases.append(current)
+                current = []
+            else:
+                current.append(token)
+                if len(current) == self._max_phrase_words:
+                    phrases.append(current)
+                    current = []
+        if current:
+            phrases.append(current)
+        if not phrases:
+            return None
+
+        frequency, degree = Counter(), defaultdict(int)
+        for phrase in phrases:
+            for word in phrase:
+                frequency[word.lower()] += 1
+                degree[word.lower()] += len(phrase)
+
+        scored = {}
+        for phrase in phrases:
+            key = " ".join(w.lower() for w in phrase)
+            score = sum(degree[w.lower()] / frequency[w.lower()] for w in phrase)
+            scored[key] = max(scored.get(key, 0.0), score)
+        best = sorted(scored, key=lambda k: (-scored[k], k))
+        return _format_topics(best)
+
+    async def extract_batch(self, texts: List[str]) -> List[Optional[str]]:
+        return [self.extract(text) for text in texts]
+
+
+# --- 4. SELECTION ---
+_extractor: Optional[TopicExtractor] = None
+
+def get_extractor() -> TopicExtractor:
+    global _extractor
+    if _extractor is None:
+        _extractor = FastKeyphraseExtractor() if TOPIC_EXTRACTOR == "fast" else TextBlobExtractor()
+    return _extractor
+
+async def extract_topics(texts: List[str]) -> List[Optional[str]]:
+    """Extracts topics for a batch of texts with the configured extractor."""
+    return await get_extractor().extract_batch(texts)
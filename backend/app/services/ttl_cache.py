@@ -0,0 +1,102 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+Fetcher = Callable[[], Awaitable[Any]]
+
+
+class AsyncTTLCache:
+    """
+    An in-memory cache for slow async lookups with three properties:
+
+    - TTL per call: a value is fresh for `ttl` seconds after it was fetched.
+    - Single-flight: concurrent misses for the same key share one fetch.
+    - Stale-while-revalidate: for `stale_ttl` seconds after expiry the old value
+      is served immediately while one background fetch refreshes it.
+
+    Values for which `is_error(value)` is true are kept only for `error_ttl`
+    seconds and never served stale. The cache holds at most `maxsize` keys.
+    """
+
+    def __init__(self, maxsize: int = 1024, error_ttl: float = 30.0, is_error: Callable[[Any], bool] = lambda v: False):
+        self._maxsize = maxsize
+        self._error_ttl = error_ttl
+        self._is_error = is_error
+        self._entries: OrderedDict[Hashable, Tuple[Any, float, bool]] = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = (value, time.monotonic(), self._is_error(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def _start_fetch(self, key: Hashable, fetcher: Fetcher) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        async def run():
+            try:
+                value = await fetcher()
+                self._store(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(run())
+        self._inflight[key] = task
+        return task
+
+    def peek(self, key: Hashable, ttl: float) -> Optional[Any]:
+        """Returns a fresh cached value without fetching, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, fetched_at, is_error = entry
+        age = time.monotonic() - fetched_at
+        return value if age < (self._error_ttl if is_error else ttl) else None
+
+    def set(self, key: Hashable, value: Any):
+        self._store(key, value)
+
+    async def get_or_fetch(self, key: Hashable, fetcher: Fetcher, ttl: float, stale_ttl: float = 0.0) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at, is_error = entry
+            age = time.monotonic() - fetched_at
+            if age < (self._error_ttl if is_error else ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if not is_error and age < ttl + stale_ttl:
+                self.stale_hits += 1
+                task = self._start_fetch(key, fetcher)
+                task.add_done_callback(_log_refresh_failure)
+                return value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_fetch(key, fetcher))
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self._maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+def _log_refresh_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Background cache refresh failed: {task.exception()}")
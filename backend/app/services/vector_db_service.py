@@ -1,75 +1,253 @@
 # app/services/vector_db_service.py
+import os
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
 
-# We've commented this out to save memory
-# from sentence_transformers import SentenceTransformer
-#from qdrant_client import QdrantClient, models
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import update
+from sqlalchemy.orm import Session
 
+from .. import models
+from ..database import AsyncDB
+from .http_client_service import http_clients
 
-# --- MODIFICATION: Lazy Loading for the Embedding Model ---
+# --- 1. SETUP ---
+load_dotenv()
 
-#embedding_model = None # Don't load the model on startup
-#EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+# "disabled" (default), "qdrant", or "numpy" for an in-process index with no Qdrant server
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "disabled").lower()
+# "inline": the API process indexes new documents after each research run.
+# "worker": leave it to the embedding worker (app.embedding_worker), so the API never loads the model.
+VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "inline").lower()
+# When set, embeddings are requested from the embedding worker instead of a local model.
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL")
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_PATH = os.getenv(
+    "QDRANT_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "..", "qdrant_data")
+)
+COLLECTION_NAME = "ai_knowledge_worker"
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
 # We know the dimension for this model is 384, which is needed for the collection.
-#EMBEDDING_DIMENSION = 384
+EMBEDDING_DIMENSION = 384
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+NUMPY_INDEX_MAX_DOCS = int(os.getenv("NUMPY_INDEX_MAX_DOCS", "100000"))
+
+
+def is_enabled() -> bool:
+    return VECTOR_BACKEND in ("qdrant", "numpy")
+
+# The API and the embedding worker are separate processes, so they can only share a Qdrant
+# server: the numpy index lives in one process, and local Qdrant storage admits one client.
+if is_enabled() and VECTOR_INDEX_MODE == "worker" and (VECTOR_BACKEND != "qdrant" or not QDRANT_URL):
+    raise ValueError("VECTOR_INDEX_MODE=worker requires VECTOR_BACKEND=qdrant and QDRANT_URL.")
 
-#def get_embedding_model():
+
+# --- 2. LAZILY LOADED EMBEDDING MODEL ---
+embedding_model = None # Don't load the model on startup
+_model_lock = threading.Lock()
+
+def get_embedding_model():
     """
     Loads the model if it hasn't been loaded yet.
     This ensures it's only loaded into memory once, when first needed.
     """
-    #global embedding_model
-    #if embedding_model is None:
-     #   print("--- VECTOR DB: Loading embedding model for the first time... ---")
-      #  embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-       # print("--- VECTOR DB: Embedding model loaded successfully. ---")
-    #return embedding_model
-
-# --- End of Modification ---
-
-# Use in-memory storage for deployment simplicity
-#qdrant_client = QdrantClient(":memory:") 
-#COLLECTION_NAME = "ai_knowledge_worker"
-
-# Recreate the collection on startup using the known dimension
-#qdrant_client.recreate_collection(
- #   collection_name=COLLECTION_NAME,
-  ##  vectors_config=models.VectorParams(
-    #    size=EMBEDDING_DIMENSION, 
-     #   distance=models.Distance.COSINE
-    #),
-#)
-#print(f"--- VECTOR DB: Collection '{COLLECTION_NAME}' ensured to exist. ---")
-
-#def add_document_to_vector_db(document_id: int, text: str, metadata: dict):
- #   """Converts a document's text to a vector and stores it in Qdrant."""
-  #  try:
-   #     model = get_embedding_model() # Get the model using our lazy-loader
-    #    vector = model.encode(text).tolist()
-        
-     #   qdrant_client.upsert(
-      #      collection_name=COLLECTION_NAME,
-       #     points=[
-        #        models.PointStruct(id=document_id, vector=vector, payload=metadata)
-         #   ],
-          #  wait=True
-        #)
-        #print(f"--- VECTOR DB: Successfully added document ID {document_id} to collection. ---")
-    #except Exception as e:
-     #   print(f"--- VECTOR DB ERROR: Failed to add document: {e} ---")
-
-#def search_similar_documents(query_text: str):
-    """Searches for similar documents in Qdrant based on a text query."""
- #   try:
-  #      model = get_embedding_model() # Get the model using our lazy-loader
-   #     query_vector = model.encode(query_text).tolist()
-
-    #    search_result = qdrant_client.search(
-     #       collection_name=COLLECTION_NAME,
-      #      query_vector=query_vector,
-       #     limit=5
-        #)
-        #print(f"--- VECTOR DB: Found {len(search_result)} similar documents. ---")
-        #return search_result
-    #except Exception as e:
-     #   print(f"--- VECTOR DB ERROR: Failed to search documents: {e} ---")
-      #  return []
\ No newline at end of file
+    global embedding_model
+    with _model_lock:
+        if embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            logging.info("Loading the embedding model for the first time...")
+            embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+            logging.info("Embedding model loaded.")
+    return embedding_model
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """Encodes texts into unit-length vectors in batches. Blocking; call off the event loop."""
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32)
+    model = get_embedding_model()
+    vectors = model.encode(
+        texts, batch_size=EMBED_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+async def embed_texts(texts: List[str], client: Optional[httpx.AsyncClient] = None) -> np.ndarray:
+    """
+    Embeds texts without blocking the event loop, either through the remote
+    embedding worker (EMBEDDING_SERVICE_URL) or a local model in a thread.
+    """
+    if not EMBEDDING_SERVICE_URL:
+        return await asyncio.to_thread(encode_texts, texts)
+
+    client = client or http_clients.get_client()
+    response = await client.post(f"{EMBEDDING_SERVICE_URL.rstrip('/')}/embed", json={"texts": texts}, timeout=60.0)
+    response.raise_for_status()
+    return np.asarray(response.json()["vectors"], dtype=np.float32)
+
+
+# --- 3. VECTOR INDEXES ---
+class NumpyVectorIndex:
+    """
+    Brute-force cosine similarity over an in-memory matrix. Meant for tests and
+    small deployments with no Qdrant server; keeps at most max_docs vectors,
+    dropping the oldest first. Nothing is persisted: documents are added in id
+    order and indexed_through tracks progress, so a new process rebuilds the
+    index from the database on its first indexing pass.
+    """
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, max_docs: int = NUMPY_INDEX_MAX_DOCS):
+        self._dimension = dimension
+        self.max_docs = max_docs
+        self.indexed_through: Optional[int] = None # Highest document id added; None before the first pass
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._payloads: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, payloads: List[dict]):
+        with self._lock:
+            keep = ~np.isin(self._ids, ids)
+            self._ids = np.concatenate([self._ids[keep], np.asarray(ids, dtype=np.int64)])
+            self._vectors = np.vstack([self._vectors[keep], vectors.astype(np.float32)])
+            self._payloads.update(zip(ids, payloads))
+            if len(self._ids) > self.max_docs:
+                for dropped in self._ids[:-self.max_docs]:
+                    self._payloads.pop(int(dropped), None)
+                self._ids = self._ids[-self.max_docs:]
+                self._vectors = self._vectors[-self.max_docs:]
+
+    def search(self, vector: np.ndarray, limit: int) -> List[dict]:
+        with self._lock:
+            if not len(self._ids):
+                return []
+            scores = self._vectors @ vector.astype(np.float32)
+            k = min(limit, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": int(self._ids[i]), "score": float(scores[i]), "payload": self._payloads.get(int(self._ids[i]), {})}
+                for i in top
+            ]
+
+
+class QdrantVectorIndex:
+    """Qdrant-backed index. The client and collection are created on first use."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from qdrant_client import QdrantClient, models as qmodels
+                client = QdrantClient(url=QDRANT_URL) if QDRANT_URL else QdrantClient(path=QDRANT_PATH)
+                if not client.collection_exists(COLLECTION_NAME):
+                    client.create_collection(
+                        collection_name=COLLECTION_NAME,
+                        vectors_config=qmodels.VectorParams(
+                            size=EMBEDDING_DIMENSION, distance=qmodels.Distance.COSINE
+                        ),
+                    )
+                logging.info(f"Vector collection '{COLLECTION_NAME}' is ready.")
+                self._client = client
+        return self._client
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, payloads: List[dict]):
+        from qdrant_client import models as qmodels
+        # wait=False: Qdrant acknowledges once the batch is queued, not once it is indexed
+        self._get_client().upsert(
+            collection_name=COLLECTION_NAME,
+            points=qmodels.Batch(ids=list(ids), vectors=vectors.tolist(), payloads=payloads),
+            wait=False,
+        )
+
+    def search(self, vector: np.ndarray, limit: int) -> List[dict]:
+        result = self._get_client().query_points(
+            collection_name=COLLECTION_NAME, query=vector.tolist(), limit=limit
+        )
+        return [{"id": int(p.id), "score": float(p.score), "payload": p.payload or {}} for p in result.points]
+
+
+_index = None
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = NumpyVectorIndex() if VECTOR_BACKEND == "numpy" else QdrantVectorIndex()
+    return _index
+
+
+# --- 4. INDEXING AND SEARCH ---
+def _document_text(doc: models.Document) -> str:
+    content = doc.content or {}
+    parts = [content.get("title"), content.get("description"), doc.summary]
+    return ". ".join(p for p in parts if p)
+
+def _rebuild_start(db: Session, max_docs: int) -> int:
+    """The id after which the newest max_docs documents start."""
+    return db.query(models.Document.id).order_by(models.Document.id.desc()).offset(max_docs).limit(1).scalar() or 0
+
+def _pending_documents(db: Session, after_id: Optional[int], batch_size: int) -> List[models.Document]:
+    query = db.query(models.Document)
+    if after_id is not None:
+        query = query.filter(models.Document.id > after_id)
+    else:
+        query = query.filter(models.Document.embedded_at.is_(None))
+    return query.order_by(models.Document.id).limit(batch_size).all()
+
+def _mark_embedded(db: Session, document_ids: List[int]):
+    # embedded_at appears in no API response, so stamping it keeps the cached task responses
+    db.execute(
+        update(models.Document).where(models.Document.id.in_(document_ids)).values(embedded_at=datetime.utcnow()),
+        execution_options={"invalidates_responses": False},
+    )
+    db.commit()
+
+async def index_pending_documents(db: AsyncDB, batch_size: int = 256) -> int:
+    """
+    Embeds and upserts every document not yet in the vector index, in batches.
+    Qdrant documents are stamped with embedded_at; the in-memory numpy index
+    only tracks the last id it added, and on its first pass in a process it
+    rebuilds from the newest max_docs documents. Database calls go through
+    db.run_sync, so the event loop is never blocked. Returns the number indexed.
+    """
+    index = get_index()
+    in_memory = isinstance(index, NumpyVectorIndex)
+    if in_memory and index.indexed_through is None:
+        index.indexed_through = await db.run_sync(_rebuild_start, index.max_docs)
+    total = 0
+    while True:
+        docs = await db.run_sync(_pending_documents, index.indexed_through if in_memory else None, batch_size)
+        if not docs:
+            break
+        vectors = await embed_texts([_document_text(d) for d in docs])
+        payloads = [
+            {"task_id": d.task_id, "title": (d.content or {}).get("title"), "url": (d.content or {}).get("url")}
+            for d in docs
+        ]
+        await asyncio.to_thread(index.upsert, [d.id for d in docs], vectors, payloads)
+        if in_memory:
+            index.indexed_through = docs[-1].id
+        else:
+            await db.run_sync(_mark_embedded, [d.id for d in docs])
+        total += len(docs)
+    if total:
+        logging.info(f"Indexed {total} documents in the vector store.")
+    return total
+
+async def search_similar_documents(query_text: str, limit: int = 5) -> List[dict]:
+    """
+    Searches for documents similar in meaning to the query. Returns hits as
+    {"id", "score", "payload"}; ids may refer to documents deleted since indexing.
+    """
+    query_vector = (await embed_texts([query_text]))[0]
+    hits = await asyncio.to_thread(get_index().search, query_vector, limit)
+    logging.info(f"Found {len(hits)} similar documents.")
+    return hits
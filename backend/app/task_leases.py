@@ -0,0 +1,117 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func, update
+
+from . import models
+from .database import SessionLocal, engine
+
+# --- 1. SETUP ---
+load_dotenv()
+
+# A queued or processing task is owned by the worker that runs it, which
+# renews the task's heartbeat every TASK_HEARTBEAT_SECONDS. A task whose
+# heartbeat is older than TASK_LEASE_SECONDS belonged to a worker that is gone.
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "120"))
+TASK_HEARTBEAT_SECONDS = float(os.getenv("TASK_HEARTBEAT_SECONDS", "30"))
+
+UNFINISHED_STATUSES = ("queued", "processing")
+
+# Identifies this worker process as the owner of the tasks it creates
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# --- 2. LEASE QUERIES ---
+def renew(owner: str = INSTANCE_ID) -> int:
+    """
+    Moves the heartbeat of the owner's unfinished tasks to now. Runs on a bare
+    connection rather than a Session: the heartbeat is not part of any API
+    response, so it must not retire the cached task responses.
+    """
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(models.Task)
+            .where(models.Task.owner == owner, models.Task.status.in_(UNFINISHED_STATUSES))
+            .values(heartbeat_at=datetime.utcnow())
+        )
+    return result.rowcount
+
+def fail_expired(lease_seconds: float = TASK_LEASE_SECONDS) -> int:
+    """
+    Marks unfinished tasks whose lease lapsed as failed: the worker that owned
+    them stopped without finishing them, and the research queue lived in its
+    memory. Tasks from before leases existed count from their creation time.
+    Returns how many tasks were changed.
+    """
+    expired_before = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(models.Task)
+            .where(
+                models.Task.status.in_(UNFINISHED_STATUSES),
+                func.coalesce(models.Task.heartbeat_at, models.Task.created_at) < expired_before,
+            )
+            .values(status="failed")
+        )
+        # Committing an empty update would still retire every cached task response
+        if result.rowcount:
+            db.commit()
+        else:
+            db.rollback()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+# --- 3. HEARTBEAT LOOP ---
+class TaskLeaseKeeper:
+    """
+    Renews the leases of this worker's tasks and fails tasks whose owner has
+    stopped renewing them. Every worker runs one; failing an expired task is
+    idempotent, so it does not matter which worker gets there first.
+    """
+
+    def __init__(self, interval: float = TASK_HEARTBEAT_SECONDS):
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.renewals = 0
+        self.failed = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def tick(self):
+        await asyncio.to_thread(renew)
+        self.renewals += 1
+        failed = await asyncio.to_thread(fail_expired)
+        if failed:
+            self.failed += failed
+            logging.warning(f"Marked {failed} tasks whose worker stopped renewing them as failed.")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logging.error(f"Task lease upkeep failed: {e}")
+            await asyncio.sleep(self._interval)
+
+    def stats(self) -> dict:
+        return {"instance": INSTANCE_ID, "lease_seconds": TASK_LEASE_SECONDS, "renewals": self.renewals, "failed": self.failed}
+
+
+lease_keeper = TaskLeaseKeeper()
@@ -0,0 +1,93 @@
+"""
+Benchmark of task detail serialization on a task with 1,000 documents:
+the response_model path (pydantic validation, then the standard json
+encoder) against orjson without validation, and orjson writing the stored
+content JSON into the response unparsed.
+
+Run from the backend directory (a scratch SQLite database is used unless
+DATABASE_URL is set):
+
+    python -m benchmarks.bench_serialization --documents 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+_scratch = tempfile.TemporaryDirectory(prefix="bench-serialization-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch.name, 'bench.db')}")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.serialization import RAW_JSON_SUPPORTED, FastJSONResponse, orjson, raw_json  # noqa: E402
+from benchmarks.seed_db import seed  # noqa: E402
+
+PAGE = TypeAdapter(schemas.TaskDetailsPage)
+
+
+def _page(task, documents) -> dict:
+    return {
+        "id": task.id,
+        "topic": task.topic,
+        "status": task.status,
+        "created_at": task.created_at,
+        "documents": documents,
+        "next_document_cursor": None,
+        "timings": task.timings,
+    }
+
+def response_model_path(db, task, limit: int) -> bytes:
+    """What FastAPI does for response_model=TaskDetailsPage with the default JSONResponse."""
+    documents = crud.get_task_documents(db, task_id=task.id, limit=limit)
+    content = PAGE.dump_python(PAGE.validate_python(_page(task, documents)), mode="json", exclude_unset=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def unvalidated_path(db, task, limit: int) -> bytes:
+    documents = crud.get_task_documents(db, task_id=task.id, limit=limit)
+    return FastJSONResponse(_page(task, documents)).body
+
+def raw_content_path(db, task, limit: int) -> bytes:
+    documents = crud.get_task_documents(db, task_id=task.id, limit=limit, raw_content=True)
+    for document in documents:
+        document["content"] = raw_json(document["content"])
+    return FastJSONResponse(_page(task, documents)).body
+
+
+def _measure(fn, db, task, limit: int, repeat: int):
+    fn(db, task, limit) # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(db, task, limit)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), body
+
+
+def main(documents: int, repeat: int):
+    print(f"Seeding one task with {documents} documents...")
+    seed(documents, documents)
+    db = SessionLocal()
+    try:
+        task = crud.get_tasks(db, limit=1)[0]
+        print(f"orjson: {orjson.__version__ if orjson else 'not installed'}, raw JSON fragments: {RAW_JSON_SUPPORTED}\n")
+
+        baseline, expected = _measure(response_model_path, db, task, documents, repeat)
+        print(f"response_model + json : {baseline * 1000:8.1f} ms  ({len(expected) / 1024:.0f} KiB)")
+        for name, fn in (("orjson, no validation", unvalidated_path), ("orjson, raw content", raw_content_path)):
+            seconds, body = _measure(fn, db, task, documents, repeat)
+            same = json.loads(body) == json.loads(expected)
+            print(f"{name:<22}: {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x faster  (same JSON: {same})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.documents, args.repeat)
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark of the topic extractors: throughput of the TextBlob process
+pool against the fast keyphrase scorer, and how closely the fast scorer's
+topics agree with TextBlob's noun phrases.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_topic_extractors --repeat 50
+"""
+import argparse
+import asyncio
+import re
+import time
+
+from app.services.topic_extractor import FastKeyphraseExtractor, TextBlobExtractor, _textblob_extract_batch
+
+SAMPLE_ARTICLES = [
+    "Nvidia unveiled its next generation of artificial intelligence chips on Tuesday, promising data center operators faster training for large language models.",
+    "The European Central Bank held interest rates steady, citing stubborn services inflation and a weakening manufacturing sector across the euro zone.",
+    "OpenAI announced a new reasoning model that the company says outperforms previous systems on mathematics and coding benchmarks.",
+    "Heavy monsoon rains flooded several districts in Karnataka, forcing state authorities to open relief camps and close schools for the week.",
+    "Apple shares rose after the company reported record iPhone sales in India and raised its quarterly dividend.",
+    "Researchers at a Bengaluru startup have built a low-cost water purification system powered entirely by solar panels.",
+    "The World Health Organization warned that antibiotic resistance is spreading faster than new drugs are being developed.",
+    "Electric vehicle maker Tesla cut prices in China for the third time this year as competition from local manufacturers intensifies.",
+    "A new climate report finds that global sea levels rose at their fastest pace on record over the past decade.",
+    "Microsoft and Google are racing to integrate generative AI assistants into their office productivity software suites.",
+    "The Indian Space Research Organisation successfully launched a weather satellite from the Sriharikota spaceport.",
+    "Oil prices climbed after OPEC members agreed to extend production cuts through the end of next quarter.",
+]
+
+
+def _words(topics):
+    return set(re.findall(r"\w+", (topics or "").lower()))
+
+
+async def _time(extractor, texts):
+    start = time.perf_counter()
+    results = await extractor.extract_batch(texts)
+    return time.perf_counter() - start, results
+
+
+async def main(repeat: int, workers: int):
+    texts = SAMPLE_ARTICLES * repeat
+    print(f"Benchmarking {len(texts)} texts ({len(SAMPLE_ARTICLES)} unique x {repeat})\n")
+
+    fast = FastKeyphraseExtractor()
+    fast_seconds, fast_topics = await _time(fast, texts)
+    print(f"fast      : {len(texts) / fast_seconds:10.1f} texts/s  ({fast_seconds * 1000:.1f} ms total)")
+
+    textblob = TextBlobExtractor(workers=workers)
+    try:
+        await textblob.start()
+        tb_seconds, _ = await _time(textblob, texts)
+        print(f"textblob  : {len(texts) / tb_seconds:10.1f} texts/s  ({tb_seconds * 1000:.1f} ms total, {workers} workers)")
+        print(f"speed-up  : {tb_seconds / fast_seconds:10.1f}x\n")
+    finally:
+        await textblob.shutdown()
+
+    # Quality: compare against TextBlob's noun phrases, computed in-process for the unique texts
+    reference = _textblob_extract_batch(SAMPLE_ARTICLES)
+    if not any(reference):
+        print("TextBlob corpora not available (python -m textblob.download_corpora); skipping quality comparison.")
+        return
+    overlaps = []
+    for text, ref, got in zip(SAMPLE_ARTICLES, reference, fast_topics):
+        ref_words, got_words = _words(ref), _words(got)
+        union = ref_words | got_words
+        overlaps.append(len(ref_words & got_words) / len(union) if union else 1.0)
+        print(f"- textblob: {ref!r}\n  fast    : {got!r}")
+    print(f"\nMean word-level Jaccard overlap with TextBlob: {sum(overlaps) / len(overlaps):.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20, help="How many times to repeat the sample articles.")
+    parser.add_argument("--workers", type=int, default=2, help="TextBlob worker processes.")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.workers))
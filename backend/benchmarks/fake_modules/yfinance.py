@@ -0,0 +1,108 @@
+"""
+Offline stand-in for the parts of yfinance the app uses (Ticker.info,
+Ticker.history and download). Prices are a deterministic random walk per
+symbol, so repeated runs see the same data. Put this directory first on
+PYTHONPATH to use it; the load test does that for the app process.
+
+Symbols starting with "INVALID" behave like unknown tickers.
+"""
+import os
+import time
+import zlib
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+LATENCY = float(os.getenv("FAKE_YFINANCE_LATENCY", "0.15")) # seconds per upstream call
+ERROR_RATE = float(os.getenv("FAKE_YFINANCE_ERROR_RATE", "0.0"))
+HISTORY_DAYS = int(os.getenv("FAKE_YFINANCE_DAYS", "1300")) # trading days of history available
+
+_PERIOD_DAYS = {"1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "max": HISTORY_DAYS}
+_rng = np.random.default_rng()
+
+
+def _call():
+    if LATENCY > 0:
+        time.sleep(LATENCY)
+    if ERROR_RATE and _rng.random() < ERROR_RATE:
+        raise ConnectionError("Simulated Yahoo Finance failure")
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode())
+
+def _full_history(symbol: str) -> pd.DataFrame:
+    rng = np.random.default_rng(_seed(symbol))
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=HISTORY_DAYS, name="Date")
+    close = 20 + (_seed(symbol) % 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(index))))
+    spread = close * rng.uniform(0.002, 0.02, len(index))
+    return pd.DataFrame(
+        {
+            "Open": close + rng.normal(0, 0.3, len(index)) * spread,
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(1e5, 5e7, len(index)).astype(float),
+        },
+        index=index,
+    )
+
+
+class Ticker:
+    def __init__(self, symbol: str):
+        self.ticker = symbol
+
+    @property
+    def info(self) -> dict:
+        _call()
+        if self.ticker.upper().startswith("INVALID"):
+            return {"trailingPegRatio": None}
+        history = _full_history(self.ticker)
+        close = history["Close"]
+        return {
+            "symbol": self.ticker.upper(),
+            "longName": f"{self.ticker.upper()} Holdings Inc.",
+            "longBusinessSummary": "Generated company used for benchmarks.",
+            "quoteType": "INDEX" if self.ticker.startswith("^") else "EQUITY",
+            "exchange": "NMS",
+            "currency": "USD",
+            "country": "United States",
+            "sector": "Technology",
+            "industry": "Software",
+            "marketCap": int(close.iloc[-1] * 1e9),
+            "trailingPE": 24.5,
+            "beta": 1.1,
+            "fiftyTwoWeekHigh": float(close.iloc[-252:].max()),
+            "fiftyTwoWeekLow": float(close.iloc[-252:].min()),
+            "fiftyDayAverage": float(close.iloc[-50:].mean()),
+            "twoHundredDayAverage": float(close.iloc[-200:].mean()),
+        }
+
+    def history(self, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None, **kwargs) -> pd.DataFrame:
+        _call()
+        if self.ticker.upper().startswith("INVALID"):
+            return pd.DataFrame()
+        return _slice(_full_history(self.ticker), period, start, end)
+
+
+def _slice(history: pd.DataFrame, period: Optional[str], start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    if start:
+        history = history[history.index >= pd.Timestamp(start)]
+    elif period:
+        history = history.iloc[-_PERIOD_DAYS.get(period, 252):]
+    if end:
+        history = history[history.index < pd.Timestamp(end)]
+    return history
+
+
+def download(tickers: Union[str, List[str]], period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None, group_by: str = "column", **kwargs) -> pd.DataFrame:
+    """One simulated upstream call for all tickers, with a (ticker, field) column MultiIndex."""
+    _call()
+    symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+    frames = {
+        symbol: _slice(_full_history(symbol), period, start, end)
+        for symbol in symbols if not symbol.upper().startswith("INVALID")
+    }
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
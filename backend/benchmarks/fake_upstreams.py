@@ -0,0 +1,205 @@
+"""
+Local stand-ins for every HTTP upstream the app calls: GNews, NewsData.io,
+the RSS feeds and the HuggingFace summarization endpoint. Latency, error
+rate and payload size are configurable, so load tests are repeatable and
+never touch (or pay for) the real APIs.
+
+Run from the backend directory:
+
+    python -m benchmarks.fake_upstreams --port 9100 --latency 0.2 --error-rate 0.02
+
+and point the app at it with the variables printed by `app_env()`. The
+load test (benchmarks/load_test.py) starts it automatically.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from email.utils import formatdate
+from xml.sax.saxutils import escape
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Profile, read from the environment so it survives `uvicorn benchmarks.fake_upstreams:app`
+LATENCY = float(os.getenv("FAKE_UPSTREAM_LATENCY", "0.1")) # mean seconds per news/RSS response
+JITTER = float(os.getenv("FAKE_UPSTREAM_JITTER", "0.3")) # standard deviation, as a fraction of the mean
+ERROR_RATE = float(os.getenv("FAKE_UPSTREAM_ERROR_RATE", "0.0")) # share of requests answered with a 503
+ARTICLES = int(os.getenv("FAKE_UPSTREAM_ARTICLES", "10")) # articles per news API response
+CONTENT_WORDS = int(os.getenv("FAKE_UPSTREAM_CONTENT_WORDS", "120")) # words of text per article
+# Share of articles with a URL never returned before; the rest repeat and hit the dedup path
+FRESH_RATIO = float(os.getenv("FAKE_UPSTREAM_FRESH_RATIO", "0.5"))
+SUMMARY_LATENCY = float(os.getenv("FAKE_SUMMARY_LATENCY", "0.2")) # seconds per summarization request
+SUMMARY_LATENCY_PER_TEXT = float(os.getenv("FAKE_SUMMARY_LATENCY_PER_TEXT", "0.02"))
+RSS_FEED_COUNT = int(os.getenv("FAKE_RSS_FEEDS", "4"))
+RSS_ITEMS = int(os.getenv("FAKE_RSS_ITEMS", "50"))
+
+# Topics the generated articles talk about; load tests search for these
+TOPICS = [
+    "artificial intelligence", "climate", "markets", "elections", "space",
+    "healthcare", "energy", "semiconductors", "cricket", "startups",
+]
+_VOCABULARY = (
+    "government company report market growth research data policy company announced "
+    "analysts investors technology global quarter results industry officials said "
+    "new plans rising prices launch network security economy regional study"
+).split()
+
+app = FastAPI(title="Fake upstreams")
+_counter = {"requests": 0, "errors": 0, "fresh": 0}
+
+
+# --- 1. HELPERS ---
+async def _delay(mean: float):
+    if mean > 0:
+        await asyncio.sleep(max(0.0, random.gauss(mean, mean * JITTER)))
+
+def _should_fail() -> bool:
+    _counter["requests"] += 1
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        _counter["errors"] += 1
+        return True
+    return False
+
+def _unavailable() -> JSONResponse:
+    return JSONResponse(status_code=503, content={"error": "Service temporarily unavailable (simulated)"})
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def filler_text(seed: str, words: int) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(words)).capitalize() + "."
+
+def _articles(provider: str, topic: str, count: int):
+    """
+    `count` articles about the topic. Repeated articles keep their URL
+    across calls; fresh ones get a URL that has never been returned.
+    """
+    for i in range(count):
+        if random.random() < FRESH_RATIO:
+            _counter["fresh"] += 1
+            key = f"{provider}/{_slug(topic)}/fresh-{_counter['fresh']}"
+        else:
+            key = f"{provider}/{_slug(topic)}/{i}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        yield {
+            "title": f"{topic.title()} update {digest}",
+            "description": f"Latest on {topic}: " + filler_text(key + "d", 20),
+            "content": filler_text(key, CONTENT_WORDS),
+            "url": f"https://{provider}.bench.local/{key}",
+            "image": f"https://{provider}.bench.local/img/{digest}.jpg",
+        }
+
+
+# --- 2. NEWS APIS ---
+@app.get("/gnews/api/v4/search")
+async def gnews(q: str, max: int = 10):
+    await _delay(LATENCY)
+    if _should_fail():
+        return _unavailable()
+    return {"totalArticles": ARTICLES, "articles": list(_articles("gnews", q, min(max, ARTICLES)))}
+
+@app.get("/newsdata/api/1/news")
+async def newsdata(q: str, size: int = 10):
+    await _delay(LATENCY)
+    if _should_fail():
+        return _unavailable()
+    results = [
+        {"title": a["title"], "description": a["description"], "content": a["content"], "link": a["url"], "image_url": a["image"]}
+        for a in _articles("newsdata", q, min(size, ARTICLES))
+    ]
+    return {"status": "success", "totalResults": len(results), "results": results}
+
+
+# --- 3. RSS FEEDS ---
+def _feed_xml(feed: int) -> str:
+    items = []
+    for i in range(RSS_ITEMS):
+        topic = TOPICS[(feed + i) % len(TOPICS)]
+        key = f"rss{feed}/{i}"
+        items.append(
+            f"<item><title>{escape(topic.title())} briefing {i}</title>"
+            f"<link>https://rss.bench.local/{key}</link>"
+            f"<description>{escape(f'News about {topic}. ' + filler_text(key, 30))}</description></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Bench feed {feed}</title><link>https://rss.bench.local/{feed}</link>"
+        f"<description>Generated feed</description>{''.join(items)}</channel></rss>"
+    )
+
+@app.get("/rss/{feed}.xml")
+async def rss_feed(feed: int, request: Request):
+    await _delay(LATENCY)
+    if _should_fail():
+        return _unavailable()
+    etag = f'"bench-{feed}-{RSS_ITEMS}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=_feed_xml(feed),
+        media_type="application/rss+xml",
+        headers={"ETag": etag, "Last-Modified": formatdate(usegmt=True)},
+    )
+
+
+# --- 4. HUGGINGFACE INFERENCE ---
+@app.post("/hf/models/{model:path}")
+async def summarize(model: str, request: Request):
+    payload = await request.json()
+    inputs = payload.get("inputs")
+    texts = inputs if isinstance(inputs, list) else [inputs]
+    await _delay(SUMMARY_LATENCY + SUMMARY_LATENCY_PER_TEXT * len(texts))
+    if _should_fail():
+        return _unavailable()
+    summaries = [{"summary_text": " ".join(str(text).split()[:25])} for text in texts]
+    return summaries if isinstance(inputs, list) else summaries[:1]
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", **_counter}
+
+
+# --- 5. WIRING ---
+def app_env(base_url: str) -> dict:
+    """Environment variables that point the app at the fake upstreams served at base_url."""
+    feeds = {f"Bench feed {i}": f"{base_url}/rss/{i}.xml" for i in range(RSS_FEED_COUNT)}
+    return {
+        "GNEWS_API_KEY": "bench",
+        "NEWSDATA_API_KEY": "bench",
+        "HUGGINGFACE_TOKEN": "bench",
+        "GNEWS_API_URL": f"{base_url}/gnews/api/v4/search",
+        "NEWSDATA_API_URL": f"{base_url}/newsdata/api/1/news",
+        "HUGGINGFACE_API_URL": f"{base_url}/hf/models",
+        "RSS_FEEDS": json.dumps(feeds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, help="Mean seconds per news/RSS response")
+    parser.add_argument("--error-rate", type=float, help="Share of requests answered with a 503")
+    parser.add_argument("--articles", type=int, help="Articles per news API response")
+    args = parser.parse_args()
+
+    global LATENCY, ERROR_RATE, ARTICLES
+    LATENCY = args.latency if args.latency is not None else LATENCY
+    ERROR_RATE = args.error_rate if args.error_rate is not None else ERROR_RATE
+    ARTICLES = args.articles if args.articles is not None else ARTICLES
+
+    import uvicorn
+
+    for name, value in app_env(f"http://{args.host}:{args.port}").items():
+        print(f"{name}={value}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Load test of the API against local stand-ins for every upstream. It starts
+the fake news/RSS/summarization server (benchmarks/fake_upstreams.py), seeds
+a database with generated documents, starts the app with the fake yfinance
+module (benchmarks/fake_modules) and drives each scenario at the given
+concurrency levels, reporting throughput and p50/p95/p99 latency.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --duration 15 --save-baseline main
+    python -m benchmarks.load_test --concurrency 1,8,32 --duration 15 --compare main
+
+Results can be saved as a named baseline (benchmarks/baselines/<name>.json);
+--compare prints the change against one and exits with status 1 when p95
+latency or throughput regressed by more than --threshold. Pass
+--database-url to run against PostgreSQL (the database should be empty),
+and --app-env KEY=VALUE to compare settings, e.g. NEWS_FETCH_MODE=fanout.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_upstreams import TOPICS, app_env
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_MODULES_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fake_modules")
+BASELINE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "baselines")
+
+SYMBOLS = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "META", "IBM", "INTC", "ORCL"]
+SEARCH_WORDS = ["market", "policy", "research", "security", "growth", "climate", "energy", "network"]
+
+
+# --- 1. SCENARIOS ---
+# name -> function(rng, seeded task count) returning the next request path
+SCENARIOS: Dict[str, Callable[[random.Random, int], str]] = {
+    "search": lambda rng, tasks: f"/api/search/{quote(rng.choice(TOPICS))}",
+    "search_history": lambda rng, tasks: f"/api/search/history?q={rng.choice(SEARCH_WORDS)}&limit=20",
+    "tasks": lambda rng, tasks: "/api/tasks?limit=20",
+    "task_detail": lambda rng, tasks: f"/api/tasks/{rng.randint(1, max(tasks, 1))}",
+    "analytics": lambda rng, tasks: "/api/analytics/stats",
+    "stock": lambda rng, tasks: f"/api/stock/{rng.choice(SYMBOLS)}",
+    "stock_history": lambda rng, tasks: f"/api/stock/{rng.choice(SYMBOLS)}/history?indicators=sma:20,rsi:14",
+    "stocks_bulk": lambda rng, tasks: f"/api/stocks?symbols={','.join(rng.sample(SYMBOLS, 4))}&include_history=true",
+}
+
+
+# --- 2. PROCESSES ---
+@contextmanager
+def _server(target: str, port: int, env: dict, health_path: str, workers: int = 1, timeout: float = 60.0):
+    """Runs `uvicorn target` on the port until the block exits."""
+    command = [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{target} exited with status {process.returncode} during startup")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{health_path}", timeout=2).status_code < 500:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{target} did not start within {timeout:.0f}s")
+            time.sleep(0.25)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def _seed_database(env: dict, documents: int, docs_per_task: int):
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.seed_db", "--documents", str(documents), "--docs-per-task", str(docs_per_task)],
+        cwd=BACKEND_DIR, env=env, check=True,
+    )
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- 3. LOAD DRIVER ---
+async def _run_level(client: httpx.AsyncClient, scenario: str, tasks: int, concurrency: int, duration: float, max_requests: int) -> dict:
+    """Keeps `concurrency` requests in flight until duration or max_requests is reached."""
+    make_path = SCENARIOS[scenario]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(f"{scenario}-{concurrency}-{worker_id}")
+        while time.perf_counter() < deadline and (not max_requests or len(latencies) < max_requests):
+            path = make_path(rng, tasks)
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    samples = np.array(latencies) * 1000
+    errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(float(samples.mean()), 2) if len(samples) else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(samples.max()), 2) if len(samples) else 0.0,
+        "statuses": statuses,
+    }
+
+async def drive(base_url: str, scenarios: List[str], levels: List[int], duration: float, max_requests: int, warmup: int, tasks: int) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    limits = httpx.Limits(max_connections=max(levels) + 10, max_keepalive_connections=max(levels) + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        for scenario in scenarios:
+            rng = random.Random(f"warmup-{scenario}")
+            for _ in range(warmup):
+                await client.get(SCENARIOS[scenario](rng, tasks))
+            results[scenario] = {}
+            for concurrency in levels:
+                level = await _run_level(client, scenario, tasks, concurrency, duration, max_requests)
+                results[scenario][str(concurrency)] = level
+                print(
+                    f"{scenario:<15} c={concurrency:<4} {level['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {level['p50_ms']:>8.1f}  p95 {level['p95_ms']:>8.1f}  p99 {level['p99_ms']:>8.1f} ms  "
+                    f"errors {level['error_rate']:.1%}  ({level['requests']} requests)"
+                )
+    return results
+
+
+# --- 4. BASELINES ---
+def _baseline_path(name: str) -> str:
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_baseline(name: str, report: dict):
+    path = _baseline_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved baseline to {path}")
+
+def compare(baseline: dict, report: dict, threshold: float) -> List[str]:
+    """Prints the change against the baseline; returns the regressions beyond threshold."""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('created_at')} ({baseline['meta'].get('git_revision')}):")
+    for scenario, levels in report["results"].items():
+        for concurrency, current in levels.items():
+            before = baseline["results"].get(scenario, {}).get(concurrency)
+            if not before:
+                continue
+            p95_change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+            rps_change = (current["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] if before["throughput_rps"] else 0.0
+            flag = ""
+            if p95_change > threshold or rps_change < -threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario} c={concurrency}")
+            print(
+                f"{scenario:<15} c={concurrency:<4} p95 {before['p95_ms']:>8.1f} -> {current['p95_ms']:>8.1f} ms ({p95_change:+.0%})  "
+                f"throughput {before['throughput_rps']:>8.1f} -> {current['throughput_rps']:>8.1f} req/s ({rps_change:+.0%}){flag}"
+            )
+    return regressions
+
+
+# --- 5. ENTRY POINT ---
+def _parse_env(pairs: List[str]) -> dict:
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--app-env expects KEY=VALUE, got {pair!r}")
+        env[key] = value
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and level")
+    parser.add_argument("--requests", type=int, default=0, help="Stop a level after this many requests (0: duration only)")
+    parser.add_argument("--warmup", type=int, default=3, help="Sequential requests per scenario before measuring")
+    parser.add_argument("--documents", type=int, default=5000, help="Documents to seed")
+    parser.add_argument("--docs-per-task", type=int, default=50)
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file in a temporary directory")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--app-workers", type=int, default=1, help="uvicorn worker processes for the app")
+    parser.add_argument("--upstream-latency", type=float, default=0.1, help="Mean seconds per news/RSS response")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-articles", type=int, default=10, help="Articles per news API response")
+    parser.add_argument("--summary-latency", type=float, default=0.2, help="Seconds per summarization request")
+    parser.add_argument("--yfinance-latency", type=float, default=0.15, help="Seconds per fake yfinance call")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="Extra settings for the app")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME", help="Baseline name or path of a results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression for --compare")
+    parser.add_argument("--output", help="Also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    baseline = None
+    if args.compare:
+        with open(_baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+
+    profile = {
+        "FAKE_UPSTREAM_LATENCY": str(args.upstream_latency),
+        "FAKE_UPSTREAM_ERROR_RATE": str(args.upstream_error_rate),
+        "FAKE_UPSTREAM_ARTICLES": str(args.upstream_articles),
+        "FAKE_SUMMARY_LATENCY": str(args.summary_latency),
+        "FAKE_YFINANCE_LATENCY": str(args.yfinance_latency),
+    }
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        env = {**os.environ, **profile, "DATABASE_URL": database_url, "PYTHONPATH": os.pathsep.join([FAKE_MODULES_DIR, BACKEND_DIR])}
+        upstream_url = f"http://127.0.0.1:{args.upstream_port}"
+        app_environment = {
+            **env,
+            **app_env(upstream_url),
+            "STOCK_HISTORY_DIR": os.path.join(workdir, "stock_history"),
+            "SCHEDULER_ENABLED": "false",
+            **_parse_env(args.app_env),
+        }
+
+        print(f"Seeding {args.documents} documents into {database_url}")
+        _seed_database(env, args.documents, args.docs_per_task)
+        tasks = -(-args.documents // args.docs_per_task)
+
+        with _server("benchmarks.fake_upstreams:app", args.upstream_port, env, "/health"), \
+             _server("app.main:app", args.app_port, app_environment, "/", workers=args.app_workers) as app_url:
+            print(f"App at {app_url}, fake upstreams at {upstream_url}\n")
+            results = asyncio.run(drive(app_url, scenarios, levels, args.duration, args.requests, args.warmup, tasks))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "database": "postgresql" if database_url.startswith("postgres") else "sqlite",
+            "documents": args.documents,
+            "duration": args.duration,
+            "app_workers": args.app_workers,
+            "app_env": _parse_env(args.app_env),
+            "profile": profile,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, report)
+    if baseline is not None:
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
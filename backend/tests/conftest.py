@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+# The app reads its configuration at import time, so point it at a throwaway
+# database and switch off everything that would reach outside the test run.
+_tmpdir = tempfile.mkdtemp(prefix="research-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_tmpdir, 'test.db')}",
+    DB_ASYNC_MODE="off",
+    SCHEDULER_ENABLED="false",
+    TOPIC_EXTRACTOR="fast",
+    SUMMARY_CACHE_PERSIST="false",
+    VECTOR_BACKEND="disabled",
+    STOCK_HISTORY_DIR=os.path.join(_tmpdir, "stock_history"),
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import analytics, models
+from app.database import SessionLocal, engine
+from app.dedup import seen_urls
+from app.migrations import upgrade_schema
+from app.response_cache import MemoryBackend, response_cache
+
+models.Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Every test starts from empty tables and empty in-process caches."""
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    seen_urls.clear()
+    analytics.stats_cache.clear()
+    response_cache.backend = MemoryBackend()
+    response_cache._versions.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,45 @@
+from app import analytics, crud
+
+
+def _ingest(db, task_id, urls, summarized=True):
+    return crud.ingest_documents(db, task_id, [
+        {"source": "GNews", "content": {"title": url, "url": url}, "summary": "s" if summarized else None, "topics": None}
+        for url in urls
+    ])
+
+
+def test_counters_follow_writes(db):
+    task = crud.create_task(db, topic="energy")
+    assert _ingest(db, task.id, ["https://a.example/1", "https://a.example/2"]) == 2
+    assert _ingest(db, task.id, ["https://a.example/3"], summarized=False) == 1
+
+    stats = crud.get_analytics_stats(db, cached=False)
+    assert stats["total_tasks"] == 1
+    assert stats["total_documents"] == 3
+    assert stats["top_topics"] == [{"topic": "energy", "count": 1}]
+    assert stats["documents_per_source"] == [{"source": "GNews", "count": 3}]
+    assert stats["summary_success_rate"] == round(2 / 3, 4)
+    assert analytics.reconcile(db) == 0
+
+    crud.delete_task(db, task.id)
+    stats = crud.get_analytics_stats(db, cached=False)
+    assert (stats["total_tasks"], stats["total_documents"]) == (0, 0)
+    assert analytics.reconcile(db) == 0
+
+
+def test_skipped_duplicates_are_not_counted(db):
+    task = crud.create_task(db, topic="energy")
+    _ingest(db, task.id, ["https://a.example/1"])
+    assert _ingest(db, task.id, ["https://a.example/1", "https://a.example/2"]) == 1
+
+    assert crud.get_analytics_stats(db, cached=False)["total_documents"] == 2
+    assert analytics.reconcile(db) == 0
+
+
+def test_stats_endpoint_reflects_deletes(client, db):
+    task = crud.create_task(db, topic="energy")
+    _ingest(db, task.id, ["https://a.example/1"])
+    assert client.get("/api/analytics/stats").json()["total_documents"] == 1
+
+    assert client.delete(f"/api/tasks/{task.id}").status_code == 200
+    assert client.get("/api/analytics/stats").json()["total_documents"] == 0
@@ -0,0 +1,100 @@
+import pytest
+
+from app import models
+from app.services import ai_service, news_service
+from app.services.summary_cache import SummaryCache
+
+# title -> the topics whose query returns it
+ARTICLES = {
+    "Solar and wind prices fall": ["Solar", "Wind"],
+    "Solar panel tariffs": ["Solar"],
+    "Offshore wind auction": ["Wind"],
+    "Hydrogen hubs announced": ["Hydrogen"],
+    "Grid operators brace for winter": ["Solar", "Wind"],
+}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """A fake news provider answering every query from ARTICLES; records the queries and summarized texts."""
+    calls = {"queries": [], "summaries": []}
+
+    async def fetch(query, client):
+        calls["queries"].append(query)
+        terms = news_service.split_query(query)
+        return [
+            {
+                "title": title,
+                "description": "",
+                "url": f"https://energy.example/{title.lower().replace(' ', '-')}",
+                "content": f"batch test body: {title}",
+                "source": {"name": "GNews"},
+            }
+            for title, topics in ARTICLES.items() if set(topics) & set(terms)
+        ]
+
+    async def summarize(client, text):
+        calls["summaries"].append(text)
+        return f"summary of {text}"
+
+    monkeypatch.setattr(news_service, "PROVIDERS", [("GNews", fetch, 5)])
+    monkeypatch.setattr(news_service, "MIN_ARTICLES_REQUIRED", 1)
+    monkeypatch.setattr(news_service, "BATCH_TOPICS_PER_QUERY", 2)
+    monkeypatch.setattr(ai_service, "_call_summarizer", summarize)
+    monkeypatch.setattr(ai_service, "summary_cache", SummaryCache(persist=False))
+    return calls
+
+
+def _titles(client, task_id):
+    return sorted(doc["content"]["title"] for doc in client.get(f"/api/tasks/{task_id}").json()["documents"])
+
+
+def test_topics_share_queries_and_summaries(client, provider):
+    response = client.post("/api/research/batch", json={"topics": ["Solar", "Wind", " solar ", "Hydrogen"]})
+    assert response.status_code == 200
+    result = response.json()
+
+    assert [task["topic"] for task in result["tasks"]] == ["Solar", "Wind", "Hydrogen"]
+    assert result["upstream_queries"] == len(provider["queries"]) == 2
+    assert result["unique_articles"] == result["new_articles"] == len(provider["summaries"]) == 5
+
+    solar, wind, hydrogen = (task["task_id"] for task in result["tasks"])
+    # The grid story mentions neither topic of its query, so it goes to the query's first topic only
+    assert _titles(client, solar) == ["Grid operators brace for winter", "Solar and wind prices fall", "Solar panel tariffs"]
+    assert _titles(client, wind) == ["Offshore wind auction", "Solar and wind prices fall"]
+    assert _titles(client, hydrogen) == ["Hydrogen hubs announced"]
+    assert {task["status"] for task in client.get("/api/tasks").json()} == {"completed"}
+
+
+def test_stored_articles_are_linked_not_summarized_again(client, provider):
+    client.post("/api/research/batch", json={"topics": ["Solar"]})
+    summarized = len(provider["summaries"])
+
+    result = client.post("/api/research/batch", json={"topics": ["Wind"]}).json()
+    assert result["new_articles"] == 1
+    assert len(provider["summaries"]) == summarized + 1
+    assert _titles(client, result["tasks"][0]["task_id"]) == [
+        "Grid operators brace for winter", "Offshore wind auction", "Solar and wind prices fall",
+    ]
+
+
+def test_deleting_the_owner_hands_shared_documents_on(client, db, provider):
+    result = client.post("/api/research/batch", json={"topics": ["Solar", "Wind"]}).json()
+    solar, wind = (task["task_id"] for task in result["tasks"])
+
+    assert client.delete(f"/api/tasks/{solar}").status_code == 200
+
+    assert _titles(client, wind) == ["Offshore wind auction", "Solar and wind prices fall"]
+    assert {doc.task_id for doc in db.query(models.Document)} == {wind}
+    assert db.query(models.TaskDocument).count() == 0
+
+
+def test_match_topics_handles_symbols_and_whole_words():
+    article = {"title": "C++ and .NET tooling", "description": "Gains for OpenAI"}
+    assert news_service.match_topics(article, ["c++", ".NET", "AI", "OpenAI", "C"]) == ["c++", ".NET", "OpenAI", "C"]
+
+
+def test_rejects_empty_and_oversized_batches(client):
+    assert client.post("/api/research/batch", json={"topics": ["  "]}).status_code == 400
+    too_many = [f"topic {i}" for i in range(100)]
+    assert client.post("/api/research/batch", json={"topics": too_many}).status_code in (400, 422)
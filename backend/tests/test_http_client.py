@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.http_client_service import InstrumentedTransport
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        threading.Event().wait(0.05)
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_transport_reports_pool_usage(server_url):
+    transport = InstrumentedTransport(max_connections=2, http2=False)
+    events, during = [], {}
+
+    async def own_trace(event_name, info):
+        events.append(event_name)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(*(client.get(server_url) for _ in range(6)))
+            async with client.stream("GET", server_url, extensions={"trace": own_trace}) as response:
+                # Headers are in, the body is not: the request still holds its connection
+                during.update(transport.stats())
+                await response.aread()
+            during["after_body"] = transport.stats()["in_flight"]
+        return transport.stats()
+
+    closed = asyncio.run(run())
+
+    assert during["in_flight"] == 1 and during["after_body"] == 0
+    assert during["open_connections"] == 2
+    assert closed["requests"] == 7 and closed["connections_opened"] == 2
+    assert closed["open_connections"] == 0 and closed["connections_closed"] == 2
+    # Six requests shared two connections, so at least four had to wait for one
+    assert closed["waits_for_connection"] >= 4
+    assert closed["peak_in_flight"] == 6
+    # The request's own trace callback still sees the events
+    assert events
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import indicators
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(7)
+    return 100 + np.cumsum(rng.normal(0, 1, 300))
+
+
+def test_parse_spec_fills_defaults_and_dedupes():
+    assert indicators.parse_spec("sma:50, rsi, macd, sma:50") == (
+        ("sma", (50,)),
+        ("rsi", (14,)),
+        ("macd", (12, 26, 9)),
+    )
+    assert indicators.parse_spec("bbands:20:2.5") == (("bbands", (20, 2.5)),)
+
+
+@pytest.mark.parametrize("spec", ["foo", "sma:0", "sma:1.5", "sma:x", "rsi:14:2", "bbands:20:11", ",".join(["sma"] * 5 + ["ema:%d" % w for w in range(1, 7)])])
+def test_parse_spec_rejects_bad_input(spec):
+    with pytest.raises(ValueError):
+        indicators.parse_spec(spec)
+
+
+def test_sma_matches_rolling_mean(close):
+    expected = pd.Series(close).rolling(20).mean().to_numpy()
+    np.testing.assert_allclose(indicators.sma(close, 20), expected, equal_nan=True)
+
+
+def test_ema_matches_pandas_and_masks_warmup(close):
+    result = indicators.ema(close, 10)
+    expected = pd.Series(close).ewm(span=10, adjust=False).mean().to_numpy()
+    assert np.isnan(result[:9]).all()
+    np.testing.assert_allclose(result[9:], expected[9:])
+
+
+def test_rsi_is_bounded_and_saturates_without_losses(close):
+    values = indicators.rsi(close, 14)
+    assert np.isnan(values[:14]).all()
+    assert ((values[14:] >= 0) & (values[14:] <= 100)).all()
+    assert indicators.rsi(np.arange(1.0, 40.0), 14)[-1] == 100.0
+
+
+def test_compute_names_columns_after_the_spec(close):
+    bars = np.zeros(len(close), dtype=[("close", "f8")])
+    bars["close"] = close
+    columns = indicators.compute(bars, indicators.parse_spec("sma:5,macd,bbands,log_returns"))
+    assert set(columns) == {
+        "SMA_5", "MACD_12_26_9", "MACD_signal_12_26_9", "MACD_hist_12_26_9",
+        "BB_upper_20_2", "BB_middle_20_2", "BB_lower_20_2", "LogReturn",
+    }
+    assert all(len(column) == len(close) for column in columns.values())
+    np.testing.assert_allclose(columns["LogReturn"][1:], np.diff(np.log(close)))
+
+
+def test_lttb_keeps_endpoints_and_extremes(close):
+    kept = indicators.lttb_indices(close, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == len(close) - 1
+    assert (np.diff(kept) > 0).all()
+    assert int(np.argmax(close)) in kept or int(np.argmin(close)) in kept
+    np.testing.assert_array_equal(indicators.lttb_indices(close[:10], 50), np.arange(10))
@@ -0,0 +1,38 @@
+import asyncio
+
+from app import metrics
+from app.services import news_service
+
+
+def _article(n):
+    return {"title": f"Story {n}", "url": f"https://news.example/{n}", "source": {"name": "test"}}
+
+
+def test_fallbacks_count_every_provider_that_came_back_short(monkeypatch):
+    names = [name for name, _, _ in news_service.PROVIDERS]
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def slow_and_short(topic, client):
+            await gate.wait()
+            return [_article(1)]
+
+        async def quick_and_short(topic, client):
+            gate.set()
+            return [_article(2)]
+
+        async def plenty(topic, client):
+            return [_article(n) for n in range(3, 6)]
+
+        # The hedge starts the second provider; both then come back short in the same round
+        monkeypatch.setattr(news_service, "PROVIDERS", [
+            (names[0], slow_and_short, 5), (names[1], quick_and_short, 5), (names[2], plenty, 5),
+        ])
+        return await news_service._fetch_concurrently("topic", None, hedge_delay=0.01)
+
+    before = {name: metrics.PROVIDER_FALLBACKS.value(provider=name) for name in names}
+    articles = asyncio.run(run())
+
+    assert len(articles) == 5
+    assert [metrics.PROVIDER_FALLBACKS.value(provider=name) - before[name] for name in names] == [1, 1, 0]
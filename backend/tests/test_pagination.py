@@ -0,0 +1,92 @@
+import pytest
+
+from app import crud, pagination
+
+
+def _seed(db, tasks=3, docs_per_task=4):
+    """Creates tasks with documents; returns the task ids, oldest first."""
+    ids = []
+    for t in range(tasks):
+        task = crud.create_task(db, topic=f"topic {t}", status="completed")
+        crud.ingest_documents(db, task.id, [
+            {
+                "source": "GNews",
+                "content": {"title": f"Story {t}-{d}", "url": f"https://news.example/{t}/{d}"},
+                "summary": f"Summary {t}-{d}",
+                "topics": "markets",
+            }
+            for d in range(docs_per_task)
+        ])
+        ids.append(task.id)
+    return ids
+
+
+def test_cursor_round_trip():
+    assert pagination.decode_cursor(pagination.encode_cursor(42)) == 42
+    assert pagination.decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("not a cursor!")
+
+
+def test_parse_fields_always_includes_id():
+    assert pagination.parse_fields(None) is None
+    assert pagination.parse_fields("summary, source") == ["id", "source", "summary"]
+    with pytest.raises(ValueError):
+        pagination.parse_fields("summary,password")
+
+
+def test_task_list_cursor_pages_do_not_overlap(client, db):
+    ids = _seed(db, tasks=5, docs_per_task=0)
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/tasks", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(task["id"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_bad_cursor_and_unknown_field_are_rejected(client):
+    assert client.get("/api/tasks", params={"cursor": "%%%"}).status_code == 400
+    assert client.get("/api/tasks", params={"include_documents": True, "fields": "nope"}).status_code == 400
+
+
+def test_task_documents_page_through_cursor(client, db):
+    task_id = _seed(db, tasks=1, docs_per_task=5)[0]
+
+    first = client.get(f"/api/tasks/{task_id}", params={"doc_limit": 3}).json()
+    assert len(first["documents"]) == 3
+    assert first["next_document_cursor"]
+
+    second = client.get(
+        f"/api/tasks/{task_id}", params={"doc_limit": 3, "doc_cursor": first["next_document_cursor"]}
+    ).json()
+    assert len(second["documents"]) == 2
+    assert second["next_document_cursor"] is None
+    ids = [doc["id"] for doc in first["documents"] + second["documents"]]
+    assert ids == sorted(set(ids))
+
+
+def test_fields_projection(client, db):
+    task_id = _seed(db, tasks=1, docs_per_task=2)[0]
+
+    detail = client.get(f"/api/tasks/{task_id}", params={"fields": "summary"}).json()
+    assert [set(doc) for doc in detail["documents"]] == [{"id", "summary"}] * 2
+
+    listing = client.get("/api/tasks", params={"include_documents": True, "fields": "source,content"}).json()
+    assert set(listing[0]["documents"][0]) == {"id", "source", "content"}
+    assert listing[0]["documents"][0]["content"]["url"].startswith("https://news.example/")
+
+    assert "documents" not in client.get("/api/tasks").json()[0]
+
+
+def test_skip_applies_with_include_documents(client, db):
+    ids = _seed(db, tasks=3, docs_per_task=1)
+
+    for include_documents in (False, True):
+        response = client.get("/api/tasks", params={"skip": 1, "include_documents": include_documents}).json()
+        assert [task["id"] for task in response] == sorted(ids, reverse=True)[1:]
@@ -0,0 +1,76 @@
+import re
+from datetime import datetime
+
+from app import crud, models
+from app.response_cache import read_version, response_cache
+from app.services import vector_db_service
+
+
+def test_etag_revalidation(client, db):
+    crud.create_task(db, topic="energy")
+
+    first = client.get("/api/tasks")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    hits = response_cache.hits
+    second = client.get("/api/tasks", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert response_cache.hits == hits + 1
+
+
+def test_writes_invalidate_cached_responses(client, db):
+    task = crud.create_task(db, topic="energy")
+    etag = client.get("/api/tasks").headers["etag"]
+
+    crud.create_task(db, topic="solar")
+    response = client.get("/api/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [t["topic"] for t in response.json()] == ["solar", "energy"]
+
+    client.delete(f"/api/tasks/{task.id}")
+    assert [t["topic"] for t in client.get("/api/tasks").json()] == ["solar"]
+
+
+def _requests_for(client, route: str) -> float:
+    pattern = rf'^http_requests_total{{method="GET",route="{re.escape(route)}",status="200"}} (\S+)$'
+    match = re.search(pattern, client.get("/metrics").text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_cache_hits_are_labelled_with_their_route(client, db):
+    task = crud.create_task(db, topic="energy")
+    before = _requests_for(client, "/api/tasks/{task_id}")
+    hits = response_cache.hits
+
+    client.get(f"/api/tasks/{task.id}")
+    client.get(f"/api/tasks/{task.id}")
+
+    assert response_cache.hits == hits + 1
+    assert _requests_for(client, "/api/tasks/{task_id}") == before + 2
+
+
+def test_writes_to_uncached_columns_keep_cached_responses(client, db):
+    task = crud.create_task(db, topic="energy")
+    crud.ingest_documents(db, task.id, [{"source": "GNews", "content": {"title": "a", "url": "https://a.example/1"}}])
+    etag = client.get(f"/api/tasks/{task.id}").headers["etag"]
+    versions = response_cache.stats()["versions"]
+
+    vector_db_service._mark_embedded(db, [doc.id for doc in db.query(models.Document)])
+    document = db.query(models.Document).first()
+    document.embedded_at = datetime.utcnow()
+    db.commit()
+    assert client.get(f"/api/tasks/{task.id}", headers={"If-None-Match": etag}).status_code == 304
+
+    document.summary = "now summarized"
+    db.commit()
+    assert client.get(f"/api/tasks/{task.id}", headers={"If-None-Match": etag}).status_code == 200
+    assert response_cache.stats()["versions"] != versions
+
+
+def test_versions_are_bumped_after_the_commit(db):
+    before = read_version(db, "tasks")
+    crud.create_task(db, topic="energy")
+    crud.create_task(db, topic="solar")
+    assert read_version(db, "tasks") == before + 2
@@ -0,0 +1,29 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app import serialization
+from app.serialization import FastJSONResponse
+
+PAYLOAD = {
+    "created_at": datetime(2024, 5, 1, 9, 30),
+    "price": Decimal("1.50"),
+    "tags": {"ai"},
+    "count": np.int64(3),
+    "series": np.array([1.5, 2.5]),
+}
+EXPECTED = {"created_at": "2024-05-01T09:30:00", "price": "1.50", "tags": ["ai"], "count": 3, "series": [1.5, 2.5]}
+
+
+def test_renders_with_orjson():
+    if serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    assert json.loads(FastJSONResponse(PAYLOAD).body) == EXPECTED
+
+
+def test_renders_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(FastJSONResponse(PAYLOAD).body) == EXPECTED
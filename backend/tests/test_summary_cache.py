@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from app import crud, models
+from app.services.summary_cache import SummaryCache
+
+
+def _store(db, count, age_days=0):
+    created_at = datetime.utcnow() - timedelta(days=age_days)
+    for i in range(count):
+        db.add(models.SummaryCacheEntry(key=f"{age_days}-{i}", model="m", summary="s", created_at=created_at + timedelta(seconds=i)))
+    db.commit()
+
+
+def test_prune_drops_expired_then_oldest_entries(db):
+    _store(db, 3, age_days=40)
+    _store(db, 5, age_days=1)
+
+    removed = crud.prune_cached_summaries(db, older_than=datetime.utcnow() - timedelta(days=30), max_rows=3)
+
+    assert removed == 5
+    assert sorted(key for (key,) in db.query(models.SummaryCacheEntry.key)) == ["1-2", "1-3", "1-4"]
+
+
+def test_prune_without_bounds_keeps_everything(db):
+    _store(db, 3, age_days=400)
+    assert crud.prune_cached_summaries(db) == 0
+    assert db.query(models.SummaryCacheEntry).count() == 3
+
+
+def test_cache_prune_uses_its_settings(db):
+    _store(db, 2, age_days=10)
+    _store(db, 2, age_days=0)
+
+    cache = SummaryCache(persist=True, ttl_days=5, max_rows=0)
+    assert cache.prune() == 2
+    assert cache.stats()["pruned"] == 2
+    assert SummaryCache(persist=False, ttl_days=1).prune() == 0
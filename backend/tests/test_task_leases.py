@@ -0,0 +1,73 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app import crud, models, task_leases
+from app.database import SessionLocal
+
+
+def test_new_tasks_are_owned_by_this_worker(db):
+    task = crud.create_task(db, topic="energy", status="queued")
+    assert task.owner == task_leases.INSTANCE_ID
+    assert task.heartbeat_at is not None
+
+
+def test_only_tasks_with_lapsed_leases_are_failed(db):
+    stale = datetime.utcnow() - timedelta(seconds=task_leases.TASK_LEASE_SECONDS + 60)
+    mine = crud.create_task(db, topic="mine", status="processing")
+    other_live = crud.create_task(db, topic="other worker", status="queued")
+    gone = crud.create_task(db, topic="dead worker", status="processing")
+    legacy = crud.create_task(db, topic="before leases", status="queued")
+    done = crud.create_task(db, topic="finished", status="completed")
+    db.query(models.Task).filter(models.Task.id == other_live.id).update({"owner": "other"})
+    db.query(models.Task).filter(models.Task.id.in_([gone.id, done.id])).update({"owner": "gone", "heartbeat_at": stale})
+    db.query(models.Task).filter(models.Task.id == legacy.id).update({"owner": None, "heartbeat_at": None, "created_at": stale})
+    # This worker's own task is kept alive by its heartbeat even when the last one is old
+    db.query(models.Task).filter(models.Task.id == mine.id).update({"heartbeat_at": stale})
+    db.commit()
+
+    assert task_leases.renew() == 1
+    assert task_leases.fail_expired() == 2
+
+    db.expire_all()
+    statuses = {task.topic: task.status for task in db.query(models.Task)}
+    assert statuses == {
+        "mine": "processing",
+        "other worker": "queued",
+        "dead worker": "failed",
+        "before leases": "failed",
+        "finished": "completed",
+    }
+
+
+def test_renewing_does_not_retire_cached_task_responses(client, db):
+    crud.create_task(db, topic="energy", status="queued")
+    etag = client.get("/api/tasks").headers["etag"]
+
+    task_leases.renew()
+    assert client.get("/api/tasks", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_wait_follows_tasks_run_by_other_workers(client, db):
+    task = crud.create_task(db, topic="energy", status="queued")
+
+    def finish_elsewhere():
+        time.sleep(0.3)
+        with SessionLocal() as other:
+            crud.update_task_status(other, task.id, "completed")
+
+    worker = threading.Thread(target=finish_elsewhere)
+    worker.start()
+    started = time.monotonic()
+    response = client.get(f"/api/tasks/{task.id}/wait", params={"timeout": 10})
+    worker.join()
+
+    assert response.json()["status"] == "completed"
+    assert time.monotonic() - started < 5
+
+
+def test_wait_gives_up_at_the_timeout(client, db):
+    task = crud.create_task(db, topic="energy", status="processing")
+    started = time.monotonic()
+    assert client.get(f"/api/tasks/{task.id}/wait", params={"timeout": 0.3}).json()["status"] == "processing"
+    assert time.monotonic() - started < 3